@@ -9,18 +9,21 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-import MemeRoyale.routing
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'memeroyale.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'MemeRoyale.settings')
+
+# Consumer'lar modelleri içe aktardığı için Django, routing'den önce kurulmalı
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+import MemeRoyale.routing  # noqa: E402
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
         URLRouter(
             MemeRoyale.routing.websocket_urlpatterns
         )
     ),
 })
-
@@ -1,12 +1,25 @@
 import json
+import math
+import time
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-import asyncio
-from asgiref.sync import sync_to_async
-import redis
 from datetime import datetime
+from django.conf import settings
+from api import presence
+from api.models import Room
+from . import metrics
+from .throttling import Outbox, TokenBucket, get_room_bucket
+from .timers import timer_wheel, TimerAlreadyRunning
+from . import vote_broadcast
 
+# Giden kuyruk dolduğunda önce bu akışların mesajları atılır
+LOW_PRIORITY_STREAMS = ('chat', 'presence')
 
-def get_room_group_name(scope, prefix='room'):
+# Yavaş istemci kuyruğu yüksek öncelikli mesajlarla doldurduğunda bağlantı bu kodla kapatılır (Try Again Later)
+CLOSE_CODE_SLOW_CONSUMER = 1013
+
+
+def get_room_group_name(scope, prefix='game'):
     """
     Verilen scope ve prefix ile grup adı oluşturur.
     """
@@ -14,210 +27,315 @@ def get_room_group_name(scope, prefix='room'):
     return f"{prefix}_{room_name}"
 
 
-class RoomConsumer(AsyncWebsocketConsumer):
+def get_room_name(scope):
+    return scope['url_route']['kwargs']['room_name']
+
+
+class GameConsumer(AsyncWebsocketConsumer):
+    """
+    Oda başına tek bağlantı ve tek grup üzerinden tüm oyun mesajlarını taşıyan consumer.
+
+    Gelen ve giden her mesajın 'type' alanı akışı belirtir: chat, meme, vote,
+    timer veya presence. Giden mesajlarda 'action' alanı olayın adını taşır.
+
+    Gelen mesajlar boyut ve hız (bağlantı ve oda başına token bucket) sınırından
+    geçer; giden mesajlar sınırlı bir kuyruk üzerinden gönderilir.
+    """
+    streams = ('chat', 'meme', 'vote', 'timer', 'presence')
+    default_stream = None
+
     async def connect(self):
+        self.room_name = get_room_name(self.scope)
         self.room_group_name = get_room_group_name(self.scope)
 
+        self.connection_bucket = TokenBucket(*getattr(settings, 'WS_CONNECTION_RATE', (5, 10)))
+        self.room_bucket = get_room_bucket(self.room_group_name, *getattr(settings, 'WS_ROOM_RATE', (50, 100)))
+        self.throttled = False
+        self.outbox = Outbox(
+            self.send, getattr(settings, 'WS_OUTBOUND_QUEUE_SIZE', 100), LOW_PRIORITY_STREAMS, self.on_dropped
+        )
+
         # Odaya katıl
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+        if 'vote' in self.streams:
+            self.vote_aggregator = vote_broadcast.subscribe(self.room_group_name, self)
         await self.accept()
 
-        # Kullanıcı kimlik doğrulama kontrolü
-        if not self.scope['user'].is_authenticated:
-            await self.send(text_data=json.dumps({'error': 'Authentication required'}))
-            return
+        # Çalışan bir zamanlayıcı varsa geç katılan istemciye bitiş zamanını bildir
+        ends_at = timer_wheel.ends_at(self.room_group_name)
+        if 'timer' in self.streams and ends_at is not None:
+            now = time.time()
+            await self.timer_update({
+                'ends_at': ends_at,
+                'server_time': now,
+                'time_left': max(round(ends_at - now), 0),
+            })
+
+        if 'presence' in self.streams:
+            # Kullanıcı kimlik doğrulama kontrolü
+            if not self.scope['user'].is_authenticated:
+                await self.send(text_data=json.dumps({'error': 'Authentication required'}))
+                return
 
-        # Kullanıcı katılım bilgisi yayınla
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'user_join',
-                'username': self.scope['user'].username if self.scope['user'].is_authenticated else "Anonymous"
-            }
-        )
+            # Bağlanan istemciye güncel katılımcı listesini gönder, sonrasında yalnızca farklar yayınlanır
+            roster = await self.join_presence()
+            await self.emit('presence', 'snapshot', participants=roster)
+
+            # Kullanıcı katılım bilgisi yayınla
+            await self.group_send(
+                {
+                    'type': 'user_join',
+                    'user_id': self.scope['user'].id,
+                    'username': self.get_username()
+                }
+            )
 
     async def disconnect(self, close_code):
+        self.outbox.close()
+
         # Odadan ayrıl
+        if 'vote' in self.streams:
+            vote_broadcast.unsubscribe(self.room_group_name, self)
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
-        # Kullanıcı ayrılma bilgisini yayınla
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'user_leave',
-                'username': self.scope['user'].username if self.scope['user'].is_authenticated else "Anonymous"
-            }
-        )
+        if 'presence' in self.streams and self.scope['user'].is_authenticated:
+            await presence.aleave(self.room_name, self.scope['user'])
+
+            # Kullanıcı ayrılma bilgisini yayınla
+            await self.group_send(
+                {
+                    'type': 'user_leave',
+                    'user_id': self.scope['user'].id,
+                    'username': self.get_username()
+                }
+            )
+
+    async def receive(self, text_data=None, bytes_data=None):
+        # Sınır karakter değil bayt sayısına uygulanır; ikili çerçeveler de ölçülür
+        frame = bytes_data if text_data is None else text_data.encode()
+        if frame is None or len(frame) > getattr(settings, 'WS_MAX_FRAME_BYTES', 8 * 1024):
+            await self.send(text_data=json.dumps({'error': 'Message too large'}))
+            return
+        if text_data is None:
+            await self.send(text_data=json.dumps({'error': 'Binary frames are not supported'}))
+            return
+
+        if not self.allow_message():
+            # Sınırı aşan istemciye her aşım dönemi için tek bir hata gönderilir
+            if not self.throttled:
+                self.throttled = True
+                await self.send(text_data=json.dumps({'error': 'Rate limit exceeded'}))
+            return
+        self.throttled = False
 
-    async def receive(self, text_data):
         try:
             data = json.loads(text_data)
-            message = data.get('message', None)
-
-            if message:
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'chat_message',
-                        'message': message,
-                        'username': self.scope['user'].username if self.scope['user'].is_authenticated else "Anonymous",
-                        'timestamp': datetime.now().isoformat()
-                    }
-                )
-        except Exception as e:
-            await self.send(text_data=json.dumps({'error': str(e)}))
+            stream = data.get('type', self.default_stream)
 
-    async def user_join(self, event):
-        # Kullanıcı katılım bilgisini frontend'e gönder
-        await self.send(text_data=json.dumps({
-            'type': 'user_join',
-            'username': event['username']
-        }))
+            if stream not in self.streams:
+                await self.send(text_data=json.dumps({'error': 'Invalid message type'}))
+                return
 
-    async def user_leave(self, event):
-        # Kullanıcı ayrılma bilgisini frontend'e gönder
-        await self.send(text_data=json.dumps({
-            'type': 'user_leave',
-            'username': event['username']
-        }))
+            await getattr(self, f'receive_{stream}')(data)
+        except Exception as e:
+            await self.send(text_data=json.dumps({'error': str(e)}))
 
+    def get_username(self):
+        user = self.scope['user']
+        return user.username if user.is_authenticated else "Anonymous"
 
-class TimerConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        self.room_group_name = get_room_group_name(self.scope, prefix='timer')
+    async def dispatch(self, message):
+        # Ölçüm kapalıyken olaylar doğrudan handler'a gider
+        if not metrics.is_enabled():
+            return await super().dispatch(message)
+        started = time.perf_counter()
+        try:
+            return await super().dispatch(message)
+        finally:
+            metrics.observe_handler(type(self).__name__, message['type'], time.perf_counter() - started)
+
+    async def group_send(self, event):
+        if not metrics.is_enabled():
+            return await self.channel_layer.group_send(self.room_group_name, event)
+        started = time.perf_counter()
+        try:
+            await self.channel_layer.group_send(self.room_group_name, event)
+        finally:
+            metrics.observe_group_send(event['type'], time.perf_counter() - started)
 
-        # Odaya katıl
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
+    def allow_message(self):
+        # Oda kovası yalnızca bağlantı sınırını geçen mesajlar için harcanır
+        return self.connection_bucket.consume() and self.room_bucket.consume()
 
-    async def disconnect(self, close_code):
-        # Odadan ayrıl
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+    def encode(self, stream, action, **payload):
+        # Giden çerçevenin biçimi; eski uç noktalar kendi biçimleriyle geçersiz kılar
+        return json.dumps({'type': stream, 'action': action, **payload})
 
-    async def receive(self, text_data):
-        try:
-            data = json.loads(text_data)
-            seconds = data.get('seconds')
+    async def emit(self, stream, action, **payload):
+        # Bu bağlantının dinlemediği akışlara ait olaylar istemciye iletilmez
+        if stream not in self.streams:
+            return
+        await self.push(stream, self.encode(stream, action, **payload))
 
-            # Zamanlayıcı başlat
-            if seconds is None or seconds <= 0:
-                await self.send(text_data=json.dumps({'error': 'Invalid timer value'}))
-                return
+    async def push(self, stream, text_data):
+        if not self.outbox.put(stream, text_data):
+            await self.close(code=CLOSE_CODE_SLOW_CONSUMER)
 
-            await self.start_timer(seconds)
-        except Exception as e:
-            await self.send(text_data=json.dumps({'error': str(e)}))
+    async def on_dropped(self, dropped):
+        # Atılan sohbet mesajları tek bir özetle, presence farkları güncel listeyle telafi edilir
+        if 'chat' in dropped:
+            await self.emit('chat', 'messages_dropped', count=dropped['chat'])
+        if 'presence' in dropped and self.scope['user'].is_authenticated:
+            await self.emit('presence', 'snapshot', participants=await presence.aget_roster(self.room_name))
 
-    async def start_timer(self, seconds):
-        redis_instance = redis.Redis()
-        key = f"timer:{self.room_group_name}"
+    # Gelen mesajlar
 
-        await sync_to_async(redis_instance.set)(key, seconds)
+    async def receive_chat(self, data):
+        message = data.get('message', None)
 
-        while seconds > 0:
-            await asyncio.sleep(1)
-            seconds -= 1
-            await sync_to_async(redis_instance.set)(key, seconds)
-            await self.channel_layer.group_send(
-                self.room_group_name,
+        if message:
+            await self.group_send(
                 {
-                    'type': 'timer_update',
-                    'time_left': seconds
+                    'type': 'chat_message',
+                    'message': message,
+                    'username': self.get_username(),
+                    'timestamp': datetime.now().isoformat()
                 }
             )
 
-        # Zamanlayıcı bittiğinde Redis'ten temizleme
-        await sync_to_async(redis_instance.delete)(key)
-
-    async def timer_update(self, event):
-        time_left = event['time_left']
+    async def receive_meme(self, data):
+        # Meme'ler REST ile gönderilir ve sunucu tarafından yayınlanır; istemciden gelen
+        # meme mesajları odaya iletilmez
+        await self.send(text_data=json.dumps({'error': 'Memes are submitted through the API'}))
 
-        # Zamanlayıcı bilgisini frontend'e gönder
-        await self.send(text_data=json.dumps({
-            'action': 'timer',
-            'time_left': time_left
-        }))
+    async def receive_vote(self, data):
+        # Oylar REST ile kaydedilir ve view'lar tarafından yayınlanır; soketten gelen oylar
+        # saklanmadığı ve başka odaların meme'lerini içerebileceği için odaya iletilmez
+        await self.send(text_data=json.dumps({'error': 'Votes are submitted through the API'}))
 
+    async def receive_timer(self, data):
+        seconds = data.get('seconds')
 
-class VoteConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        self.room_group_name = get_room_group_name(self.scope, prefix='vote')
-
-        # Odaya katıl
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
+        # Zamanlayıcı başlat
+        if not isinstance(seconds, (int, float)) or not math.isfinite(seconds) or seconds <= 0:
+            await self.send(text_data=json.dumps({'error': 'Invalid timer value'}))
+            return
 
-    async def disconnect(self, close_code):
-        # Odadan ayrıl
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        # Round aşamaları sunucuda ilerler; ek zamanlayıcıyı yalnızca odanın kurucusu başlatabilir
+        if not await self.is_room_host():
+            await self.send(text_data=json.dumps({'error': 'Only the room host can start timers'}))
+            return
 
-    async def receive(self, text_data):
+        # Geri sayım süreç genelindeki zamanlayıcı çarkına devredilir
         try:
-            data = json.loads(text_data)
-            vote = data.get('vote')
+            await timer_wheel.schedule(self.room_group_name, seconds)
+        except TimerAlreadyRunning:
+            await self.send(text_data=json.dumps({'error': 'Timer already running'}))
 
-            if vote is None:
-                await self.send(text_data=json.dumps({'error': 'Invalid vote value'}))
-                return
+    async def receive_presence(self, data):
+        if data.get('action') != 'heartbeat' or not self.scope['user'].is_authenticated:
+            return
 
-            # Oylama bilgisini gruba gönder
-            await self.channel_layer.group_send(
-                self.room_group_name,
+        # Heartbeat süresi dolan kullanıcılar için ayrılma farkı yayınlanır
+        stale = await presence.aheartbeat(self.room_name, self.scope['user'])
+        for user_id, username in stale:
+            await self.group_send(
                 {
-                    'type': 'vote_update',
-                    'vote': vote
+                    'type': 'user_leave',
+                    'user_id': user_id,
+                    'username': username
                 }
             )
-        except Exception as e:
-            await self.send(text_data=json.dumps({'error': str(e)}))
 
-    async def vote_update(self, event):
-        vote = event['vote']
+    async def is_room_host(self):
+        user = self.scope['user']
+        if not user.is_authenticated or not self.room_name.isdigit():
+            return False
+        return await Room.objects.filter(pk=self.room_name, host_id=user.id).aexists()
 
-        # Oylama bilgisini frontend'e gönder
-        await self.send(text_data=json.dumps({
-            'action': 'vote',
-            'vote': vote
-        }))
+    async def join_presence(self):
+        await presence.atouch(self.room_name, self.scope['user'])
+        # Roster önbelleği boşsa veritabanından doldurulduğu için bu okuma thread'de yapılır
+        return await database_sync_to_async(presence.get_roster)(self.room_name)
 
+    # Grup olayları
 
-class MemeConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        self.room_group_name = get_room_group_name(self.scope, prefix='meme')
+    async def chat_message(self, event):
+        await self.emit(
+            'chat', 'chat_message',
+            message=event['message'], username=event['username'], timestamp=event['timestamp']
+        )
 
-        # Odaya katıl
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
+    async def user_join(self, event):
+        # Kullanıcı katılım bilgisini frontend'e gönder
+        await self.emit('presence', 'user_join', user_id=event['user_id'], username=event['username'])
 
-    async def disconnect(self, close_code):
-        # Odadan ayrıl
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+    async def user_leave(self, event):
+        # Kullanıcı ayrılma bilgisini frontend'e gönder
+        await self.emit('presence', 'user_leave', user_id=event['user_id'], username=event['username'])
+
+    async def meme_created(self, event):
+        # REST ile kaydedilen meme'ler sunucu tarafından yayınlanır
+        await self.emit('meme', 'meme_created', meme=event['meme'])
+
+    async def meme_thumbnails(self, event):
+        # Görsel worker'ı küçük resimleri hazırladığında meme kartı güncellenir
+        await self.emit('meme', 'meme_thumbnails', meme=event['meme'], thumbnails=event['thumbnails'])
+
+    async def vote_cast(self, event):
+        # Her oy için çerçeve gönderilmez, toplayıcı pencere sonunda tek güncelleme yayınlar
+        if 'vote' in self.streams:
+            self.vote_aggregator.mark(event['meme'])
+
+    async def phase_change(self, event):
+        # Round aşama geçişleri zamanlayıcı akışıyla birlikte iletilir
+        await self.emit(
+            'timer', 'phase_change',
+            round=event['round'], phase=event['phase'], ends_at=event['ends_at'],
+            server_time=event['server_time'], winner=event['winner']
+        )
 
-    async def receive(self, text_data):
-        try:
-            data = json.loads(text_data)
-            meme_update = data.get('meme_update')
+    async def timer_update(self, event):
+        # Zamanlayıcı bilgisini frontend'e gönder, geri sayım istemcide yapılır
+        await self.emit(
+            'timer', 'timer',
+            ends_at=event['ends_at'], server_time=event['server_time'], time_left=event['time_left']
+        )
 
-            if meme_update is None:
-                await self.send(text_data=json.dumps({'error': 'Invalid meme update'}))
-                return
 
-            # Meme güncellemesini gruba gönder
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'meme_update',
-                    'meme_update': meme_update
-                }
-            )
-        except Exception as e:
-            await self.send(text_data=json.dumps({'error': str(e)}))
+# Eski uç noktalar: aynı oyun grubuna katılan ve yalnızca kendi akışlarını ileten ince katmanlar.
+# Mevcut istemciler bozulmasın diye çerçeveler tek soketten önceki biçimlerinde gönderilir.
+
+class RoomConsumer(GameConsumer):
+    streams = ('chat', 'presence')
+    default_stream = 'chat'
+
+    def encode(self, stream, action, **payload):
+        # {'type': 'user_join', 'username': ...}
+        return json.dumps({'type': action, **payload})
+
+
+class TimerConsumer(GameConsumer):
+    streams = ('timer',)
+    default_stream = 'timer'
+
+    def encode(self, stream, action, **payload):
+        # {'action': 'timer', 'ends_at': ..., 'server_time': ..., 'time_left': ...}
+        return json.dumps({'action': action, **payload})
+
+
+class VoteConsumer(GameConsumer):
+    streams = ('vote',)
+    default_stream = 'vote'
+
+    def encode(self, stream, action, **payload):
+        # {'action': 'vote', 'type': 'vote_update', 'seq': ..., 'totals': ...}
+        return json.dumps({'action': stream, 'type': action, **payload})
+
 
-    async def meme_update(self, event):
-        meme_update = event['meme_update']
+class MemeConsumer(GameConsumer):
+    streams = ('meme',)
+    default_stream = 'meme'
 
-        # Meme güncellemesini frontend'e gönder
-        await self.send(text_data=json.dumps({
-            'action': 'update_meme',
-            'meme_update': meme_update
-        }))
+    def encode(self, stream, action, **payload):
+        return json.dumps({'action': action, **payload})
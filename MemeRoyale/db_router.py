@@ -0,0 +1,200 @@
+"""
+Okuma replikalarına yönlendirme.
+
+Yalnızca güvenli (GET, HEAD, OPTIONS) HTTP isteklerindeki okumalar replikaya gider;
+consumer'lar, komutlar ve zamanlayıcı her zaman birincil veritabanını kullanır.
+İstek içinde yazma yapılırsa istek birincile sabitlenir; aynı istemcinin sonraki
+istekleri de REPLICA_PIN_SECONDS süresince birincilden okur (read-your-writes).
+İstemci Authorization başlığıyla tanınır: başlığın özeti Redis'te kısa ömürlü bir
+anahtar olarak tutulur, böylece çerez göndermeyen (başka origin'den bearer token ile
+çalışan) istemciler de sabitlenir. Başlıksız istemciler için yanıta ayrıca kısa ömürlü
+bir çerez eklenir; çapraz origin'de bu çerez yalnızca istemci kimlik bilgilerini
+gönderirse (withCredentials) ve CORS_ALLOW_CREDENTIALS açıksa geri gelir.
+Replikaya gitmemesi gereken view'lar `use_replica = False` ile bunu kapatır.
+"""
+import hashlib
+import logging
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import redis_pool
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_redis():
+    return redis_pool.get_redis()
+
+
+def get_async_redis():
+    return redis_pool.get_async_redis()
+
+
+def get_pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def pin_key(request):
+    # Token'ın kendisi saklanmaz, yalnızca özeti anahtar olarak kullanılır
+    authorization = request.headers.get('Authorization')
+    if not authorization:
+        return None
+    return f"db_pin:{hashlib.sha256(authorization.encode()).hexdigest()}"
+
+
+def is_pinned(request):
+    if request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES:
+        return True
+    key = pin_key(request)
+    if key is None:
+        return False
+    try:
+        return bool(get_redis().exists(key))
+    except Exception:
+        # Sabitleme bilinemiyorsa eski veri okumak yerine birincilden okunur
+        logger.exception("Replica pin could not be read")
+        return True
+
+
+async def ais_pinned(request):
+    if request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES:
+        return True
+    key = pin_key(request)
+    if key is None:
+        return False
+    try:
+        return bool(await get_async_redis().exists(key))
+    except Exception:
+        logger.exception("Replica pin could not be read")
+        return True
+
+
+def pin(request):
+    key = pin_key(request)
+    if key is None:
+        return
+    try:
+        get_redis().set(key, 1, ex=get_pin_seconds())
+    except Exception:
+        logger.exception("Replica pin could not be written")
+
+
+async def apin(request):
+    key = pin_key(request)
+    if key is None:
+        return
+    try:
+        await get_async_redis().set(key, 1, ex=get_pin_seconds())
+    except Exception:
+        logger.exception("Replica pin could not be written")
+
+
+class RequestState:
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica):
+        self.replica = replica  # None ise istek birincilden okur
+        self.wrote = False
+
+
+# İstek dışındaki kodda durum yoktur ve okumalar birincile gider
+current_state = ContextVar('db_router_state', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = current_state.get()
+        if state is None or state.replica is None:
+            return DEFAULT_DB_ALIAS
+        # Açık bir transaction içindeki okumalar aynı transaction'ı görmeli
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_state.get()
+        if state is not None:
+            # Yazan istek kalan okumalarını birincilden yapar
+            state.replica = None
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replikalar birincilin kopyasıdır, farklı bağlantılardan okunan nesneler ilişkilendirilebilir
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    İsteğin okumalarının replikaya gidip gitmeyeceğine karar verir ve yazan
+    istemciyi kısa süre birincile sabitler.
+    Replika tanımlı değilse middleware zincirine eklenmez.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.start(is_pinned(request))
+        token = current_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_state.reset(token)
+        if state.wrote:
+            pin(request)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = self.start(await ais_pinned(request))
+        token = current_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_state.reset(token)
+        if state.wrote:
+            await apin(request)
+        return self.finish(state, response)
+
+    def start(self, pinned):
+        if pinned:
+            return RequestState(None)
+        # İstek boyunca aynı replika kullanılır
+        return RequestState(random.choice(get_replicas()))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'view_class', view_func)
+        if not getattr(view, 'use_replica', True):
+            state = current_state.get()
+            if state is not None:
+                state.replica = None
+
+    def finish(self, state, response):
+        if state.wrote:
+            # Aynı origin'deki ya da kimlik bilgisi gönderen istemciler için
+            response.set_cookie(PIN_COOKIE, '1', max_age=get_pin_seconds(), httponly=True, samesite='Lax')
+        return response
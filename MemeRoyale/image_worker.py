@@ -0,0 +1,142 @@
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from PIL import Image
+
+from api import events
+from api.models import Meme
+from api.thumbnails import ImageFetchError, create_thumbnails, thumbnails_exist
+from .round_scheduler import MEMBERSHIP_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Görsel worker'larının yeni meme bildirimlerini aldığı grup
+IMAGE_WORKER_GROUP = 'meme_images'
+
+
+def notify_meme_image(meme_id):
+    """
+    Çalışan görsel worker'larına küçük resmi üretilecek yeni bir meme'yi bildirir.
+    """
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            IMAGE_WORKER_GROUP, {'type': 'meme.image', 'meme': meme_id}
+        )
+    except Exception:
+        # Bildirim kaybolsa bile worker yeniden başladığında bekleyen meme'leri veritabanından yükler
+        logger.exception("Image worker notification failed for meme %s", meme_id)
+
+
+def process_meme(meme_id):
+    """
+    Bekleyen bir meme'nin küçük resimlerini üretir ve durumunu günceller.
+    Meme artık beklemiyorsa ya da başka bir worker üstlendiyse None, aksi halde
+    güncellenen meme'yi döndürür.
+    """
+    # Bildirim tüm worker'lara gider; meme'yi koşullu UPDATE ile üstlenen worker işler
+    claimed = Meme.objects.filter(pk=meme_id, image_status=Meme.IMAGE_PENDING).update(
+        image_status=Meme.IMAGE_PROCESSING
+    )
+    if not claimed:
+        return None
+    meme = Meme.objects.select_related('round').only('id', 'image_url', 'round__room_id').get(pk=meme_id)
+
+    # Aynı adresteki görsel daha önce işlendiyse yeniden indirilmez
+    image_hash = Meme.objects.filter(
+        image_url=meme.image_url, image_status=Meme.IMAGE_READY
+    ).values_list('image_hash', flat=True).first()
+    meme.image_status = Meme.IMAGE_READY
+    if image_hash is None or not thumbnails_exist(image_hash):
+        try:
+            image_hash = create_thumbnails(meme.image_url)
+        except (ImageFetchError, OSError, ValueError, Image.DecompressionBombError) as error:
+            logger.warning("Thumbnails for meme %s could not be created: %s", meme_id, error)
+            image_hash, meme.image_status = '', Meme.IMAGE_FAILED
+
+    meme.image_hash = image_hash
+    Meme.objects.filter(pk=meme_id).update(image_hash=meme.image_hash, image_status=meme.image_status)
+    return meme
+
+
+class ImageWorker:
+    """
+    Meme görsellerini indirip küçük resimlerini üreten worker.
+
+    Başlangıçta bekleyen meme'ler okunur, yenileri IMAGE_WORKER_GROUP üzerinden
+    bildirilir. İndirme ve yeniden boyutlandırma thread'lerde en fazla
+    MEME_IMAGE_WORKERS iş paralel olarak yapılır; hazır olan küçük resimler
+    meme'nin odasına yayınlanır.
+
+    Birden fazla worker süreci çalışabilir: her meme'yi yalnızca onu üstlenen
+    (pending -> processing) worker indirir. Başlayan worker, çöken bir worker'dan
+    kalan işlenmekte durumundaki meme'leri yeniden beklemeye alır; o sırada başka
+    bir worker'ın işlediği bir meme ikinci kez işlenebilir, küçük resimler içerik
+    özetiyle adlandırıldığı için bu yalnızca fazladan iştir.
+    """
+
+    def __init__(self):
+        self._queue = asyncio.Queue()
+        self._queued = set()  # kuyrukta ya da işlenmekte olan meme'ler
+
+    def enqueue(self, meme_id):
+        if meme_id not in self._queued:
+            self._queued.add(meme_id)
+            self._queue.put_nowait(meme_id)
+
+    @database_sync_to_async
+    def load_pending(self):
+        Meme.objects.filter(image_status=Meme.IMAGE_PROCESSING).update(image_status=Meme.IMAGE_PENDING)
+        return list(
+            Meme.objects.filter(image_status=Meme.IMAGE_PENDING).order_by('created_at').values_list('id', flat=True)
+        )
+
+    async def run(self):
+        channel_layer = get_channel_layer()
+        channel_name = await channel_layer.new_channel()
+        await channel_layer.group_add(IMAGE_WORKER_GROUP, channel_name)
+
+        for meme_id in await self.load_pending():
+            self.enqueue(meme_id)
+        logger.info("Image worker started with %d pending memes", self._queue.qsize())
+
+        tasks = [
+            asyncio.create_task(self.listen(channel_layer, channel_name)),
+            asyncio.create_task(self.refresh_membership(channel_layer, channel_name)),
+            *(asyncio.create_task(self.work()) for _ in range(getattr(settings, 'MEME_IMAGE_WORKERS', 4))),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await channel_layer.group_discard(IMAGE_WORKER_GROUP, channel_name)
+
+    async def listen(self, channel_layer, channel_name):
+        while True:
+            message = await channel_layer.receive(channel_name)
+            if message.get('type') == 'meme.image':
+                self.enqueue(message['meme'])
+
+    async def refresh_membership(self, channel_layer, channel_name):
+        while True:
+            await asyncio.sleep(MEMBERSHIP_REFRESH_SECONDS)
+            await channel_layer.group_add(IMAGE_WORKER_GROUP, channel_name)
+
+    async def work(self):
+        while True:
+            meme_id = await self._queue.get()
+            try:
+                # İşler birbirini beklemesin diye her biri ayrı thread'de çalışır
+                meme = await database_sync_to_async(process_meme, thread_sensitive=False)(meme_id)
+            except Exception:
+                logger.exception("Image processing failed for meme %s", meme_id)
+                continue
+            finally:
+                self._queued.discard(meme_id)
+
+            if meme is not None and meme.image_status == Meme.IMAGE_READY:
+                await events.apublish(meme.round.room_id, events.meme_thumbnails_event(meme))
@@ -0,0 +1,296 @@
+"""
+İsteğe bağlı (METRICS_ENABLED) ölçüm katmanı.
+
+HTTP istekleri için view başına gecikme, sorgu sayısı ve süresi, serializer süresi
+ve yanıt boyutu; consumer'lar için olay türü başına handler gecikmesi, group_send
+gecikmesi ve mesaj sayısı süreç içinde tutulur ve /metrics uç noktasından
+Prometheus metin biçiminde sunulur. Sayaçlar süreç başınadır, her worker kendi
+değerlerini sunar.
+
+Kapalıyken middleware yüklenmez, sorgu ve serializer kancaları kurulmaz;
+consumer'larda yalnızca tek bir ayar kontrolü yapılır.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from .redis_pool import pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+METRICS = {
+    'memeroyale_http_requests_total': ('counter', "HTTP istekleri"),
+    'memeroyale_http_request_duration_seconds': ('histogram', "HTTP istek süresi"),
+    'memeroyale_http_db_queries': ('histogram', "İstek başına veritabanı sorgusu"),
+    'memeroyale_http_db_seconds_total': ('counter', "Veritabanı sorgularında geçen süre"),
+    'memeroyale_http_serializer_seconds_total': ('counter', "Serializer çıktısı üretmekte geçen süre"),
+    'memeroyale_http_response_bytes_total': ('counter', "Yanıt gövdesi boyutu"),
+    'memeroyale_ws_messages_total': ('counter', "Consumer'ların işlediği olaylar"),
+    'memeroyale_ws_handler_duration_seconds': ('histogram', "Consumer handler süresi"),
+    'memeroyale_ws_group_send_duration_seconds': ('histogram', "group_send süresi"),
+}
+
+POOL_METRICS = (
+    ('in_use', 'memeroyale_redis_pool_in_use', 'gauge'),
+    ('max_connections', 'memeroyale_redis_pool_max_connections', 'gauge'),
+    ('acquired', 'memeroyale_redis_pool_acquired_total', 'counter'),
+    ('saturated', 'memeroyale_redis_pool_saturated_total', 'counter'),
+    ('timeouts', 'memeroyale_redis_pool_timeouts_total', 'counter'),
+    ('wait_seconds', 'memeroyale_redis_pool_wait_seconds_total', 'counter'),
+)
+
+
+def is_enabled():
+    return getattr(settings, 'METRICS_ENABLED', False)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Etiketli sayaç ve histogramları tutan süreç içi kayıt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.counters = defaultdict(float)  # (ad, etiketler) -> değer
+            self.histograms = {}  # (ad, etiketler) -> Histogram
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self.counters[name, label_key(labels)] += value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def render(self):
+        with self._lock:
+            series = defaultdict(list)
+            for (name, labels), value in sorted(self.counters.items()):
+                series[name].append(f"{name}{format_labels(labels)} {format_value(value)}")
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    series[name].append(
+                        f"{name}_bucket{format_labels(labels + (('le', format_value(bound)),))} {cumulative}"
+                    )
+                series[name].append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                series[name].append(f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+                series[name].append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+        lines = []
+        for name in sorted(series):
+            kind, description = METRICS.get(name, ('untyped', ''))
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}", *series[name]]
+        return '\n'.join(lines + render_pool_stats()) + '\n'
+
+
+registry = Registry()
+
+
+def label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render_pool_stats():
+    # Redis havuzlarının doluluk bilgileri istek anında okunur
+    pools = sorted(pool_stats().items())
+    lines = []
+    for field, name, kind in POOL_METRICS:
+        if pools:
+            lines.append(f"# TYPE {name} {kind}")
+        lines += [f"{name}{format_labels((('pool', pool),))} {format_value(stats[field])}" for pool, stats in pools]
+    return lines
+
+
+# HTTP istekleri
+
+class RequestStats:
+    __slots__ = ('queries', 'db_seconds', 'serializer_seconds', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0
+        self.serializer_seconds = 0
+        self.serializing = False
+
+
+# Bağlam sync_to_async ile view thread'ine de taşındığı için senkron view'ların sorguları da isteğe yazılır
+current_request = ContextVar('metrics_request', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_wrapper(sender=None, connection=None, **kwargs):
+    # Başa eklenir; execute_wrapper() bağlamları kendi sarmalayıcılarını sondan çıkarır
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def install_serializer_timer():
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data.fget
+    if getattr(original, 'metrics_timed', False):
+        return
+
+    def data(self):
+        stats = current_request.get()
+        # İç içe .data çağrıları en dıştaki çağrının süresine dahildir
+        if stats is None or stats.serializing:
+            return original(self)
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            stats.serializing = False
+            stats.serializer_seconds += time.perf_counter() - started
+
+    data.metrics_timed = True
+    BaseSerializer.data = property(data)
+
+
+def install():
+    connection_created.connect(install_query_wrapper, dispatch_uid='metrics_query_wrapper')
+    for connection in connections.all(initialized_only=True):
+        install_query_wrapper(connection=connection)
+    install_serializer_timer()
+
+
+class MetricsMiddleware:
+    """
+    View başına istek süresi, sorgu sayısı ve süresi, serializer süresi ve yanıt boyutunu kaydeder.
+    METRICS_ENABLED kapalıyken middleware zincirine eklenmez.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, stats, elapsed):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        labels = {'view': view}
+        registry.inc('memeroyale_http_requests_total', {
+            'view': view, 'method': request.method, 'status': response.status_code,
+        })
+        registry.observe('memeroyale_http_request_duration_seconds', labels, elapsed)
+        registry.observe('memeroyale_http_db_queries', labels, stats.queries, QUERY_BUCKETS)
+        registry.inc('memeroyale_http_db_seconds_total', labels, stats.db_seconds)
+        registry.inc('memeroyale_http_serializer_seconds_total', labels, stats.serializer_seconds)
+        if not response.streaming:
+            registry.inc('memeroyale_http_response_bytes_total', labels, len(response.content))
+
+
+# Consumer'lar
+
+def observe_handler(consumer, event, elapsed):
+    labels = {'consumer': consumer, 'event': event}
+    registry.inc('memeroyale_ws_messages_total', labels)
+    registry.observe('memeroyale_ws_handler_duration_seconds', labels, elapsed)
+
+
+def observe_group_send(event, elapsed):
+    registry.observe('memeroyale_ws_group_send_duration_seconds', {'event': event}, elapsed)
+
+
+def metrics_view(request):
+    """
+    Ölçümleri Prometheus metin biçiminde döndürür.
+    METRICS_TOKEN ayarlıysa istek 'Authorization: Bearer <token>' başlığı taşımalıdır.
+    """
+    if not is_enabled():
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
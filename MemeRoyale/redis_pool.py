@@ -0,0 +1,179 @@
+"""
+Süreç genelinde paylaşılan Redis bağlantı havuzları.
+
+Gerçek zamanlı özellikler (consumer'lar, zamanlayıcılar, oy yayını) asyncio
+istemcisini, senkron kod (view'lar, sinyaller, komutlar) senkron istemciyi
+kullanır. Her iki havuz da REDIS_URL ve REDIS_POOL ayarlarından kurulur;
+havuz doluyken bağlantı isteyenler hata almak yerine kısa süre bekler ve
+bu beklemeler pool_stats() ile izlenir.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+import weakref
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """
+    Bir bağlantı havuzunun doluluk sayaçları.
+
+    Senkron havuz thread'ler arasında paylaşıldığı için sayaçlar kilitle güncellenir.
+    in_use yalnızca after_acquire ile sayılan bağlantılar geri verildiğinde azalır;
+    redis-py bağlantı kurulamadığında da release() çağırdığından sayılmamış bir
+    bağlantının iadesi sayaçları değiştirmez.
+    """
+
+    def __init__(self, max_connections):
+        self.max_connections = max_connections
+        self.in_use = 0  # şu an kullanımda olan bağlantılar
+        self.acquired = 0  # verilen bağlantı sayısı
+        self.saturated = 0  # havuz doluyken gelen istek sayısı
+        self.timeouts = 0  # bekleme süresi dolan istek sayısı
+        self.wait_seconds = 0.0  # bağlantı beklerken geçen toplam süre
+        self.lock = threading.Lock()
+        self.checked_out = set()  # sayılan bağlantıların id'leri
+
+    def before_acquire(self):
+        with self.lock:
+            if self.in_use >= self.max_connections:
+                self.saturated += 1
+        return time.perf_counter()
+
+    def after_acquire(self, started, connection):
+        waited = time.perf_counter() - started
+        with self.lock:
+            self.checked_out.add(id(connection))
+            self.in_use += 1
+            self.acquired += 1
+            self.wait_seconds += waited
+
+    def on_timeout(self):
+        with self.lock:
+            self.timeouts += 1
+            in_use = self.in_use
+        logger.warning("Redis pool exhausted (%d connections in use)", in_use)
+
+    def on_release(self, connection):
+        with self.lock:
+            if id(connection) in self.checked_out:
+                self.checked_out.discard(id(connection))
+                self.in_use -= 1
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'max_connections': self.max_connections,
+                'in_use': self.in_use,
+                'acquired': self.acquired,
+                'saturated': self.saturated,
+                'timeouts': self.timeouts,
+                'wait_seconds': round(self.wait_seconds, 6),
+            }
+
+
+def is_pool_timeout(error):
+    # Havuz bekleme süresi dolduğunda redis-py ConnectionError'ı queue.Empty ya da
+    # asyncio.TimeoutError üzerinden yükseltir; bağlantı kurma hataları havuz doluluğu sayılmaz
+    return isinstance(error.__context__, (queue.Empty, asyncio.TimeoutError))
+
+
+class InstrumentedPool(redis.BlockingConnectionPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats(self.max_connections)
+
+    def get_connection(self, *args, **kwargs):
+        started = self.stats.before_acquire()
+        try:
+            connection = super().get_connection(*args, **kwargs)
+        except redis.ConnectionError as error:
+            if is_pool_timeout(error):
+                self.stats.on_timeout()
+            raise
+        self.stats.after_acquire(started, connection)
+        return connection
+
+    def release(self, connection):
+        self.stats.on_release(connection)
+        super().release(connection)
+
+
+class AsyncInstrumentedPool(aioredis.BlockingConnectionPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats(self.max_connections)
+
+    async def get_connection(self, *args, **kwargs):
+        started = self.stats.before_acquire()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except redis.ConnectionError as error:
+            if is_pool_timeout(error):
+                self.stats.on_timeout()
+            raise
+        self.stats.after_acquire(started, connection)
+        return connection
+
+    async def release(self, connection):
+        self.stats.on_release(connection)
+        await super().release(connection)
+
+
+def get_pool_options():
+    options = {
+        'max_connections': 50,
+        'timeout': 5,
+        'socket_timeout': 5,
+        'health_check_interval': 30,
+    }
+    options.update(getattr(settings, 'REDIS_POOL', {}))
+    return options
+
+
+_client = None
+
+# asyncio bağlantıları oluşturuldukları event loop'a bağlıdır; süreçte normalde tek loop vardır
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_redis():
+    """
+    Süreç genelindeki senkron Redis istemcisini döndürür.
+    """
+    global _client
+    if _client is None:
+        pool = InstrumentedPool.from_url(settings.REDIS_URL, **get_pool_options())
+        _client = redis.Redis(connection_pool=pool)
+    return _client
+
+
+def get_async_redis():
+    """
+    Çalışan event loop'a ait paylaşılan asyncio Redis istemcisini döndürür.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        pool = AsyncInstrumentedPool.from_url(settings.REDIS_URL, **get_pool_options())
+        client = _async_clients[loop] = aioredis.Redis(connection_pool=pool)
+    return client
+
+
+def pool_stats():
+    """
+    Oluşturulmuş havuzların doluluk bilgilerini döndürür.
+    """
+    stats = {}
+    if _client is not None:
+        stats['sync'] = _client.connection_pool.stats.as_dict()
+    for i, client in enumerate(list(_async_clients.values())):
+        stats[f'async-{i}' if i else 'async'] = client.connection_pool.stats.as_dict()
+    return stats
@@ -0,0 +1,178 @@
+import asyncio
+import heapq
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.utils import timezone
+
+from api.models import Round
+
+logger = logging.getLogger(__name__)
+
+# Zamanlayıcı worker'larının yeni round bildirimlerini aldığı grup
+SCHEDULER_GROUP = 'round_scheduler'
+
+# Grup üyeliği kanal katmanında zamanla düştüğü için düzenli olarak yenilenir
+MEMBERSHIP_REFRESH_SECONDS = 60 * 60
+
+
+def notify_round(round_id):
+    """
+    Çalışan zamanlayıcılara yeni ya da değişen bir round'u bildirir.
+    """
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            SCHEDULER_GROUP, {'type': 'round.schedule', 'round': round_id}
+        )
+    except Exception:
+        # Bildirim kaybolsa bile zamanlayıcı yeniden başladığında round'u veritabanından yükler
+        logger.exception("Round scheduler notification failed for round %s", round_id)
+
+
+def advance_round(round_id):
+    """
+    Süresi dolan aşama geçişini yapar.
+    Yayınlanacak olayı (yoksa None) ve round'un bir sonraki geçiş zamanını (yoksa None) döndürür.
+    """
+    round_ = Round.objects.filter(pk=round_id).first()
+    if round_ is None or round_.next_transition is None:
+        return None, None
+
+    phase, deadline = round_.next_transition
+    if deadline > timezone.now():
+        # Süre uzatılmış ya da bildirim erken gelmiş
+        return None, deadline
+
+    # Geçişler koşullu UPDATE ile yapılır; aynı round'u tutan diğer worker'lar boşa düşer
+    if phase == 'voting':
+        if not round_.start_voting():
+            return None, None
+        return phase_event(round_, 'voting', round_.voting_end_time), round_.voting_end_time
+
+    if not round_.end_voting():
+        return None, None
+    return phase_event(round_, 'ended', None), None
+
+
+def phase_event(round_, phase, ends_at):
+    return {
+        'type': 'phase_change',
+        'room': round_.room_id,
+        'round': round_.pk,
+        'phase': phase,
+        'ends_at': ends_at.timestamp() if ends_at else None,
+        'server_time': time.time(),
+        'winner': round_.winner_id,
+    }
+
+
+class RoundScheduler:
+    """
+    Round aşama geçişlerini (gönderim -> oylama -> bitiş) zamanında tetikleyen zamanlayıcı.
+
+    Başlangıçta bitmemiş round'ların geçiş zamanları tek bir indeksli sorguyla
+    okunup heap'e konur; sonrasında yalnızca en yakın geçişe kadar beklenir.
+    Yeni round'lar SCHEDULER_GROUP üzerinden bildirilir. Birden fazla worker
+    çalışabilir, her geçiş veritabanındaki koşullu UPDATE ile tek kez yapılır.
+    """
+
+    def __init__(self):
+        self._heap = []  # (geçiş zamanı, round id)
+        self._wakeup = asyncio.Event()
+
+    def schedule(self, round_id, deadline):
+        heapq.heappush(self._heap, (deadline.timestamp(), round_id))
+        self._wakeup.set()
+
+    @database_sync_to_async
+    def load_pending(self):
+        rounds = Round.objects.filter(voting_ended=False).only(
+            'meme_submission_end_time', 'voting_start_time', 'voting_end_time', 'voting_ended'
+        )
+        return [(round_.pk, round_.next_transition[1]) for round_ in rounds.iterator()]
+
+    @database_sync_to_async
+    def get_deadline(self, round_id):
+        round_ = Round.objects.filter(pk=round_id).first()
+        if round_ is None or round_.next_transition is None:
+            return None
+        return round_.next_transition[1]
+
+    async def run(self):
+        channel_layer = get_channel_layer()
+        channel_name = await channel_layer.new_channel()
+        await channel_layer.group_add(SCHEDULER_GROUP, channel_name)
+
+        for round_id, deadline in await self.load_pending():
+            self.schedule(round_id, deadline)
+        logger.info("Round scheduler started with %d pending rounds", len(self._heap))
+
+        # Görevlerden biri hata verirse zamanlayıcı sessizce yarım çalışmaz, hata run()'dan yükselir
+        tasks = [
+            asyncio.create_task(self.listen(channel_layer, channel_name)),
+            asyncio.create_task(self.refresh_membership(channel_layer, channel_name)),
+            asyncio.create_task(self.fire_due(channel_layer)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await channel_layer.group_discard(SCHEDULER_GROUP, channel_name)
+
+    async def listen(self, channel_layer, channel_name):
+        while True:
+            message = await channel_layer.receive(channel_name)
+            if message.get('type') != 'round.schedule':
+                continue
+            try:
+                deadline = await self.get_deadline(message['round'])
+            except Exception:
+                # Round yeniden başlatmada veritabanından yüklenir
+                logger.exception("Round %s could not be scheduled", message['round'])
+                continue
+            if deadline is not None:
+                self.schedule(message['round'], deadline)
+
+    async def refresh_membership(self, channel_layer, channel_name):
+        while True:
+            await asyncio.sleep(MEMBERSHIP_REFRESH_SECONDS)
+            await channel_layer.group_add(SCHEDULER_GROUP, channel_name)
+
+    async def fire_due(self, channel_layer):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            fire_at, round_id = self._heap[0]
+            delay = fire_at - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            try:
+                event, next_deadline = await database_sync_to_async(advance_round)(round_id)
+            except Exception:
+                logger.exception("Round %s transition failed", round_id)
+                continue
+
+            if next_deadline is not None:
+                self.schedule(round_id, next_deadline)
+            if event is not None:
+                await self.broadcast(channel_layer, event)
+
+    async def broadcast(self, channel_layer, event):
+        try:
+            await channel_layer.group_send(f"game_{event['room']}", event)
+        except Exception:
+            logger.exception("Phase broadcast failed for round %s", event['round'])
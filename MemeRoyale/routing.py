@@ -1,8 +1,12 @@
 from django.urls import re_path
-from consumers import RoomConsumer, MemeConsumer, VoteConsumer, TimerConsumer
+from .consumers import GameConsumer, RoomConsumer, MemeConsumer, VoteConsumer, TimerConsumer
 
 
 websocket_urlpatterns = [
+    # Tüm oyun akışları için tek bağlantı
+    re_path(r'ws/room/(?P<room_name>\w+)/game/$', GameConsumer.as_asgi()),
+
+    # Eski uç noktalar
     re_path(r'ws/room/(?P<room_name>\w+)/$', RoomConsumer.as_asgi()),
     re_path(r'ws/room/(?P<room_name>\w+)/meme/$', MemeConsumer.as_asgi()),
     re_path(r'ws/room/(?P<room_name>\w+)/vote/$', VoteConsumer.as_asgi()),
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from datetime import timedelta
+import copy
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -67,6 +70,8 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    "MemeRoyale.metrics.MetricsMiddleware",
+    "MemeRoyale.db_router.ReplicaMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -99,27 +104,178 @@ WSGI_APPLICATION = "MemeRoyale.wsgi.application"
 
 ASGI_APPLICATION = "MemeRoyale.asgi.application"
 
+# Redis bağlantı adresi (channel layer ve gerçek zamanlı özellikler ortak kullanır)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
+
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            "hosts": [('127.0.0.1', 6379)],  # Redis'in çalıştığı host ve port
+            "hosts": [REDIS_URL],  # Redis'in çalıştığı host ve port
         },
     },
 }
 
+# Uygulama kodunun kullandığı paylaşılan Redis bağlantı havuzları (MemeRoyale/redis_pool.py)
+REDIS_POOL = {
+    'max_connections': int(os.environ.get('REDIS_MAX_CONNECTIONS', 50)),
+    'timeout': 5,  # Havuz doluyken bağlantı için beklenecek süre (saniye)
+    'socket_timeout': 5,
+    'health_check_interval': 30,
+}
+
+# Oy kayıt modu: 'db' oyları doğrudan Vote tablosuna yazar, 'redis' oyları
+# Redis'te toplayıp VOTE_FLUSH_BATCH_SIZE'lık gruplar halinde veritabanına aktarır
+VOTE_INGESTION = os.environ.get('VOTE_INGESTION', 'db')
+VOTE_FLUSH_BATCH_SIZE = 500
+
+# Oy güncellemeleri bu pencere (milisaniye) boyunca biriktirilip tek çerçevede yayınlanır
+VOTE_BROADCAST_WINDOW_MS = 150
+
+# Heartbeat gelmeyen kullanıcılar bu süre (saniye) sonunda çevrimdışı sayılır
+PRESENCE_TTL_SECONDS = 30
+
+# WebSocket sınırları: bağlantı ve oda başına (saniyede mesaj, ani yük kapasitesi) token bucket,
+# en büyük gelen çerçeve ve yavaş istemciler için giden kuyruk kapasitesi
+WS_CONNECTION_RATE = (5, 10)
+WS_ROOM_RATE = (50, 100)
+WS_MAX_FRAME_BYTES = 8 * 1024
+WS_OUTBOUND_QUEUE_SIZE = 100
+
+# İsteğe bağlı ölçüm katmanı (MemeRoyale/metrics.py); kapalıyken middleware yüklenmez.
+# METRICS_TOKEN ayarlıysa /metrics uç noktası 'Authorization: Bearer <token>' başlığı ister
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Yüklenen dosyalar (profil resimleri) ve üretilen görseller
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_URL = '/media/'
+
+# Profil resimleri (api/avatars.py). Yükleme sınırları; avatarlar kare ve süreç içindeki
+# AVATAR_WORKERS thread'lik havuzda üretilir
+PROFILE_PICTURE_MAX_BYTES = 5 * 1024 * 1024
+PROFILE_PICTURE_MIN_DIMENSION = 64
+PROFILE_PICTURE_MAX_DIMENSION = 4096
+AVATAR_ROOT = os.path.join(MEDIA_ROOT, 'avatars')
+AVATAR_URL = '/avatars/'
+AVATAR_SIZES = (48, 128)
+AVATAR_WORKERS = 2
+
+# Meme küçük resimleri (api/thumbnails.py); görselleri run_image_worker komutu indirip işler.
+# Boyutlar küçük resmin en uzun kenarıdır (piksel). MEME_THUMBNAIL_URL bir CDN adresi de olabilir
+MEME_THUMBNAIL_ROOT = os.path.join(MEDIA_ROOT, 'thumbnails')
+MEME_THUMBNAIL_URL = '/thumbnails/'
+MEME_THUMBNAIL_SIZES = (160, 480, 960)
+MEME_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+MEME_IMAGE_MAX_PIXELS = 40_000_000
+MEME_IMAGE_FETCH_TIMEOUT = 10
+MEME_IMAGE_WORKERS = 4
+# Yerel ağ adreslerinden görsel indirilmez; yalnızca geliştirme ortamında açılmalı
+MEME_IMAGE_ALLOW_PRIVATE_HOSTS = False
+
+# Zamanlayıcı çarkı ara güncellemeleri kaç saniyede bir yayınlar
+TIMER_CHECKPOINT_SECONDS = 10
+
+# İstemcinin başlatabileceği en uzun zamanlayıcı (saniye); daha uzun istekler bu süreye kısaltılır
+TIMER_MAX_SECONDS = 10 * 60
+
+# Oylama aşamasının süresi (saniye); geçişleri run_round_scheduler komutu tetikler
+ROUND_VOTING_SECONDS = 60
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": os.path.join(BASE_DIR, 'db.sqlite3'),
+# Veritabanı profili (DB_PROFILE): 'sqlite' yerel dosya veritabanı, 'postgres' üretim profili
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get('POSTGRES_DB', 'memeroyale'),
+            "USER": os.environ.get('POSTGRES_USER', 'memeroyale'),
+            "PASSWORD": os.environ.get('POSTGRES_PASSWORD', ''),
+            "HOST": os.environ.get('POSTGRES_HOST', '127.0.0.1'),
+            "PORT": os.environ.get('POSTGRES_PORT', '5432'),
+            "CONN_HEALTH_CHECKS": True,
+        }
     }
+    if os.environ.get('POSTGRES_POOL', '1') == '1':
+        # psycopg havuzu (psycopg[pool]); ASGI altında thread'ler bağlantıları havuzdan ödünç alır.
+        # Havuz kalıcı bağlantılarla (CONN_MAX_AGE) birlikte kullanılamaz
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": 2,
+                "max_size": int(os.environ.get('POSTGRES_POOL_SIZE', 20)),
+                "timeout": 10,  # Havuz doluyken bağlantı için beklenecek süre (saniye)
+            },
+        }
+    else:
+        # Havuz yoksa her thread bağlantısını istekler arasında açık tutar
+        DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get('POSTGRES_CONN_MAX_AGE', 60))
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(BASE_DIR, 'db.sqlite3'),
+            "OPTIONS": {
+                # Kilitli veritabanında hata vermeden önce beklenecek süre (saniye)
+                "timeout": 20,
+                # Yazma kilidi transaction başında alınır; okuyup sonra yazan transaction'lar
+                # kilit yükseltirken beklemeden "database is locked" hatası almaz
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown DB_PROFILE {DB_PROFILE!r}, use 'sqlite' or 'postgres'.")
+
+# Okuma replikaları (DB_REPLICAS, virgülle ayrılmış): SQLite profilinde dosya yolları,
+# PostgreSQL profilinde 'host[:port][/veritabanı]'. Yerelde bir SQLite replikası db.sqlite3'ün
+# kopyasıyla (sqlite3 db.sqlite3 ".backup replica.sqlite3") kurulabilir. Testlerde replikalar
+# birincilin aynası olarak kullanılır. Yönlendirme: MemeRoyale/db_router.py
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    config = copy.deepcopy(DATABASES["default"])
+    if DB_PROFILE == 'sqlite':
+        config["NAME"] = replica.strip()
+    else:
+        address, _, name = replica.strip().partition('/')
+        host, _, port = address.partition(':')
+        config.update(HOST=host, PORT=port or config["PORT"], NAME=name or config["NAME"])
+    config["TEST"] = {"MIRROR": "default"}
+    DATABASES[f"replica{index}"] = config
+    DATABASE_REPLICAS.append(f"replica{index}")
+
+DATABASE_ROUTERS = ["MemeRoyale.db_router.ReplicaRouter"] if DATABASE_REPLICAS else []
+
+# Yazma yapan istemcinin sonraki istekleri bu süre (saniye) boyunca birincilden okur
+REPLICA_PIN_SECONDS = 5
+
+# Her yeni SQLite bağlantısında uygulanan PRAGMA'lar (api/signals.py). WAL okuyucularla yazıcının
+# birbirini beklemesini kaldırır, WAL'da synchronous=NORMAL her commit'te fsync yapmaz,
+# mmap_size okumaları belleğe eşlenmiş dosya üzerinden yapar
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
 }
 
 AUTH_USER_MODEL = "api.User"
 
+# Cache
+# Lobi yanıtı süreç içi bellekte tutulur ve kayıt sinyalleriyle temizlenir. Birden fazla
+# worker varsa diğer süreçlerdeki kopyalar en fazla HOME_CACHE_TIMEOUT saniye eski kalır;
+# BACKEND'i django.core.cache.backends.redis.RedisCache yapmak bu gecikmeyi kaldırır.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+HOME_CACHE_TIMEOUT = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -171,4 +327,5 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Cors settings configuration
 CORS_ORIGIN_ALLOW_ALL = True
-CORS_ALLOWS_CREDENTIALS = True
+# Çerezlerin (ör. db_pin) çapraz origin isteklerde geri gelmesi için gerekir
+CORS_ALLOW_CREDENTIALS = True
@@ -0,0 +1,99 @@
+import asyncio
+import time
+import weakref
+from collections import deque
+
+
+class TokenBucket:
+    """
+    Saniyede `rate` token dolan, en fazla `burst` token biriktiren sınırlayıcı.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def consume(self, tokens=1):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+
+# Aynı süreçteki bağlantılar oda kovasını paylaşır; son bağlantı kapanınca kova silinir
+_room_buckets = weakref.WeakValueDictionary()
+
+
+def get_room_bucket(group_name, rate, burst):
+    bucket = _room_buckets.get(group_name)
+    if bucket is None:
+        bucket = _room_buckets[group_name] = TokenBucket(rate, burst)
+    return bucket
+
+
+class Outbox:
+    """
+    Bağlantı başına sınırlı giden mesaj kuyruğu.
+
+    Kuyruk dolduğunda düşük öncelikli akışların (sohbet, presence) mesajları
+    atılır; kuyruk boşaldığında atılan mesaj sayıları on_dropped ile bildirilir,
+    böylece istemciye tek bir özet ya da güncel durum gönderilebilir. Yüksek
+    öncelikli mesajlar için yer açılamazsa put() False döndürür.
+    """
+
+    def __init__(self, send, size, low_priority, on_dropped):
+        self.send = send
+        self.size = size
+        self.low_priority = set(low_priority)
+        self.on_dropped = on_dropped
+        self.dropped = {}  # akış -> atılan mesaj sayısı
+        self._queue = deque()  # (akış, metin)
+        self._task = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, stream, text_data):
+        if len(self._queue) >= self.size:
+            if stream in self.low_priority:
+                self._drop(stream)
+                return True
+            # Yer açmak için kuyruktaki en eski düşük öncelikli mesaj atılır
+            for index, (queued_stream, _) in enumerate(self._queue):
+                if queued_stream in self.low_priority:
+                    del self._queue[index]
+                    self._drop(queued_stream)
+                    break
+            else:
+                return False
+
+        self._queue.append((stream, text_data))
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+        return True
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._queue.clear()
+
+    def _drop(self, stream):
+        self.dropped[stream] = self.dropped.get(stream, 0) + 1
+
+    async def _drain(self):
+        try:
+            while self._queue:
+                _, text_data = self._queue.popleft()
+                await self.send(text_data=text_data)
+
+                if not self._queue and self.dropped:
+                    dropped, self.dropped = self.dropped, {}
+                    await self.on_dropped(dropped)
+        finally:
+            self._task = None
@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+
+import redis
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from . import redis_pool
+
+logger = logging.getLogger(__name__)
+
+
+class TimerAlreadyRunning(Exception):
+    """
+    Aynı oda için zaten çalışan bir zamanlayıcı var.
+    """
+
+
+def get_redis():
+    """
+    Zamanlayıcı sahipliğini işaretlemek için kullanılan Redis istemcisini döndürür.
+    """
+    return redis_pool.get_async_redis()
+
+
+def timer_key(group_name):
+    return f"timer:{group_name}"
+
+
+class TimerWheel:
+    """
+    Süreç başına tek bir asyncio zamanlayıcı çarkı.
+
+    Tüm oda bitiş zamanları bir heap içinde tutulur ve tek bir görev tarafından
+    işlenir. Gruplara yalnızca bitiş anında ve kaba ara noktalarda
+    `timer_update` yayınlanır; istemciler `ends_at` ile geri sayımı kendileri yapar.
+    """
+
+    def __init__(self, checkpoint=None):
+        self.checkpoint = checkpoint
+        self._heap = []  # (tetiklenme zamanı, grup adı, bitiş zamanı)
+        self._deadlines = {}  # grup adı -> bitiş zamanı
+        self._task = None
+        self._wakeup = None
+
+    def get_checkpoint(self):
+        if self.checkpoint is not None:
+            return self.checkpoint
+        return getattr(settings, 'TIMER_CHECKPOINT_SECONDS', 10)
+
+    def ends_at(self, group_name):
+        return self._deadlines.get(group_name)
+
+    def get_max_seconds(self):
+        return getattr(settings, 'TIMER_MAX_SECONDS', 10 * 60)
+
+    async def schedule(self, group_name, seconds):
+        """
+        Grup için yeni bir zamanlayıcı başlatır ve mutlak bitiş zamanını döndürür.
+        Süre TIMER_MAX_SECONDS ile sınırlanır.
+        """
+        if not math.isfinite(seconds) or seconds <= 0:
+            raise ValueError(f"Invalid timer duration {seconds!r}")
+        seconds = min(seconds, self.get_max_seconds())
+
+        if group_name in self._deadlines:
+            raise TimerAlreadyRunning(group_name)
+
+        ends_at = time.time() + seconds
+
+        # Başka bir worker aynı oda için zamanlayıcı başlattıysa reddet
+        claimed = await get_redis().set(
+            timer_key(group_name), repr(ends_at), nx=True, px=max(int(seconds * 1000), 1)
+        )
+        if not claimed or group_name in self._deadlines:
+            raise TimerAlreadyRunning(group_name)
+
+        self._deadlines[group_name] = ends_at
+
+        # İlk ara nokta, kalan süre checkpoint'in tam katı olacak şekilde seçilir
+        checkpoint = self.get_checkpoint()
+        first_fire = ends_at - (math.ceil(seconds / checkpoint) - 1) * checkpoint
+        heapq.heappush(self._heap, (first_fire, group_name, ends_at))
+
+        self._ensure_running()
+        await self._broadcast(group_name, ends_at)
+        return ends_at
+
+    async def cancel(self, group_name):
+        # Heap'teki kayıtlar tetiklendiğinde geçersiz sayılır
+        ends_at = self._deadlines.pop(group_name, None)
+        if ends_at is None:
+            return False
+        await self._release(group_name, ends_at)
+        return True
+
+    async def _release(self, group_name, ends_at):
+        """
+        Redis kaydını yalnızca hâlâ bu zamanlayıcıya aitse siler; diğer worker'lar
+        süresinin dolmasını beklemeden oda için yeni zamanlayıcı başlatabilir.
+        """
+        key = timer_key(group_name)
+        try:
+            async with get_redis().pipeline(transaction=True) as pipe:
+                await pipe.watch(key)
+                if await pipe.get(key) == repr(ends_at).encode():
+                    pipe.multi()
+                    pipe.delete(key)
+                    await pipe.execute()
+        except redis.WatchError:
+            # Kayıt bu arada değişti, artık başka bir zamanlayıcıya ait
+            pass
+        except redis.RedisError:
+            logger.exception("Timer key could not be released for %s", group_name)
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        else:
+            self._wakeup.set()
+
+    async def _run(self):
+        while self._heap:
+            fire_at, group_name, ends_at = self._heap[0]
+            delay = fire_at - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+
+            # İptal edilmiş ya da yenisiyle değiştirilmiş zamanlayıcı
+            if self._deadlines.get(group_name) != ends_at:
+                continue
+
+            finished = fire_at >= ends_at
+            if finished:
+                del self._deadlines[group_name]
+            else:
+                next_fire = min(fire_at + self.get_checkpoint(), ends_at)
+                heapq.heappush(self._heap, (next_fire, group_name, ends_at))
+
+            await self._broadcast(group_name, ends_at)
+            if finished:
+                await self._release(group_name, ends_at)
+
+    async def _broadcast(self, group_name, ends_at):
+        now = time.time()
+        try:
+            await get_channel_layer().group_send(
+                group_name,
+                {
+                    'type': 'timer_update',
+                    'ends_at': ends_at,
+                    'server_time': now,
+                    'time_left': max(round(ends_at - now), 0),
+                }
+            )
+        except Exception:
+            logger.exception("Timer broadcast failed for %s", group_name)
+
+
+timer_wheel = TimerWheel()
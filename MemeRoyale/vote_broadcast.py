@@ -0,0 +1,101 @@
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from api import vote_tally
+
+logger = logging.getLogger(__name__)
+
+
+async def load_totals(meme_ids):
+    # Redis modunda sayılar paylaşılan asyncio istemcisiyle okunur, yalnızca veritabanı okuması thread'e geçer
+    if vote_tally.is_enabled():
+        return await vote_tally.aget_totals(meme_ids)
+    return await sync_to_async(vote_tally.load_totals)(meme_ids)
+
+
+class VoteAggregator:
+    """
+    Bir odanın oy olaylarını pencere boyunca biriktiren süreç içi toplayıcı.
+
+    Pencere sonunda değişen meme'lerin güncel toplamları tek bir okuma ile alınır
+    ve bu süreçteki tüm bağlı istemcilere sıra numaralı tek bir `vote_update`
+    çerçevesi olarak gönderilir. Çerçeve yalnızca bir önceki çerçeveden bu yana
+    değişen meme'leri içerir.
+    """
+
+    def __init__(self, group_name, window=None):
+        self.group_name = group_name
+        self.window = window
+        self.subscribers = set()
+        self.seq = 0
+        self._dirty = set()
+        self._last_totals = {}
+        self._task = None
+
+    def get_window(self):
+        if self.window is not None:
+            return self.window
+        return getattr(settings, 'VOTE_BROADCAST_WINDOW_MS', 150) / 1000
+
+    def mark(self, meme_id):
+        self._dirty.add(meme_id)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.get_window())
+        dirty, self._dirty = self._dirty, set()
+        self._task = None
+
+        try:
+            totals = await load_totals(dirty)
+        except Exception:
+            logger.exception("Vote totals could not be loaded for %s", self.group_name)
+            return
+
+        changed = {
+            meme_id: total for meme_id, total in totals.items()
+            if self._last_totals.get(meme_id) != total
+        }
+        if not changed:
+            return
+        self._last_totals.update(changed)
+        self.seq += 1
+
+        totals = {str(meme_id): total for meme_id, total in changed.items()}
+        # Çerçeve her consumer sınıfının biçimi için bir kez kodlanır
+        frames = {}
+        for consumer in list(self.subscribers):
+            encode = type(consumer).encode
+            if encode not in frames:
+                frames[encode] = consumer.encode('vote', 'vote_update', seq=self.seq, totals=totals)
+            await consumer.push('vote', frames[encode])
+
+
+_aggregators = {}
+
+
+def subscribe(group_name, consumer):
+    aggregator = _aggregators.get(group_name)
+    if aggregator is None:
+        aggregator = _aggregators[group_name] = VoteAggregator(group_name)
+    aggregator.subscribers.add(consumer)
+    return aggregator
+
+
+def unsubscribe(group_name, consumer):
+    aggregator = _aggregators.get(group_name)
+    if aggregator is None:
+        return
+    aggregator.subscribers.discard(consumer)
+    if not aggregator.subscribers:
+        aggregator.close()
+        del _aggregators[group_name]
@@ -1,8 +1,9 @@
 from django.contrib import admin
-from .models import User, Room, Round, Meme, Vote
+from .models import User, Room, Round, Meme, Vote, RoundResult
 
 admin.site.register(User)
 admin.site.register(Room)
 admin.site.register(Round)
 admin.site.register(Meme)
 admin.site.register(Vote)
+admin.site.register(RoundResult)
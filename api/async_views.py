@@ -0,0 +1,178 @@
+"""
+Oyun sırasında en sık çağrılan uç noktaların async (native coroutine) sürümleri.
+
+DRF view'ları senkron olduğu için ASGI altında her istek bir thread'e aktarılır.
+Buradaki view'lar Django'nun async ORM API'sini kullanır, JWT doğrulamasını
+kendileri yapar ve değişiklikleri kanal katmanına event loop üzerinden yayınlar.
+"""
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import URLValidator
+from django.db import IntegrityError
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from . import events, presence, vote_tally
+from .models import User, Room, Round, Meme, Vote
+from .serializers import RoundDetailSerializer
+from .views import MEME_CARD_FIELDS
+
+jwt_authentication = JWTAuthentication()
+
+
+def get_id(data, field):
+    # Geçersiz id'ler sorguya None olarak gider ve kayıt bulunamaz
+    value = data.get(field)
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+class AsyncAPIView(View):
+    """
+    JWT ile kimlik doğrulayan async view tabanı.
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token ile doğrulanan API çağrılarında CSRF kontrolü yapılmaz (DRF APIView ile aynı)
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await self.authenticate(request)
+        if user is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'}, status=401
+            )
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        header = jwt_authentication.get_header(request)
+        raw_token = jwt_authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            token = jwt_authentication.get_validated_token(raw_token)
+            return await User.objects.aget(pk=token[api_settings.USER_ID_CLAIM], is_active=True)
+        except (InvalidToken, TokenError, KeyError, User.DoesNotExist):
+            return None
+
+    def get_data(self):
+        try:
+            data = json.loads(self.request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+
+class AsyncMemeCreateView(AsyncAPIView):
+    """
+    Meme gönderme işleminin async sürümü; meme kartı odaya anında yayınlanır.
+    """
+
+    async def post(self, request):
+        data = self.get_data()
+        if data is None:
+            return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+
+        try:
+            URLValidator()(data.get('image_url') or '')
+        except DjangoValidationError:
+            return JsonResponse({'image_url': ['Enter a valid URL.']}, status=400)
+
+        round_ = await Round.objects.filter(pk=get_id(data, 'round')).only('id', 'room_id', 'voting_ended').afirst()
+        if round_ is None:
+            return JsonResponse({'round': ['Invalid round.']}, status=400)
+        if round_.voting_ended:
+            return JsonResponse({'error': 'Round has already ended.'}, status=409)
+
+        meme = await Meme.objects.acreate(
+            round=round_, creator=request.user,
+            image_url=data['image_url'], caption=str(data.get('caption', '')),
+        )
+        event = events.meme_created_event(meme)
+        await events.apublish(round_.room_id, event)
+        return JsonResponse(event['meme'], status=201)
+
+
+class AsyncVoteCreateView(AsyncAPIView):
+    """
+    Oy verme işleminin async sürümü; oy olayı odanın oy toplayıcısına iletilir.
+    """
+
+    async def post(self, request):
+        data = self.get_data()
+        if data is None:
+            return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+
+        meme = await Meme.objects.filter(pk=get_id(data, 'meme')).select_related('round').only(
+            'id', 'round_id', 'round__room_id', 'round__voting_ended'
+        ).afirst()
+        if meme is None:
+            return JsonResponse({'meme': ['Invalid meme.']}, status=400)
+
+        if vote_tally.is_enabled():
+            # Redis modunda oy önce Redis'e yazılır, veritabanına toplu olarak aktarılır
+            try:
+                if meme.round.voting_ended:
+                    raise vote_tally.VotingClosed(meme.round_id)
+                if not await vote_tally.arecord_vote(meme.round_id, meme.id, request.user.pk):
+                    return JsonResponse(['You have already voted for this meme.'], safe=False, status=400)
+            except vote_tally.VotingClosed:
+                return JsonResponse(['Voting has ended for this round.'], safe=False, status=400)
+        else:
+            try:
+                await Vote.objects.acreate(meme=meme, voter=request.user)
+            except IntegrityError:
+                return JsonResponse(['You have already voted for this meme.'], safe=False, status=400)
+
+        await events.apublish(meme.round.room_id, events.vote_cast_event(meme.id))
+        return JsonResponse({
+            'meme': meme.id,
+            'voter': request.user.pk,
+            'round': meme.round_id,
+        }, status=201)
+
+
+class AsyncJoinRoomView(AsyncAPIView):
+    """
+    Odaya katılma işleminin async sürümü.
+    """
+    use_replica = False  # GET ile yazma yapar, kapasite kontrolü birincilden okunmalı
+
+    async def get(self, request, room_id):
+        room = await Room.objects.filter(id=room_id).only(
+            'id', 'name', 'max_capacity', 'participant_count'
+        ).afirst()
+        if room is None:
+            return JsonResponse({'error': 'Room not found.'}, status=404)
+
+        if not await room.aadd_participant(request.user):
+            return JsonResponse({'error': 'Room is full.'}, status=409)
+
+        roster = await presence.aget_roster(room.id)
+        return JsonResponse({
+            'message': f"Successfully joined room: {room.name}",
+            'room_name': room.name,
+            'participants': [participant['username'] for participant in roster],
+        })
+
+
+class AsyncRoundDetailView(AsyncAPIView):
+    """
+    Round bilgilerini meme kartlarıyla birlikte döndüren async view.
+    """
+
+    async def get(self, request, pk):
+        round_ = await Round.objects.prefetch_related(
+            Prefetch('memes', queryset=Meme.objects.select_related('creator').only(*MEME_CARD_FIELDS).order_by('created_at'))
+        ).filter(pk=pk).afirst()
+        if round_ is None:
+            return JsonResponse({'detail': 'No Round matches the given query.'}, status=404)
+        return JsonResponse(RoundDetailSerializer(round_).data)
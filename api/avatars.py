@@ -0,0 +1,185 @@
+"""
+Profil resimleri.
+
+Yüklenen dosya belleğe alınmadan geçici dosyaya yazılır (AvatarUploadHandler) ve
+bu sırada SHA-256 özeti hesaplanır. Boyutu ve ölçüleri doğrulanan orijinal, özetiyle
+adlandırılarak bir kez saklanır; sabit boyutlu kare avatarlar süreç içindeki thread
+havuzunda üretilir. Aynı içerik daha önce işlendiyse avatarlar yeniden üretilmez.
+Herkese açık serializer'lar orijinali değil yalnızca avatarları sunar.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .cache import invalidate_home_payload
+from .thumbnails import FORMATS, encode, thumbnail_name, write
+
+logger = logging.getLogger(__name__)
+
+
+def get_max_bytes():
+    return getattr(settings, 'PROFILE_PICTURE_MAX_BYTES', 5 * 1024 * 1024)
+
+
+def get_dimension_limits():
+    return (
+        getattr(settings, 'PROFILE_PICTURE_MIN_DIMENSION', 64),
+        getattr(settings, 'PROFILE_PICTURE_MAX_DIMENSION', 4096),
+    )
+
+
+def get_sizes():
+    return sorted(getattr(settings, 'AVATAR_SIZES', (48, 128)), reverse=True)
+
+
+def avatar_urls(image_hash):
+    prefix = settings.AVATAR_URL
+    return {
+        str(size): {extension: prefix + thumbnail_name(image_hash, size, extension) for extension, _, _ in FORMATS}
+        for size in sorted(get_sizes())
+    }
+
+
+def avatars_exist(image_hash):
+    return all(
+        os.path.exists(os.path.join(settings.AVATAR_ROOT, thumbnail_name(image_hash, size, extension)))
+        for size in get_sizes() for extension, _, _ in FORMATS
+    )
+
+
+class AvatarUploadHandler(TemporaryFileUploadHandler):
+    """
+    Yüklenen dosyayı parça parça geçici dosyaya yazar ve özetini hesaplar.
+    PROFILE_PICTURE_MAX_BYTES'ı aşan kısım diske yazılmaz; dosya boyut
+    doğrulamasında reddedilir.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.max_bytes = get_max_bytes()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            return None
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+def hash_file(file):
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks():
+        sha256.update(chunk)
+    file.seek(0)
+    return sha256.hexdigest()
+
+
+def attach(user, upload):
+    """
+    Doğrulanmış yüklemeyi kullanıcının profil resmi yapar (kaydetmez).
+    Aynı içerik daha önce yüklendiyse orijinal yeniden yazılmaz, avatarları
+    da hazırsa kullanıcı doğrudan hazır durumuna geçer.
+    """
+    from .models import User
+
+    if upload is None:
+        user.profile_picture = None
+        user.avatar_hash, user.avatar_status = '', User.AVATAR_NONE
+        return
+
+    image_hash = getattr(upload, 'sha256', None) or hash_file(upload)
+    name = f"profile_pictures/{image_hash[:2]}/{image_hash}.{upload.image.format.lower()}"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, upload)
+    user.profile_picture = name
+    user.avatar_hash = image_hash
+    user.avatar_status = User.AVATAR_READY if avatars_exist(image_hash) else User.AVATAR_PENDING
+
+
+def render(file, image_hash):
+    """
+    Orijinalden her boyut ve biçim için kare avatar üretip diske yazar.
+    """
+    sizes = get_sizes()
+    with file.open('rb'), Image.open(file) as image:
+        image.draft('RGB', (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    # İlk adım ortadan kare kırpar, sonrakiler bir önceki avatarı küçültür
+    for size in sizes:
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        for extension, content in encode(image, has_alpha):
+            write(thumbnail_name(image_hash, size, extension), content, root=settings.AVATAR_ROOT)
+
+
+def process_avatar(user_id, image_hash):
+    """
+    Bekleyen profil resminin avatarlarını üretir ve kullanıcının durumunu günceller.
+    Kullanıcı bu arada başka bir resim yüklediyse hiçbir şey yapmaz.
+    """
+    from .models import User
+
+    user = User.objects.filter(
+        pk=user_id, avatar_hash=image_hash, avatar_status=User.AVATAR_PENDING
+    ).only('profile_picture').first()
+    if user is None:
+        return None
+
+    avatar_status = User.AVATAR_READY
+    if not avatars_exist(image_hash):
+        try:
+            render(user.profile_picture, image_hash)
+        except (OSError, ValueError, Image.DecompressionBombError) as error:
+            logger.warning("Avatars for user %s could not be created: %s", user_id, error)
+            avatar_status = User.AVATAR_FAILED
+
+    User.objects.filter(pk=user_id, avatar_hash=image_hash).update(avatar_status=avatar_status)
+    # Lobi kartları avatarları içerdiği için önbellek temizlenir
+    invalidate_home_payload()
+    return avatar_status
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(getattr(settings, 'AVATAR_WORKERS', 2), thread_name_prefix='avatar')
+        return _executor
+
+
+def run(user_id, image_hash):
+    try:
+        process_avatar(user_id, image_hash)
+    except Exception:
+        logger.exception("Avatar processing failed for user %s", user_id)
+    finally:
+        # Havuz thread'inin bağlantısı işler arasında açık kalmaz
+        connection.close()
+
+
+def schedule(user):
+    """
+    Kullanıcının bekleyen avatarlarını transaction tamamlandıktan sonra havuza verir.
+    """
+    if user.avatar_status == user.AVATAR_PENDING:
+        user_id, image_hash = user.pk, user.avatar_hash
+        transaction.on_commit(lambda: get_executor().submit(run, user_id, image_hash))
@@ -0,0 +1,29 @@
+"""
+Ana sayfa (lobi) yanıtı için önbellek yardımcıları.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+HOME_PAYLOAD_KEY = 'home:payload'
+
+
+def get_home_payload(build):
+    """
+    Önbellekteki (veri, etag) çiftini döndürür; yoksa build() ile üretip önbelleğe yazar.
+    """
+    cached = cache.get(HOME_PAYLOAD_KEY)
+    if cached is None:
+        data = build()
+        body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()
+        cached = (data, f'"{hashlib.md5(body).hexdigest()}"')
+        cache.set(HOME_PAYLOAD_KEY, cached, getattr(settings, 'HOME_CACHE_TIMEOUT', 30))
+    return cached
+
+
+def invalidate_home_payload():
+    cache.delete(HOME_PAYLOAD_KEY)
+
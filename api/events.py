@@ -0,0 +1,54 @@
+"""
+REST üzerinden yapılan değişiklikleri odanın oyun grubuna yayınlayan olay yayıncısı.
+
+İstemciler meme ve oy değişikliklerini yoklama yapmadan ya da başka bir istemcinin
+aktarmasını beklemeden, sunucunun kaydettiği veriden öğrenir. Senkron kodda olaylar
+transaction commit edildikten sonra gönderilir.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def room_group_name(room_id):
+    # MemeRoyale.consumers.get_room_group_name ile aynı ad
+    return f"game_{room_id}"
+
+
+def meme_created_event(meme):
+    from .serializers import MemeCardSerializer
+
+    return {'type': 'meme_created', 'meme': MemeCardSerializer(meme).data}
+
+
+def meme_thumbnails_event(meme):
+    # Küçük resimler meme gönderildikten sonra görsel worker'ında hazırlanır
+    return {'type': 'meme_thumbnails', 'meme': meme.id, 'thumbnails': meme.thumbnails}
+
+
+def vote_cast_event(meme_id):
+    # Toplamlar olaydan değil, oy toplayıcının kayıttan okumasından gelir
+    return {'type': 'vote_cast', 'meme': meme_id}
+
+
+def publish(room_id, event):
+    try:
+        async_to_sync(get_channel_layer().group_send)(room_group_name(room_id), event)
+    except Exception:
+        # Yayın hatası isteği başarısız saymaz, istemciler sonraki okumada güncel veriyi görür
+        logger.exception("Event %s could not be published to room %s", event['type'], room_id)
+
+
+def publish_on_commit(room_id, event):
+    transaction.on_commit(lambda: publish(room_id, event))
+
+
+async def apublish(room_id, event):
+    try:
+        await get_channel_layer().group_send(room_group_name(room_id), event)
+    except Exception:
+        logger.exception("Event %s could not be published to room %s", event['type'], room_id)
@@ -0,0 +1,124 @@
+"""
+Oyuncu sıralamalarını Redis sorted set'lerinde tutan liderlik tablosu.
+
+    leaderboard:<kapsam>:wins       ZSET  kullanıcı id -> kazanılan oyun sayısı
+    leaderboard:<kapsam>:played     ZSET  kullanıcı id -> oynanan oyun sayısı
+    leaderboard:<kapsam>:win_rate   ZSET  kullanıcı id -> kazanma oranı (%)
+
+Kapsam 'global' ya da oda temasıdır. Sayılar Round.end_voting ve Room.end_game
+ile artırılır; rebuild_leaderboard komutu tabloları veritabanından yeniden hesaplar.
+"""
+from MemeRoyale import redis_pool
+
+GLOBAL_SCOPE = 'global'
+BOARDS = ('wins', 'played', 'win_rate')
+
+
+def get_redis():
+    return redis_pool.get_redis()
+
+
+def board_key(board, theme=None):
+    return f"leaderboard:{theme or GLOBAL_SCOPE}:{board}"
+
+
+def win_rate(games_won, games_played):
+    # User.win_rate ile aynı hesap
+    if not games_played:
+        return 0
+    return round((games_won / games_played) * 100, 2)
+
+
+def _scopes(theme):
+    return [None, theme] if theme else [None]
+
+
+def _increment(board, user_ids, theme):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    pipe = get_redis().pipeline(transaction=True)
+    for scope in _scopes(theme):
+        for user_id in user_ids:
+            pipe.zincrby(board_key(board, scope), 1, user_id)
+    pipe.execute()
+    _refresh_win_rates(user_ids, theme)
+
+
+def _refresh_win_rates(user_ids, theme):
+    # Oran iki sayaçtan türetildiği için sayaçlar güncellendikten sonra yeniden yazılır.
+    # Sayaç anahtarları izlenir; okuma ile yazma arasında başka bir artış olursa
+    # transaction iptal edilip oranlar güncel sayaçlarla yeniden hesaplanır.
+    entries = [(scope, user_id) for scope in _scopes(theme) for user_id in user_ids]
+    counters = [board_key(board, scope) for scope in _scopes(theme) for board in ('wins', 'played')]
+
+    def write_rates(pipe):
+        scores = [
+            (pipe.zscore(board_key('wins', scope), user_id) or 0, pipe.zscore(board_key('played', scope), user_id) or 0)
+            for scope, user_id in entries
+        ]
+        pipe.multi()
+        for (scope, user_id), (games_won, games_played) in zip(entries, scores):
+            pipe.zadd(board_key('win_rate', scope), {user_id: win_rate(games_won, games_played)})
+
+    get_redis().transaction(write_rates, *counters)
+
+
+def record_wins(user_ids, theme=None):
+    _increment('wins', user_ids, theme)
+
+
+def record_games(user_ids, theme=None):
+    _increment('played', user_ids, theme)
+
+
+def get_page(board, theme=None, start=0, count=20):
+    """
+    Sıralamanın [start, start + count) aralığını [(kullanıcı id, skor)] olarak ve toplam oyuncu sayısıyla döndürür.
+    """
+    key = board_key(board, theme)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zrevrange(key, start, start + count - 1, withscores=True)
+    pipe.zcard(key)
+    rows, total = pipe.execute()
+    return [(int(user_id), score) for user_id, score in rows], total
+
+
+def get_rank(board, user_id, theme=None):
+    """
+    Kullanıcının 1'den başlayan sırasını ve skorunu döndürür; tabloda değilse (None, None).
+    """
+    key = board_key(board, theme)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zrevrank(key, user_id)
+    pipe.zscore(key, user_id)
+    rank, score = pipe.execute()
+    if rank is None:
+        return None, None
+    return rank + 1, score
+
+
+def rebuild(totals, themes):
+    """
+    Tabloları {kapsam: {kullanıcı id: (kazanılan, oynanan)}} verisinden yeniden yazar.
+    Yeni tablolar geçici anahtarlara yazılıp RENAME ile tek adımda yerine konur.
+    """
+    client = get_redis()
+    pipe = client.pipeline(transaction=True)
+    for theme in [None, *themes]:
+        users = totals.get(theme or GLOBAL_SCOPE, {})
+        boards = {
+            'wins': {user_id: won for user_id, (won, _) in users.items() if won},
+            'played': {user_id: played for user_id, (_, played) in users.items() if played},
+            'win_rate': {user_id: win_rate(won, played) for user_id, (won, played) in users.items()},
+        }
+        for board, scores in boards.items():
+            key = board_key(board, theme)
+            if not scores:
+                pipe.delete(key)
+                continue
+            pipe.delete(f"{key}:rebuild")
+            pipe.zadd(f"{key}:rebuild", scores)
+            pipe.rename(f"{key}:rebuild", key)
+    pipe.execute()
@@ -0,0 +1,205 @@
+import json
+import os
+import time
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api import presence
+from api.models import Meme, Room, Round, RoundResult, Vote
+
+
+class Command(BaseCommand):
+    help = (
+        "Bitmiş odaların round, meme, oy ve katılımcı kayıtlarını JSON Lines dosyasına aktarır, "
+        "yerlerine round başına özet sonuç bırakır ve canlı tablolardan siler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help="Yalnızca bu kadar gün önce biten odalar arşivlenir")
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Tek transaction içinde arşivlenen oda sayısı")
+        parser.add_argument('--output', default=None,
+                            help="Arşiv dosyası (varsayılan: BASE_DIR/archive/rooms-<zaman>.jsonl)")
+        parser.add_argument('--pause', type=float, default=0,
+                            help="Canlı trafiği boğmamak için partiler arasında beklenecek süre (saniye)")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Hiçbir şey silmeden arşivlenecek oda sayısını yazar")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # Eskiden kapatılan odalarda end_time yazılmadığı için bu odalarda oluşturulma zamanına bakılır
+        rooms = Room.objects.filter(status='ended', archived_at__isnull=True).filter(
+            Q(end_time__lt=cutoff) | Q(end_time__isnull=True, created_at__lt=cutoff)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f"Arşivlenecek oda: {rooms.count()}")
+            return
+
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'archive', f"rooms-{timezone.now():%Y%m%d%H%M%S}.jsonl"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+        totals = {'rooms': 0, 'rounds': 0, 'memes': 0, 'votes': 0, 'participants': 0}
+        size_before = self.table_bytes()
+        with open(output, 'ab', buffering=0) as archive:
+            while True:
+                room_ids = list(rooms.order_by('id').values_list('id', flat=True)[:options['batch_size']])
+                if not room_ids:
+                    break
+
+                counts = self.archive_batch(room_ids, archive)
+                for key, value in counts.items():
+                    totals[key] += value
+                self.forget_rosters(room_ids)
+
+                if options['pause']:
+                    time.sleep(options['pause'])
+            exported = archive.tell()
+
+        size_after = self.table_bytes()
+        if size_before is None or size_after is None:
+            reclaimed = "geri kazanılan tablo alanı bu veritabanında ölçülemiyor"
+        else:
+            reclaimed = f"tablolarda {size_before - size_after} bayt geri kazanıldı"
+            if connection.vendor == 'postgresql':
+                reclaimed += " (PostgreSQL silinen satırların alanını VACUUM sonrası geri verir)"
+        self.stdout.write(
+            f"{totals['rooms']} oda arşivlendi: {totals['rounds']} round, {totals['memes']} meme, "
+            f"{totals['votes']} oy ve {totals['participants']} katılımcı kaydı silindi, {reclaimed}. "
+            f"Arşiv dosyası {output} ({exported} bayt)."
+        )
+
+    def table_bytes(self):
+        """
+        Silinen kayıtların tablolarının (indeksleriyle) kapladığı bayt; ölçülemiyorsa None.
+        SQLite'ta sayfalardaki dolu alan dbstat'tan, PostgreSQL'de ilişki boyutundan okunur.
+        """
+        tables = [model._meta.db_table for model in (Vote, Meme, Round, Room.participants.through)]
+        placeholders = ', '.join(['%s'] * len(tables))
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                try:
+                    cursor.execute(
+                        f"SELECT SUM(pgsize - unused) FROM dbstat WHERE name IN "
+                        f"(SELECT name FROM sqlite_master WHERE tbl_name IN ({placeholders}))",
+                        tables,
+                    )
+                except OperationalError:
+                    # SQLite dbstat desteği olmadan derlenmiş
+                    return None
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"SELECT SUM(pg_total_relation_size(name::regclass)) FROM unnest(ARRAY[{placeholders}]) AS name",
+                    tables,
+                )
+            else:
+                return None
+            return cursor.fetchone()[0] or 0
+
+    def archive_batch(self, room_ids, archive):
+        """
+        Bir parti odayı tek transaction içinde dışa aktarır ve canlı tablolardan siler.
+        Satırlar silinmeden önce arşiv dosyasına yazılıp diske indirilir; yazma hata
+        verirse dosya eski boyutuna döner ve transaction geri alınır.
+        """
+        through = Room.participants.through
+
+        with transaction.atomic():
+            rooms = list(Room.objects.filter(pk__in=room_ids).values(
+                'id', 'name', 'host_id', 'theme', 'created_at', 'start_time', 'end_time'
+            ))
+            rounds = list(Round.objects.filter(room_id__in=room_ids).values(
+                'id', 'room_id', 'theme', 'winner_id', 'created_at'
+            ))
+            memes = list(Meme.objects.filter(round__room_id__in=room_ids).values(
+                'id', 'round_id', 'creator_id', 'image_url', 'caption', 'vote_count', 'created_at'
+            ))
+            votes = list(Vote.objects.filter(round__room_id__in=room_ids).values_list('round_id', 'meme_id', 'voter_id'))
+            participants = list(through.objects.filter(room_id__in=room_ids).values_list('room_id', 'user_id'))
+
+            self.export(archive, self.build_lines(rooms, rounds, memes, votes, participants))
+
+            memes_by_round = {}
+            for meme in memes:
+                memes_by_round.setdefault(meme['round_id'], []).append(
+                    {'meme': meme['id'], 'creator': meme['creator_id'], 'votes': meme['vote_count']}
+                )
+            RoundResult.objects.bulk_create([
+                RoundResult(
+                    room_id=game_round['room_id'], round_id=game_round['id'], theme=game_round['theme'],
+                    winner_id=game_round['winner_id'], meme_totals=memes_by_round.get(game_round['id'], []),
+                    played_at=game_round['created_at'],
+                )
+                for game_round in rounds
+            ])
+
+            # Kayıtlar tek tek yüklenip sinyal gönderilmesin diye doğrudan DELETE çalıştırılır;
+            # silinen satırlara başka tablolardan referans kalmadığı için cascade gerekmez.
+            counts = {
+                'rooms': len(rooms),
+                'votes': Vote.objects.filter(round__room_id__in=room_ids)._raw_delete(Vote.objects.db),
+                'memes': Meme.objects.filter(round__room_id__in=room_ids)._raw_delete(Meme.objects.db),
+                'rounds': Round.objects.filter(room_id__in=room_ids)._raw_delete(Round.objects.db),
+                'participants': through.objects.filter(room_id__in=room_ids)._raw_delete(through.objects.db),
+            }
+            Room.objects.filter(pk__in=room_ids).update(archived_at=timezone.now(), participant_count=0)
+
+        return counts
+
+    def export(self, archive, lines):
+        # Commit arşiv diskteyken yapılır; commit başarısız olursa odalar bir sonraki
+        # çalıştırmada yeniden aktarılır, hiçbir oda yalnızca veritabanından silinmiş olmaz.
+        position = archive.tell()
+        try:
+            data = memoryview(''.join(line + '\n' for line in lines).encode('utf-8'))
+            while data:
+                data = data[archive.write(data):]
+            os.fsync(archive.fileno())
+        except BaseException:
+            archive.truncate(position)
+            archive.seek(position)
+            raise
+
+    def build_lines(self, rooms, rounds, memes, votes, participants):
+        rounds_by_room = {}
+        for game_round in rounds:
+            game_round = {**game_round, 'memes': []}
+            rounds_by_room.setdefault(game_round['room_id'], []).append(game_round)
+        rounds_by_id = {game_round['id']: game_round for room_rounds in rounds_by_room.values() for game_round in room_rounds}
+
+        memes_by_id = {}
+        for meme in memes:
+            meme = {**meme, 'voters': []}
+            memes_by_id[meme['id']] = meme
+            rounds_by_id[meme['round_id']]['memes'].append(meme)
+        for _, meme_id, voter_id in votes:
+            memes_by_id[meme_id]['voters'].append(voter_id)
+
+        participants_by_room = {}
+        for room_id, user_id in participants:
+            participants_by_room.setdefault(room_id, []).append(user_id)
+
+        return [
+            json.dumps({
+                **room,
+                'participants': participants_by_room.get(room['id'], []),
+                'rounds': rounds_by_room.get(room['id'], []),
+            }, default=str)
+            for room in rooms
+        ]
+
+    def forget_rosters(self, room_ids):
+        # Arşivlenen odaların presence önbelleği TTL'ini beklemeden silinir
+        try:
+            presence.get_redis().delete(*[presence.roster_key(room_id) for room_id in room_ids])
+        except redis.RedisError:
+            pass
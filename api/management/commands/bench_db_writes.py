@@ -0,0 +1,115 @@
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from api.models import Meme, Room, Round, User, Vote
+
+
+class Command(BaseCommand):
+    help = (
+        "Etkin veritabanı profilinde (DB_PROFILE) eş zamanlı oy ve odaya katılma yazılarını "
+        "thread'lerden, her biri kendi bağlantısıyla çalıştırır; saniyede yazma, gecikme ve "
+        "kilit hatalarını raporlar. Geçici kayıtlar sonunda silinir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Eş zamanlı yazan thread sayısı")
+        parser.add_argument('--votes', type=int, default=2000)
+        parser.add_argument('--joins', type=int, default=400)
+        parser.add_argument('--room-size', type=int, default=8, help="Katılma testindeki oda kapasitesi")
+
+    def handle(self, *args, **options):
+        prefix = f"dbbench-{uuid.uuid4().hex[:8]}"
+        users = User.objects.bulk_create(
+            [User(username=f"{prefix}-{i}") for i in range(max(options['votes'], options['joins']))]
+        )
+        host = users[0]
+        room = Room.objects.create(name=prefix, host=host)
+        round_ = Round.objects.create(room=room, theme='bench', meme_submission_end_time=timezone.now())
+        memes = [
+            Meme.objects.create(round=round_, creator=host, image_url=f'http://example.com/{prefix}/{i}.jpg')
+            for i in range(4)
+        ]
+        room_size = options['room_size']
+        join_rooms = Room.objects.bulk_create([
+            Room(name=f"{prefix}-{i}", host=host, max_capacity=room_size)
+            for i in range((options['joins'] + room_size - 1) // room_size)
+        ])
+
+        # Her oy ayrı bir kullanıcıdan gelir; katılımlar odaları sırayla doldurur
+        cases = [
+            ('vote', [
+                (lambda i=i: Vote.objects.create(meme=memes[i % len(memes)], voter=users[i]))
+                for i in range(options['votes'])
+            ]),
+            ('join', [
+                (lambda i=i: join_rooms[i // room_size].add_participant(users[i]))
+                for i in range(options['joins'])
+            ]),
+        ]
+
+        try:
+            self.stdout.write(self.describe_database())
+            self.stdout.write(f"{'write':<8}{'count':>7}{'writes/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+            for name, tasks in cases:
+                elapsed, latencies, errors = self.bench(tasks, options['workers'])
+                latencies.sort()
+                self.stdout.write(
+                    f"{name:<8}{len(tasks):>7}{(len(tasks) - sum(errors.values())) / elapsed:>10.1f}"
+                    f"{statistics.median(latencies) * 1000:>9.1f}"
+                    f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:>9.1f}"
+                    f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:>9.1f}{sum(errors.values()):>8}"
+                )
+                for message, count in errors.most_common():
+                    self.stdout.write(f"  {count} x {message}")
+        finally:
+            Room.objects.filter(name__startswith=prefix).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+    def describe_database(self):
+        database = settings.DATABASES['default']
+        description = f"profile: {settings.DB_PROFILE}, vendor: {connection.vendor}"
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                pragmas = []
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                    cursor.execute(f'PRAGMA {name}')
+                    pragmas.append(f"{name}={cursor.fetchone()[0]}")
+            description += f", {', '.join(pragmas)}, transaction_mode={connection.transaction_mode}"
+        else:
+            pool = database.get('OPTIONS', {}).get('pool')
+            description += f", pool={pool or 'off'}, CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}"
+        return description
+
+    def bench(self, tasks, workers):
+        latencies = []
+        errors = Counter()
+        lock = threading.Lock()
+
+        def work(chunk):
+            try:
+                for task in chunk:
+                    started = time.perf_counter()
+                    try:
+                        task()
+                    except DatabaseError as error:
+                        with lock:
+                            errors[str(error)] += 1
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                # Thread'in bağlantısı kapatılır (havuz açıksa havuza geri verilir)
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(work, [tasks[i::workers] for i in range(workers)]))
+        return time.perf_counter() - started, latencies, errors
@@ -0,0 +1,112 @@
+import asyncio
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Meme, Room, Round, User
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Senkron DRF view'ları ile async view'ları aynı ASGI yığını üzerinden eş zamanlı "
+        "isteklerle karşılaştırır (saniyede istek ve gecikme). Geçici kayıtlar sonunda silinir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Uç nokta başına istek sayısı")
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--memory-layer', action='store_true',
+                            help="Redis olmadan çalıştırmak için bellek içi kanal katmanı kullanılır")
+
+    def handle(self, *args, **options):
+        # İstekler test istemcisiyle süreç içinde gönderilir, test ortamındaki gibi 'testserver' host'una izin verilir
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if options['memory_layer']:
+            overrides['CHANNEL_LAYERS'] = IN_MEMORY_CHANNEL_LAYERS
+        with override_settings(**overrides):
+            self.run(options)
+
+    def run(self, options):
+        count = options['requests']
+        prefix = f"bench-{uuid.uuid4().hex[:8]}"
+        host = User.objects.create(username=f"{prefix}-host")
+        voters = User.objects.bulk_create([User(username=f"{prefix}-{i}") for i in range(count)])
+        room = Room.objects.create(name=prefix, host=host)
+        round_ = Round.objects.create(room=room, theme='bench', meme_submission_end_time=timezone.now())
+        sync_meme, async_meme = [
+            Meme.objects.create(round=round_, creator=host, image_url=f'http://example.com/{prefix}/{i}.jpg')
+            for i in range(2)
+        ]
+        # Her kullanıcı bir kez katılır; odalar tüm katılımları alacak kadar büyüktür
+        sync_room, async_room = [
+            Room.objects.create(name=f"{prefix}-join-{kind}", host=host, max_capacity=count) for kind in ('sync', 'async')
+        ]
+        tokens = [f'Bearer {AccessToken.for_user(voter)}' for voter in voters]
+        meme_data = lambda i: {'round': round_.pk, 'creator': voters[i].pk, 'image_url': f'http://example.com/{prefix}/m{i}.jpg'}
+
+        cases = [
+            ('join room', 'sync', 'get', lambda i: (reverse('room-join', kwargs={'room_id': sync_room.pk}), None)),
+            ('join room', 'async', 'get', lambda i: (reverse('async-room-join', kwargs={'room_id': async_room.pk}), None)),
+            ('submit meme', 'sync', 'post', lambda i: (reverse('create-meme'), meme_data(i))),
+            ('submit meme', 'async', 'post', lambda i: (reverse('async-create-meme'), meme_data(i))),
+            ('round detail', 'sync', 'get', lambda i: (reverse('round-detail', kwargs={'pk': round_.pk}), None)),
+            ('round detail', 'async', 'get', lambda i: (reverse('async-round-detail', kwargs={'pk': round_.pk}), None)),
+            ('cast vote', 'sync', 'post', lambda i: (reverse('create-vote'), {'meme': sync_meme.pk, 'voter': voters[i].pk})),
+            ('cast vote', 'async', 'post', lambda i: (reverse('async-create-vote'), {'meme': async_meme.pk})),
+        ]
+
+        try:
+            self.stdout.write(f"{'endpoint':<14}{'view':<7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+            for name, kind, method, build in cases:
+                elapsed, latencies, errors = asyncio.run(
+                    self.bench(method, build, tokens, options['concurrency'])
+                )
+                latencies.sort()
+                self.stdout.write(
+                    f"{name:<14}{kind:<7}{count / elapsed:>9.1f}"
+                    f"{statistics.median(latencies) * 1000:>9.1f}"
+                    f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:>9.1f}{errors:>8}"
+                )
+        finally:
+            Room.objects.filter(name__startswith=prefix).delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+    async def bench(self, method, build, tokens, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+
+        async def call(i):
+            nonlocal errors
+            url, data = build(i)
+            async with semaphore:
+                started = time.perf_counter()
+                if method == 'get':
+                    response = await client.get(url, headers={'Authorization': tokens[i]})
+                else:
+                    response = await client.post(
+                        url, data, content_type='application/json', headers={'Authorization': tokens[i]}
+                    )
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+
+        # İlk istek bağlantı ve import maliyetini ölçüme katmasın diye okuma uç noktaları ısıtılır
+        # (katılma tekrarlandığında yeni kayıt yazmaz)
+        if method == 'get':
+            await call(0)
+            latencies.clear()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call(i) for i in range(len(tokens))))
+        return time.perf_counter() - started, latencies, errors
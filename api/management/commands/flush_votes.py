@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from api import vote_tally
+
+
+class Command(BaseCommand):
+    help = "Redis'te bekleyen oyları Vote tablosuna toplu olarak yazar (VOTE_INGESTION='redis')."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Verilirse komut bu aralıkla (saniye) sürekli flush yapar")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            flushed = vote_tally.flush_pending(options['batch_size'])
+            if flushed or not interval:
+                self.stdout.write(f"{flushed} oy veritabanına yazıldı.")
+            if not interval:
+                break
+            time.sleep(interval)
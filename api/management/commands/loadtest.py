@@ -0,0 +1,404 @@
+import asyncio
+import contextvars
+import json
+import math
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from api import events
+from api.models import Room, Round, User
+from MemeRoyale.consumers import GameConsumer, MemeConsumer, TimerConsumer, VoteConsumer
+from MemeRoyale.round_scheduler import phase_event
+from MemeRoyale.routing import websocket_urlpatterns
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+FAST_PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+SOCKETS = {'game': GameConsumer, 'meme': MemeConsumer, 'vote': VoteConsumer, 'timer': TimerConsumer}
+
+# Sorgular o anda çalışan adıma yazılır; bağlam sync_to_async ile view thread'ine de taşınır
+current_step = contextvars.ContextVar('loadtest_step', default=None)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(math.ceil(len(values) * pct / 100) - 1, 0))]
+
+
+class Player:
+    def __init__(self, game_index, index, username):
+        self.game_index = game_index
+        self.index = index
+        self.username = username
+        self.user = None
+        self.token = None
+        self.socket = None
+        self.reader = None
+        self.meme_id = None
+        self.received = defaultdict(dict)  # olay -> {id: varış zamanı}
+
+    @property
+    def headers(self):
+        return {'Authorization': f'Bearer {self.token}'}
+
+
+class Game:
+    def __init__(self, index, players):
+        self.index = index
+        self.players = players
+        self.host = players[0]
+        self.room_id = None
+        self.round_id = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Kayıt, giriş, oda kurma, katılma, WebSocket bağlantısı, meme gönderme, oylama ve round "
+        "bitirmeden oluşan tam oyunları ASGI uygulaması üzerinden süreç içinde eş zamanlı çalıştırır. "
+        "Adım başına p50/p95/p99 gecikme, saniyede istek, istek başına sorgu sayısı ve bağlantı "
+        "başına bellek raporlanır. Geçici kayıtlar sonunda silinir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=10, help="Eş zamanlı oyun (oda) sayısı")
+        parser.add_argument('--players', type=int, default=4, help="Oda başına oyuncu sayısı (ev sahibi dahil)")
+        parser.add_argument('--rounds', type=int, default=1, help="Oda başına oynanacak round sayısı")
+        parser.add_argument('--socket', choices=SOCKETS, default='game',
+                            help="Oyuncuların açtığı WebSocket uç noktası (game, presence için Redis gerektirir)")
+        parser.add_argument('--async-views', action='store_true',
+                            help="Katılma, meme ve oy adımlarında async uç noktalar kullanılır")
+        parser.add_argument('--memory-layer', action='store_true',
+                            help="Redis olmadan çalıştırmak için bellek içi kanal katmanı kullanılır")
+        parser.add_argument('--fast-passwords', action='store_true',
+                            help="Kayıt ve girişte şifre özetleme maliyeti ölçüme katılmaz")
+        parser.add_argument('--ws-timeout', type=float, default=5, help="Yayınların istemcilere ulaşması için beklenecek süre (saniye)")
+        parser.add_argument('--output', help="Raporun JSON olarak yazılacağı dosya (çalıştırmaları karşılaştırmak için)")
+        parser.add_argument('--keep', action='store_true', help="Oluşturulan kayıtlar silinmez")
+
+    def handle(self, *args, **options):
+        if options['players'] < 2:
+            options['players'] = 2
+            self.stderr.write("En az iki oyuncu gerekir, --players 2 olarak kullanılıyor.")
+
+        # İstekler test istemcisiyle süreç içinde gönderilir, test ortamındaki gibi 'testserver' host'una izin verilir
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if options['memory_layer']:
+            overrides['CHANNEL_LAYERS'] = IN_MEMORY_CHANNEL_LAYERS
+        if options['fast_passwords']:
+            overrides['PASSWORD_HASHERS'] = FAST_PASSWORD_HASHERS
+
+        self.options = options
+        self.prefix = f"load-{uuid.uuid4().hex[:8]}"
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.queries = Counter()
+        self.durations = {}
+        self.memory_per_connection = None
+
+        try:
+            with override_settings(**overrides), connection.execute_wrapper(self.count_queries):
+                # Senkron view'lar ve ORM çağrıları bu thread'de çalışır, sorgu sayacı tek bağlantıya bağlanır
+                started = time.perf_counter()
+                async_to_sync(self.run_games)()
+                self.elapsed = time.perf_counter() - started
+        finally:
+            if not options['keep']:
+                Room.objects.filter(name__startswith=self.prefix).delete()
+                User.objects.filter(username__startswith=self.prefix).delete()
+
+        self.report()
+
+    def count_queries(self, execute, sql, params, many, context):
+        step = current_step.get()
+        if step is not None:
+            self.queries[step] += 1
+        return execute(sql, params, many, context)
+
+    # Ölçüm
+
+    async def measure(self, step, request):
+        token = current_step.set(step)
+        started = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[step] += 1
+            return None
+        finally:
+            self.latencies[step].append(time.perf_counter() - started)
+            current_step.reset(token)
+        if response is not None and getattr(response, 'status_code', 200) >= 400:
+            self.errors[step] += 1
+            return None
+        return response
+
+    async def phase(self, step, requests):
+        # Adımlar tüm odalarda aynı anda çalışır, saniyede istek bu aşamanın süresinden hesaplanır
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.measure(step, request) for request in requests))
+        self.durations[step] = self.durations.get(step, 0) + time.perf_counter() - started
+        return results
+
+    # Oyun akışı
+
+    async def run_games(self):
+        count = self.options['players']
+        self.client = AsyncClient()
+        self.application = URLRouter(websocket_urlpatterns)
+        games = [
+            Game(i, [Player(i, j, f"{self.prefix}-{i}-{j}") for j in range(count)])
+            for i in range(self.options['rooms'])
+        ]
+        players = [player for game in games for player in game.players]
+
+        await self.phase('register', [self.register(player) for player in players])
+        await self.phase('login', [self.login(player) for player in players])
+        players = [player for player in players if player.token]
+        games = [game for game in games if game.host.token]
+
+        await self.phase('create room', [self.create_room(game) for game in games])
+        games = [game for game in games if game.room_id]
+        join_view = 'async-room-join' if self.options['async_views'] else 'room-join'
+        await self.phase('join room', [
+            self.get(reverse(join_view, kwargs={'room_id': game.room_id}), player)
+            for game in games for player in game.players if player.token
+        ])
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        await self.phase('ws connect', [self.connect(game, player) for game in games for player in game.players if player.user])
+        connected = [player for game in games for player in game.players if player.socket]
+        if connected:
+            self.memory_per_connection = (tracemalloc.get_traced_memory()[0] - before) / len(connected)
+        tracemalloc.stop()
+
+        try:
+            for _ in range(self.options['rounds']):
+                await self.play_round(games)
+        finally:
+            for player in connected:
+                player.reader.cancel()
+            await asyncio.gather(*(player.socket.disconnect() for player in connected), return_exceptions=True)
+
+        await self.phase('end game', [self.end_game(game) for game in games])
+
+    async def play_round(self, games):
+        streams = SOCKETS[self.options['socket']].streams
+        meme_view = 'async-create-meme' if self.options['async_views'] else 'create-meme'
+        vote_view = 'async-create-vote' if self.options['async_views'] else 'create-vote'
+
+        await self.phase('create round', [self.create_round(game) for game in games])
+        games = [game for game in games if game.round_id]
+
+        submitted = {}
+        await self.phase('submit meme', [
+            self.submit_meme(meme_view, game, player, submitted) for game in games for player in game.players if player.token
+        ])
+        if 'meme' in streams:
+            await self.collect('ws meme_created', 'meme_created', games, submitted)
+
+        await self.phase('vote', [
+            self.vote(vote_view, player, game.players[(player.index + 1) % len(game.players)])
+            for game in games for player in game.players if player.token
+        ])
+
+        ended = {}
+        await self.phase('end round', [self.end_round(game, ended) for game in games])
+        if 'timer' in streams:
+            await self.collect('ws phase_change', 'phase_change', games, ended)
+
+    async def collect(self, step, event, games, sent_at):
+        """
+        Yayınların odadaki her bağlantıya ulaşmasını bekler; gecikme yayını tetikleyen
+        isteğin başlangıcından istemcinin çerçeveyi okumasına kadar ölçülür.
+        """
+        expected = [
+            (player, game_key) for game in games for player in game.players if player.socket
+            for game_key in sent_at if game_key[0] == game.index
+        ]
+        deadline = time.perf_counter() + self.options['ws_timeout']
+        while time.perf_counter() < deadline and not all(key[1] in player.received[event] for player, key in expected):
+            await asyncio.sleep(0.01)
+
+        for player, (_, event_id) in expected:
+            arrived = player.received[event].get(event_id)
+            if arrived is None:
+                self.errors[step] += 1
+            else:
+                self.latencies[step].append(arrived - sent_at[(player.game_index, event_id)])
+
+    async def register(self, player):
+        return await self.client.post(
+            reverse('user-register'), {'username': player.username, 'password': 'load-pass-123'},
+            content_type='application/json',
+        )
+
+    async def login(self, player):
+        response = await self.client.post(
+            reverse('user-login'), {'username': player.username, 'password': 'load-pass-123'},
+            content_type='application/json',
+        )
+        if response.status_code == 200:
+            player.token = response.json()['access']
+            player.user = await User.objects.aget(username=player.username)
+        return response
+
+    async def create_room(self, game):
+        response = await self.client.post(
+            reverse('room-create'), {'name': f"{self.prefix}-{game.index}"},
+            content_type='application/json', headers=game.host.headers,
+        )
+        if response.status_code != 201:
+            return response
+
+        room = response.json()['room']
+        if room['max_capacity'] < len(game.players):
+            # Varsayılan kapasite oyuncu sayısından küçükse ev sahibi odayı günceller
+            response = await self.client.patch(
+                reverse('room-update', kwargs={'pk': room['id']}), {'max_capacity': len(game.players)},
+                content_type='application/json', headers=game.host.headers,
+            )
+            if response.status_code != 200:
+                return response
+        game.room_id = room['id']
+        return response
+
+    async def get(self, url, player):
+        return await self.client.get(url, headers=player.headers)
+
+    async def connect(self, game, player):
+        communicator = WebsocketCommunicator(
+            self.application, f"/ws/room/{game.room_id}/{self.options['socket']}/"
+        )
+        communicator.scope['user'] = player.user
+        connected, _ = await communicator.connect()
+        if not connected:
+            raise ConnectionError(f"WebSocket connection rejected for {player.username}")
+        player.socket = communicator
+        player.reader = asyncio.create_task(self.read(player))
+
+    async def read(self, player):
+        while True:
+            message = await player.socket.receive_output(timeout=3600)
+            if message['type'] != 'websocket.send':
+                # Sunucu bağlantıyı kapattı (ör. yavaş istemci)
+                self.errors['ws closed'] += 1
+                return
+            data = json.loads(message['text'])
+            if data.get('action') == 'meme_created':
+                player.received['meme_created'][data['meme']['id']] = time.perf_counter()
+            elif data.get('action') == 'phase_change':
+                player.received['phase_change'][data['round']] = time.perf_counter()
+
+    async def create_round(self, game):
+        # Kayıtlı bir zamanlayıcı çalışıyorsa round'u kendisi ilerletmesin diye teslim süresi ileri alınır
+        response = await self.client.post(
+            reverse('create-round'), {
+                'room': game.room_id, 'theme': 'load test',
+                'meme_submission_end_time': (timezone.now() + timezone.timedelta(hours=1)).isoformat(),
+            },
+            content_type='application/json', headers=game.host.headers,
+        )
+        if response.status_code == 201:
+            game.round_id = response.json()['id']
+        return response
+
+    async def submit_meme(self, view, game, player, submitted):
+        data = {
+            'round': game.round_id, 'creator': player.user.pk,
+            'image_url': f'https://example.com/{self.prefix}/{game.round_id}/{player.index}.jpg',
+            'caption': f'meme {player.index}',
+        }
+        started = time.perf_counter()
+        response = await self.client.post(reverse(view), data, content_type='application/json', headers=player.headers)
+        if response.status_code == 201:
+            player.meme_id = response.json()['id']
+            submitted[(game.index, player.meme_id)] = started
+        return response
+
+    async def vote(self, view, player, target):
+        if target.meme_id is None:
+            return None
+        return await self.client.post(
+            reverse(view), {'meme': target.meme_id, 'voter': player.user.pk},
+            content_type='application/json', headers=player.headers,
+        )
+
+    async def end_round(self, game, ended):
+        # Oylama süresi dolduğunda zamanlayıcının yaptığı geçiş: sonuç hesaplanır ve odaya yayınlanır
+        started = time.perf_counter()
+        round_ = await Round.objects.aget(pk=game.round_id)
+        if not await database_sync_to_async(round_.end_voting)():
+            raise RuntimeError(f"Round {round_.pk} was already ended")
+        await events.apublish(game.room_id, phase_event(round_, 'ended', None))
+        ended[(game.index, round_.pk)] = started
+
+    async def end_game(self, game):
+        room = await Room.objects.aget(pk=game.room_id)
+        await database_sync_to_async(room.end_game)()
+
+    # Rapor
+
+    def report(self):
+        steps = list(self.latencies)
+        rows = []
+        for step in steps:
+            latencies = self.latencies[step]
+            duration = self.durations.get(step)
+            rows.append({
+                'step': step,
+                'count': len(latencies),
+                'errors': self.errors[step],
+                'rps': len(latencies) / duration if duration else None,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'queries_per_call': self.queries[step] / len(latencies) if step in self.durations and latencies else None,
+            })
+
+        self.stdout.write(
+            f"{'step':<18}{'count':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+        for row in rows:
+            rps = f"{row['rps']:.1f}" if row['rps'] is not None else '-'
+            queries = f"{row['queries_per_call']:.1f}" if row['queries_per_call'] is not None else '-'
+            self.stdout.write(
+                f"{row['step']:<18}{row['count']:>7}{row['errors']:>8}{rps:>9}"
+                f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{queries:>9}"
+            )
+
+        requests = sum(row['count'] for row in rows if row['step'] in self.durations)
+        summary = {
+            'rooms': self.options['rooms'],
+            'players': self.options['rooms'] * self.options['players'],
+            'rounds': self.options['rounds'],
+            'elapsed_s': self.elapsed,
+            'requests_per_s': requests / self.elapsed,
+            'votes_per_s': len(self.latencies['vote']) / self.durations['vote'] if self.durations.get('vote') else 0,
+            'memory_per_connection_kb': self.memory_per_connection / 1024 if self.memory_per_connection is not None else None,
+            'closed_connections': self.errors['ws closed'],
+        }
+        memory = summary['memory_per_connection_kb']
+        self.stdout.write(
+            f"{summary['players']} players in {summary['rooms']} rooms, {requests} calls in {self.elapsed:.2f}s "
+            f"({summary['requests_per_s']:.1f} calls/s, {summary['votes_per_s']:.1f} votes/s), "
+            f"memory per connection: {f'{memory:.1f} KiB' if memory is not None else '-'}"
+        )
+
+        if self.options['output']:
+            with open(self.options['output'], 'w') as output:
+                json.dump({'summary': summary, 'steps': rows}, output, indent=2)
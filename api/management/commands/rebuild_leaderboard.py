@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+
+from api import leaderboard
+from api.models import Room, RoundResult, User, Vote
+
+
+class Command(BaseCommand):
+    help = "Redis'teki liderlik tablolarını veritabanından yeniden hesaplar."
+
+    def handle(self, *args, **options):
+        themes = [theme for theme, _ in Room.THEME_CHOICES]
+        totals = defaultdict(dict)
+
+        # Genel tablo kullanıcı sayaçlarından okunur
+        for user_id, games_won, games_played in (
+            User.objects.filter(Q(games_played__gt=0) | Q(games_won__gt=0))
+            .values_list('id', 'games_won', 'games_played')
+            .iterator()
+        ):
+            totals[leaderboard.GLOBAL_SCOPE][user_id] = (games_won, games_played)
+
+        wins, played = self.theme_counts()
+        for theme in themes:
+            for user_id in wins[theme].keys() | played[theme].keys():
+                totals[theme][user_id] = (wins[theme][user_id], played[theme][user_id])
+
+        leaderboard.rebuild(totals, themes)
+        self.stdout.write(
+            f"Liderlik tablosu yeniden kuruldu: {len(totals[leaderboard.GLOBAL_SCOPE])} oyuncu."
+        )
+
+    def theme_counts(self):
+        """
+        Tema başına kazanılan ve oynanan oyun sayılarını {tema: {kullanıcı id: sayı}} olarak döndürür.
+        """
+        wins = defaultdict(lambda: defaultdict(int))
+        played = defaultdict(lambda: defaultdict(int))
+
+        # Canlı round'lar: end_voting gibi en çok oy alan ilk üç meme'nin sahipleri kazanır
+        ranking = defaultdict(list)
+        for row in (
+            Vote.objects.filter(round__voting_ended=True)
+            .values('round_id', 'round__room__theme', 'meme_id', 'meme__creator_id')
+            .annotate(total=Count('id'))
+            .order_by('round_id', '-total', 'meme__created_at', 'meme_id')
+            .iterator()
+        ):
+            ranking[(row['round_id'], row['round__room__theme'])].append(row['meme__creator_id'])
+        for (_, theme), creators in ranking.items():
+            for user_id in set(creators[:3]):
+                wins[theme][user_id] += 1
+
+        for user_id, theme in (
+            Room.participants.through.objects.filter(room__status='ended')
+            .values_list('user_id', 'room__theme')
+            .iterator()
+        ):
+            played[theme][user_id] += 1
+
+        # Arşivlenen odalarda katılımcı listesi tutulmaz, meme gönderen oyuncular oynamış sayılır
+        rooms = defaultdict(set)
+        for result in RoundResult.objects.select_related('room').only('meme_totals', 'room__theme').iterator():
+            theme = result.room.theme
+            ranked = sorted(
+                (meme for meme in result.meme_totals if meme['votes']),
+                key=lambda meme: (-meme['votes'], meme['meme']),
+            )
+            for user_id in {meme['creator'] for meme in ranked[:3]}:
+                wins[theme][user_id] += 1
+            rooms[(result.room_id, theme)].update(meme['creator'] for meme in result.meme_totals)
+        for (_, theme), user_ids in rooms.items():
+            for user_id in user_ids:
+                played[theme][user_id] += 1
+
+        return wins, played
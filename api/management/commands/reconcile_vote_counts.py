@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.models import Meme
+
+
+class Command(BaseCommand):
+    help = "Meme.vote_count sayaçlarını Vote tablosundan yeniden hesaplar (backfill / uzlaştırma)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meme', type=int, nargs='*', help="Yalnızca verilen meme id'lerini uzlaştır")
+
+    def handle(self, *args, **options):
+        updated = Meme.sync_vote_counts(options['meme'])
+        self.stdout.write(self.style.SUCCESS(f"{updated} meme için oy sayısı uzlaştırıldı."))
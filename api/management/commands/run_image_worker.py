@@ -0,0 +1,14 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from MemeRoyale.image_worker import ImageWorker
+
+
+class Command(BaseCommand):
+    help = "Gönderilen meme görsellerini indirip küçük resimlerini üreten görsel worker'ını çalıştırır."
+
+    def handle(self, *args, **options):
+        self.stdout.write("Görsel worker'ı başlatıldı.")
+        try:
+            asyncio.run(ImageWorker().run())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,14 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from MemeRoyale.round_scheduler import RoundScheduler
+
+
+class Command(BaseCommand):
+    help = "Round aşama geçişlerini (oylamayı başlatma/bitirme) zamanında tetikleyen zamanlayıcıyı çalıştırır."
+
+    def handle(self, *args, **options):
+        self.stdout.write("Round zamanlayıcısı başlatıldı.")
+        try:
+            asyncio.run(RoundScheduler().run())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 10:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_vote_count(apps, schema_editor):
+    Meme = apps.get_model("api", "Meme")
+    Vote = apps.get_model("api", "Vote")
+    counts = (
+        Vote.objects.filter(meme=OuterRef("pk"))
+        .order_by()
+        .values("meme")
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    Meme.objects.update(vote_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0005_room_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="meme",
+            name="vote_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_vote_count, migrations.RunPython.noop),
+    ]
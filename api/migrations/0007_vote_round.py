@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0006_meme_vote_count"),
+    ]
+
+    operations = [
+        # Alan önce boş bırakılabilir eklenir, mevcut oylar 0008'de doldurulur
+        migrations.AddField(
+            model_name="vote",
+            name="round",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="votes",
+                to="api.round",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:20
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def merge_m2m_votes(apps, schema_editor):
+    Meme = apps.get_model("api", "Meme")
+    Vote = apps.get_model("api", "Vote")
+
+    # Meme.votes M2M tablosundaki oylar Vote tablosuna taşınır
+    Through = Meme.votes.through
+    rows = Through.objects.values_list("meme_id", "user_id").iterator(chunk_size=2000)
+    batch = []
+    for meme_id, user_id in rows:
+        batch.append(Vote(meme_id=meme_id, voter_id=user_id))
+        if len(batch) >= 2000:
+            Vote.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Vote.objects.bulk_create(batch, ignore_conflicts=True)
+
+    Vote.objects.filter(round__isnull=True).update(
+        round_id=Subquery(Meme.objects.filter(pk=OuterRef("meme_id")).values("round_id")[:1])
+    )
+
+    counts = (
+        Vote.objects.filter(meme=OuterRef("pk"))
+        .order_by()
+        .values("meme")
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    Meme.objects.update(vote_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+    # Veri taşıma kendi migration'ında (ve transaction'ında) çalışır; PostgreSQL'de
+    # eklenen satırların ertelenmiş FK kontrolleri 0009'daki ALTER TABLE'dan önce tamamlanır
+    dependencies = [
+        ("api", "0007_vote_round"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_m2m_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.1 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0008_merge_m2m_votes"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="meme",
+            name="votes",
+        ),
+        migrations.AlterField(
+            model_name="vote",
+            name="round",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="votes",
+                to="api.round",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="vote",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="vote",
+            constraint=models.UniqueConstraint(
+                fields=("meme", "voter"), name="unique_vote_per_meme"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vote",
+            index=models.Index(fields=["round", "voter"], name="vote_round_voter_idx"),
+        ),
+    ]
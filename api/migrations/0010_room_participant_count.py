@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_participant_count(apps, schema_editor):
+    Room = apps.get_model("api", "Room")
+    Through = Room.participants.through
+    counts = (
+        Through.objects.filter(room_id=OuterRef("pk"))
+        .order_by()
+        .values("room_id")
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    Room.objects.update(participant_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0009_unify_votes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="room",
+            name="participant_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_participant_count, migrations.RunPython.noop),
+    ]
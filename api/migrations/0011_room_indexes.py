@@ -0,0 +1,22 @@
+# Generated by Django 5.0.1 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0010_room_participant_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="room",
+            index=models.Index(
+                fields=["status", "created_at"], name="room_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="room",
+            index=models.Index(fields=["theme", "status"], name="room_theme_status_idx"),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0012_archive_rooms"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="round",
+            index=models.Index(
+                condition=models.Q(("voting_ended", False)),
+                fields=["meme_submission_end_time"],
+                name="round_pending_idx",
+            ),
+        ),
+    ]
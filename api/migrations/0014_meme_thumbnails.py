@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0013_round_pending_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="meme",
+            name="image_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="meme",
+            name="image_status",
+            field=models.CharField(
+                choices=[("pending", "Pending"), ("ready", "Ready"), ("failed", "Failed")],
+                default="pending",
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="meme",
+            index=models.Index(
+                condition=models.Q(("image_status", "pending")),
+                fields=["created_at"],
+                name="meme_image_pending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="meme",
+            index=models.Index(
+                condition=models.Q(("image_status", "ready")),
+                fields=["image_url"],
+                name="meme_image_ready_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0014_meme_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="avatar_status",
+            field=models.CharField(
+                blank=True,
+                choices=[("", "None"), ("pending", "Pending"), ("ready", "Ready"), ("failed", "Failed")],
+                default="",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -1,13 +1,41 @@
 from django.utils.timezone import now, timedelta
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+import redis
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from . import leaderboard, presence, vote_tally
+from .avatars import avatar_urls
+from .cache import invalidate_home_payload
+from .thumbnails import thumbnail_urls
 
 class User(AbstractUser):
+    AVATAR_NONE = ''
+    AVATAR_PENDING = 'pending'
+    AVATAR_READY = 'ready'
+    AVATAR_FAILED = 'failed'
+    AVATAR_STATUS_CHOICES = (
+        (AVATAR_NONE, 'None'),
+        (AVATAR_PENDING, 'Pending'),
+        (AVATAR_READY, 'Ready'),
+        (AVATAR_FAILED, 'Failed'),
+    )
+
     profile_picture = models.ImageField(upload_to='profile_pictures/', null=True, blank=True)
     bio = models.TextField(max_length=500, blank=True)
     games_won = models.PositiveIntegerField(default=0)
     games_played = models.PositiveIntegerField(default=0)
+    avatar_hash = models.CharField(max_length=64, blank=True)  # avatarların adı: profil resminin SHA-256 özeti
+    avatar_status = models.CharField(max_length=10, choices=AVATAR_STATUS_CHOICES, default=AVATAR_NONE, blank=True)
+
+    @property
+    def avatars(self):
+        if self.avatar_status != self.AVATAR_READY:
+            return None
+        return avatar_urls(self.avatar_hash)
 
     @property
     def win_rate(self):
@@ -19,6 +47,14 @@ class User(AbstractUser):
         return self.username
 
 
+def update_leaderboard(record, user_ids, theme):
+    # Liderlik tablosu veritabanından yeniden kurulabildiği için Redis hataları oyunu durdurmaz
+    try:
+        record(user_ids, theme or None)
+    except redis.RedisError:
+        pass
+
+
 class Room(models.Model):
     ROOM_STATUS_CHOICES = (
         ('waiting', 'Waiting'),
@@ -41,6 +77,7 @@ class Room(models.Model):
     
     host = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hosted_rooms')
     participants = models.ManyToManyField(User, related_name='rooms', blank=True)
+    participant_count = models.PositiveIntegerField(default=0)  # participants sayısının önbelleği
     created_at = models.DateTimeField(auto_now_add=True)
     meme_count = models.PositiveIntegerField(default=0)
     max_capacity = models.PositiveIntegerField(default=4)
@@ -50,18 +87,69 @@ class Room(models.Model):
     name = models.CharField(max_length=255, default=f"Room {id}")
     start_time = models.DateTimeField(null=True, blank=True)
     end_time = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(null=True, blank=True)  # round/meme/oy kayıtları arşive taşındı
+
+    class Meta:
+        indexes = [
+            # Oda listesi status/theme ile süzülüp (created_at, id) üzerinden sayfalanır
+            models.Index(fields=['status', 'created_at'], name='room_status_created_idx'),
+            models.Index(fields=['theme', 'status'], name='room_theme_status_idx'),
+        ]
 
     def is_full(self):
-        return self.participants.count() >= self.max_capacity
+        return self.participant_count >= self.max_capacity
 
     def add_participant(self, user):
-        if self.is_full():
-            return False
-        self.participants.add(user)
+        """
+        Kapasite kontrolü ve ekleme tek transaction içinde yapılır.
+        Kullanıcı eklendiyse ya da zaten katılımcıysa True, oda doluysa False döndürür.
+        """
+        through = Room.participants.through
+        try:
+            with transaction.atomic():
+                # Koşullu UPDATE kapasiteyi kontrol eder ve sayacı atomik olarak artırır,
+                # eş zamanlı katılımlar oda satırında sıraya girer
+                admitted = Room.objects.filter(
+                    pk=self.pk, participant_count__lt=F('max_capacity')
+                ).update(participant_count=F('participant_count') + 1)
+                if not admitted:
+                    return through.objects.filter(room_id=self.pk, user_id=user.pk).exists()
+                through.objects.create(room_id=self.pk, user_id=user.pk)
+        except IntegrityError:
+            # Kullanıcı zaten odadaydı, sayaç artışı geri alındı
+            return True
+
+        self.participant_count += 1
+        invalidate_home_payload()
+        try:
+            presence.add_participant(self.pk, user.pk, user.username)
+        except redis.RedisError:
+            pass
         return True
 
+    async def aadd_participant(self, user):
+        """
+        add_participant'ın async sürümü. Async ORM transaction açamadığı için kapasite
+        kontrolü ve ekleme aynı transaction'da kalsın diye senkron sürüm thread'de çalışır.
+        """
+        return await sync_to_async(self.add_participant)(user)
+
     def remove_participant(self, user):
-        self.participants.remove(user)
+        through = Room.participants.through
+        with transaction.atomic():
+            removed, _ = through.objects.filter(room_id=self.pk, user_id=user.pk).delete()
+            if removed:
+                Room.objects.filter(pk=self.pk, participant_count__gt=0).update(
+                    participant_count=F('participant_count') - 1
+                )
+
+        if removed:
+            self.participant_count = max(self.participant_count - 1, 0)
+            invalidate_home_payload()
+            try:
+                presence.remove_participant(self.pk, user.pk)
+            except redis.RedisError:
+                pass
         return not self.is_full()
 
     def start_game(self):
@@ -70,13 +158,31 @@ class Room(models.Model):
         self.save()
 
     def end_game(self):
-        self.end_time = timezone.now()
+        """
+        Oyunu bitirir ve katılımcıların oynadığı oyun sayısını artırır.
+        Oyun zaten bitirildiyse False döndürür.
+        """
+        end_time = timezone.now()
+        with transaction.atomic():
+            # Oyunu yalnızca bir istek bitirebilir, oynanan oyunlar iki kez sayılmaz
+            claimed = Room.objects.filter(pk=self.pk).exclude(status='ended').update(
+                status='ended', end_time=end_time
+            )
+            if not claimed:
+                return False
+
+            player_ids = list(Room.participants.through.objects.filter(room_id=self.pk).values_list('user_id', flat=True))
+            User.objects.filter(pk__in=player_ids).update(games_played=F('games_played') + 1)
+            transaction.on_commit(lambda: update_leaderboard(leaderboard.record_games, player_ids, self.theme))
+
         self.status = 'ended'
-        self.save()
+        self.end_time = end_time
+        invalidate_home_payload()
+        return True
 
     def close_room(self):
-        self.status = 'ended'
-        self.save()
+        # Oda kapatıldığında oyun da biter; oynanan oyunlar ve liderlik tablosu güncellenir
+        return self.end_game()
 
     def __str__(self):
         return f"Room {self.id} hosted by {self.host.username}"
@@ -93,6 +199,15 @@ class Round(models.Model):
     voting_end_time = models.DateTimeField(null=True, blank=True)
     voting_ended = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Zamanlayıcı başlangıçta yalnızca bitmemiş round'ları okur
+            models.Index(
+                fields=['meme_submission_end_time'], condition=models.Q(voting_ended=False),
+                name='round_pending_idx',
+            ),
+        ]
+
     @property
     def time_remaining(self):
         end_time = self.created_at + timedelta(seconds=self.room.duration)
@@ -103,53 +218,177 @@ class Round(models.Model):
         self.save()
 
     def start_voting(self):
-        self.voting_start_time = now()
-        self.voting_end_time = self.voting_start_time + timedelta(seconds=60)
-        self.save()
+        """
+        Meme gönderimini kapatıp oylamayı başlatır.
+        Oylama başka bir worker tarafından zaten başlatıldıysa False döndürür.
+        """
+        voting_start_time = now()
+        voting_end_time = voting_start_time + timedelta(seconds=getattr(settings, 'ROUND_VOTING_SECONDS', 60))
+
+        # Oylamayı yalnızca bir worker başlatabilir
+        claimed = Round.objects.filter(pk=self.pk, voting_start_time__isnull=True).update(
+            voting_start_time=voting_start_time, voting_end_time=voting_end_time
+        )
+        if not claimed:
+            return False
+
+        self.voting_start_time = voting_start_time
+        self.voting_end_time = voting_end_time
+        return True
+
+    @property
+    def next_transition(self):
+        """
+        Round'un bir sonraki aşamasını ve bu aşamaya geçileceği zamanı (aşama, zaman) olarak döndürür.
+        """
+        if self.voting_ended:
+            return None
+        if self.voting_start_time is None:
+            return 'voting', self.meme_submission_end_time
+        return 'ended', self.voting_end_time
 
     def end_voting(self):
-        self.voting_ended = True
-        self.save()
+        """
+        Oylamayı kapatır ve en çok oy alan ilk üç meme'nin sahiplerini ödüllendirir.
+        Oylama başka bir worker tarafından zaten kapatıldıysa False döndürür.
+        """
+        # Redis'te bekleyen oylar sonuç hesaplanmadan önce veritabanına yazılır
+        if vote_tally.is_enabled():
+            vote_tally.finalize_round(self.pk)
 
-        memes = self.memes.all()
-        sorted_memes = sorted(memes, key=lambda x: x.total_votes, reverse=True)
-        
-        winners = sorted_memes[:3]
-        
-        for i, meme in enumerate(winners):
-            meme.creator.games_won += 1
-            meme.creator.save()
+        # Kazananlar Vote tablosu üzerinde tek bir gruplanmış sorguyla bulunur,
+        # eşitlikte önce gönderilen meme kazanır
+        ranking = list(
+            Vote.objects.filter(round=self)
+            .values('meme_id', 'meme__creator_id')
+            .annotate(total=Count('id'))
+            .order_by('-total', 'meme__created_at', 'meme_id')[:3]
+        )
+        winner_id = ranking[0]['meme__creator_id'] if ranking else None
 
-        self.winner = winners[0].creator
-        self.save()
+        with transaction.atomic():
+            # Oylamayı yalnızca bir worker kapatabilir
+            claimed = Round.objects.filter(pk=self.pk, voting_ended=False).update(
+                voting_ended=True, winner_id=winner_id
+            )
+            if not claimed:
+                return False
+
+            winner_ids = {row['meme__creator_id'] for row in ranking}
+            User.objects.filter(pk__in=winner_ids).update(games_won=F('games_won') + 1)
+            transaction.on_commit(lambda: self.publish_wins(winner_ids))
+
+        self.voting_ended = True
+        self.winner_id = winner_id
+        return True
+
+    def publish_wins(self, winner_ids):
+        # update() post_save göndermediği için lobi kartlarındaki kazanma sayıları burada tazelenir
+        invalidate_home_payload()
+        update_leaderboard(
+            leaderboard.record_wins, winner_ids,
+            Room.objects.filter(pk=self.room_id).values_list('theme', flat=True).first(),
+        )
 
     def __str__(self):
         return f"Round in {self.room.name} - Theme: {self.theme}"
 
 
 class Meme(models.Model):
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     round = models.ForeignKey(Round, on_delete=models.CASCADE, related_name='memes')
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='memes')
     image_url = models.URLField(default=None)
     caption = models.TextField(blank=True)
-    votes = models.ManyToManyField(User, related_name='voted_memes', blank=True)
+    vote_count = models.PositiveIntegerField(default=0)  # Vote tablosundan türetilen sayaç
     created_at = models.DateTimeField(auto_now_add=True)
+    image_hash = models.CharField(max_length=64, blank=True)  # küçük resimlerin adı: orijinal görselin SHA-256 özeti
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, default=IMAGE_PENDING)
+
+    class Meta:
+        indexes = [
+            # Görsel worker'ı başlangıçta yalnızca bekleyen meme'leri okur
+            models.Index(
+                fields=['created_at'], condition=models.Q(image_status='pending'),
+                name='meme_image_pending_idx',
+            ),
+            # Aynı adresteki görsel yeniden indirilmez
+            models.Index(
+                fields=['image_url'], condition=models.Q(image_status='ready'),
+                name='meme_image_ready_idx',
+            ),
+        ]
 
     @property
     def total_votes(self):
-        return self.votes.count()
+        return self.vote_count
+
+    @property
+    def thumbnails(self):
+        if self.image_status != self.IMAGE_READY:
+            return None
+        return thumbnail_urls(self.image_hash)
+
+    @classmethod
+    def sync_vote_counts(cls, meme_ids=None):
+        """
+        vote_count sütununu Vote tablosundaki gerçek sayılarla yeniden hesaplar.
+        Güncellenen satır sayısını döndürür.
+        """
+        counts = Vote.objects.filter(meme=OuterRef('pk')).order_by().values('meme').annotate(c=Count('id')).values('c')
+        memes = cls.objects.all()
+        if meme_ids is not None:
+            memes = memes.filter(pk__in=meme_ids)
+        return memes.update(vote_count=Coalesce(Subquery(counts), 0))
 
     def __str__(self):
-        return f"Meme by {self.creator.username} - Votes: {self.total_votes}"
+        return f"Meme by {self.creator.username} - Votes: {self.vote_count}"
 
 
 class Vote(models.Model):
     meme = models.ForeignKey(Meme, on_delete=models.CASCADE, related_name='votes_received')
     voter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='votes_cast')
+    round = models.ForeignKey(Round, on_delete=models.CASCADE, related_name='votes')  # meme.round'dan kopyalanır
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ('meme', 'voter')
+        constraints = [
+            models.UniqueConstraint(fields=['meme', 'voter'], name='unique_vote_per_meme'),
+        ]
+        indexes = [
+            models.Index(fields=['round', 'voter'], name='vote_round_voter_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.round_id is None:
+            self.round_id = self.meme.round_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Vote by {self.voter.username} for {self.meme.creator.username}'s meme"
+
+
+class RoundResult(models.Model):
+    """
+    Arşivlenen bir round'un canlı şemada kalan özet sonucu.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='results')
+    round_id = models.PositiveBigIntegerField()  # Silinen Round kaydının id'si
+    theme = models.CharField(max_length=255)
+    winner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='round_results')
+    meme_totals = models.JSONField(default=list)  # [{"meme": id, "creator": id, "votes": n}, ...]
+    played_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Result of round {self.round_id} in room {self.room_id}"
@@ -0,0 +1,216 @@
+"""
+Oda katılımcı listesini ve çevrimiçi durumunu Redis'te tutan presence katmanı.
+
+    presence:<room>:roster   HASH  kullanıcı id -> kullanıcı adı (Room.participants önbelleği)
+    presence:<room>:version  katılım/ayrılma sayacı; önbellek doldurulurken izlenir
+    presence:<room>:online   ZSET  "id:kullanıcı adı" -> heartbeat süresinin dolacağı zaman
+
+Roster önbelleği ilk okumada veritabanından doldurulur ve katılım/ayrılma
+işlemlerinde yerinde güncellenir. Doldurma sırasında üyelik değişirse sayaç
+değiştiği için eski liste önbelleğe yazılmaz. Çevrimiçi kayıtlar heartbeat ile yenilenir,
+süresi dolanlar okuma sırasında temizlenir.
+"""
+import time
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from MemeRoyale import redis_pool
+
+# Roster hash'inin veritabanından doldurulduğunu gösteren alan
+WARM_FIELD = '__warm__'
+
+ROSTER_TTL_SECONDS = 60 * 60
+
+# Üyelik sürekli değişirken önbelleği doldurma denemesi sayısı
+ROSTER_FILL_ATTEMPTS = 3
+
+
+def get_redis():
+    return redis_pool.get_redis()
+
+
+def get_async_redis():
+    return redis_pool.get_async_redis()
+
+
+def get_ttl():
+    return getattr(settings, 'PRESENCE_TTL_SECONDS', 30)
+
+
+def roster_key(room_id):
+    return f"presence:{room_id}:roster"
+
+
+def version_key(room_id):
+    return f"presence:{room_id}:version"
+
+
+def online_key(room_id):
+    return f"presence:{room_id}:online"
+
+
+def _member(user):
+    return f"{user.id}:{user.username}"
+
+
+def _parse_member(member):
+    user_id, username = member.decode().split(':', 1)
+    return int(user_id), username
+
+
+def _read_roster(room_id):
+    from .models import Room
+
+    return dict(Room.participants.through.objects.filter(room_id=room_id).values_list('user_id', 'user__username'))
+
+
+def _load_roster(room_id):
+    if not str(room_id).isdigit():
+        return {}
+    with get_redis().pipeline(transaction=True) as pipe:
+        for _ in range(ROSTER_FILL_ATTEMPTS):
+            # Sayaç veritabanı okumasından önce izlenir; add/remove commit sonrası sayacı
+            # artırdığı için okumanın kaçırdığı her değişiklik MULTI'yi iptal eder
+            pipe.watch(version_key(room_id))
+            participants = _read_roster(room_id)
+            pipe.multi()
+            pipe.delete(roster_key(room_id))
+            pipe.hset(roster_key(room_id), mapping={WARM_FIELD: 1, **participants})
+            pipe.expire(roster_key(room_id), ROSTER_TTL_SECONDS)
+            try:
+                pipe.execute()
+                break
+            except redis.WatchError:
+                continue
+    # Önbelleğe yazılamasa da okunan liste döndürülür, sonraki okuma yeniden dener
+    return participants
+
+
+def get_participants(room_id):
+    """
+    Odanın katılımcılarını {id: kullanıcı adı} olarak önbellekten döndürür.
+    """
+    cached = get_redis().hgetall(roster_key(room_id))
+    if WARM_FIELD.encode() not in cached:
+        return _load_roster(room_id)
+    return {int(user_id): username.decode() for user_id, username in cached.items() if user_id != WARM_FIELD.encode()}
+
+
+def bump_version(client, room_id):
+    # Devam eden bir önbellek doldurması bu değişikliği kaçırdıysa yazılmaz
+    pipe = client.pipeline(transaction=True)
+    pipe.incr(version_key(room_id))
+    pipe.expire(version_key(room_id), ROSTER_TTL_SECONDS)
+    pipe.execute()
+
+
+def add_participant(room_id, user_id, username):
+    # Önbellek henüz doldurulmadıysa ilk okumada veritabanından yüklenecek
+    client = get_redis()
+    bump_version(client, room_id)
+    if client.hexists(roster_key(room_id), WARM_FIELD):
+        client.hset(roster_key(room_id), user_id, username)
+
+
+def remove_participant(room_id, user_id):
+    client = get_redis()
+    bump_version(client, room_id)
+    client.hdel(roster_key(room_id), user_id)
+
+
+def expire_stale(room_id):
+    """
+    Heartbeat süresi dolan kullanıcıları çevrimiçi listeden çıkarır ve döndürür.
+    """
+    now = time.time()
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.zrangebyscore(online_key(room_id), '-inf', now)
+    pipe.zremrangebyscore(online_key(room_id), '-inf', now)
+    stale, _ = pipe.execute()
+    return [_parse_member(member) for member in stale]
+
+
+def get_online(room_id):
+    expire_stale(room_id)
+    return {user_id for user_id, _ in map(_parse_member, get_redis().zrange(online_key(room_id), 0, -1))}
+
+
+def get_roster(room_id):
+    """
+    Katılımcıları çevrimiçi bilgisiyle birlikte liste olarak döndürür.
+    Redis'e ulaşılamazsa liste veritabanından okunur.
+    """
+    from .models import Room
+
+    try:
+        participants = get_participants(room_id)
+        online = get_online(room_id)
+    except redis.RedisError:
+        participants = dict(Room.participants.through.objects.filter(room_id=room_id).values_list('user_id', 'user__username'))
+        online = set()
+    return [
+        {'id': user_id, 'username': username, 'online': user_id in online}
+        for user_id, username in sorted(participants.items())
+    ]
+
+
+def touch(room_id, user):
+    """
+    Kullanıcıyı çevrimiçi olarak işaretler ya da heartbeat süresini yeniler.
+    """
+    get_redis().zadd(online_key(room_id), {_member(user): time.time() + get_ttl()})
+
+
+def leave(room_id, user):
+    get_redis().zrem(online_key(room_id), _member(user))
+
+
+# Consumer'lar için asyncio sürümleri; thread havuzuna geçmeden paylaşılan havuzu kullanır
+
+async def atouch(room_id, user):
+    await get_async_redis().zadd(online_key(room_id), {_member(user): time.time() + get_ttl()})
+
+
+async def aheartbeat(room_id, user):
+    """
+    Kullanıcının heartbeat süresini yeniler ve süresi dolan kullanıcıları tek pipeline ile temizleyip döndürür.
+    """
+    now = time.time()
+    pipe = get_async_redis().pipeline(transaction=True)
+    pipe.zadd(online_key(room_id), {_member(user): now + get_ttl()})
+    pipe.zrangebyscore(online_key(room_id), '-inf', now)
+    pipe.zremrangebyscore(online_key(room_id), '-inf', now)
+    _, stale, _ = await pipe.execute()
+    return [_parse_member(member) for member in stale]
+
+
+async def aget_roster(room_id):
+    """
+    get_roster'ın asyncio sürümü; önbellek boşsa ya da Redis'e ulaşılamazsa senkron sürüme düşer.
+    """
+    try:
+        client = get_async_redis()
+        now = time.time()
+        pipe = client.pipeline(transaction=False)
+        pipe.hgetall(roster_key(room_id))
+        pipe.zrangebyscore(online_key(room_id), now, '+inf')
+        cached, members = await pipe.execute()
+    except redis.RedisError:
+        cached = {}
+    if WARM_FIELD.encode() not in cached:
+        return await sync_to_async(get_roster)(room_id)
+
+    online = {user_id for user_id, _ in map(_parse_member, members)}
+    participants = sorted(
+        (int(user_id), username.decode()) for user_id, username in cached.items() if user_id != WARM_FIELD.encode()
+    )
+    return [
+        {'id': user_id, 'username': username, 'online': user_id in online}
+        for user_id, username in participants
+    ]
+
+
+async def aleave(room_id, user):
+    await get_async_redis().zrem(online_key(room_id), _member(user))
@@ -1,20 +1,57 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from . import avatars, presence
 from .models import User, Room, Round, Meme, Vote
 
+
+# Profil resmi alanı; boyut görsel açılmadan, ölçüler başlıktan doğrulanır
+class ProfilePictureField(serializers.ImageField):
+    default_error_messages = {
+        'too_large': 'Profile picture must be at most {max_bytes} bytes.',
+        'dimensions': 'Profile picture must be between {minimum} and {maximum} pixels on each side.',
+    }
+
+    def to_internal_value(self, data):
+        max_bytes = avatars.get_max_bytes()
+        if getattr(data, 'size', 0) > max_bytes:
+            self.fail('too_large', max_bytes=max_bytes)
+        upload = super().to_internal_value(data)
+        minimum, maximum = avatars.get_dimension_limits()
+        if min(upload.image.size) < minimum or max(upload.image.size) > maximum:
+            self.fail('dimensions', minimum=minimum, maximum=maximum)
+        return upload
+
+
 # User Serializer
 class UserSerializer(serializers.ModelSerializer):
+    profile_picture = ProfilePictureField(required=False, allow_null=True)
+    avatars = serializers.ReadOnlyField()
+
     class Meta:
         model = User
         fields = '__all__'
+        read_only_fields = ('avatar_hash', 'avatar_status')
+        extra_kwargs = {'password': {'write_only': True}}
 
     def create(self, validated_data):
-        user = User.objects.create(**validated_data)
+        has_picture = 'profile_picture' in validated_data
+        picture = validated_data.pop('profile_picture', None)
+        user = User(**validated_data)
+        if has_picture:
+            avatars.attach(user, picture)
+        user.save()
+        avatars.schedule(user)
         return user
 
     def update(self, instance, validated_data):
+        has_picture = 'profile_picture' in validated_data
+        picture = validated_data.pop('profile_picture', None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        if has_picture:
+            avatars.attach(instance, picture)
         instance.save()
+        avatars.schedule(instance)
         return instance
 
 
@@ -23,6 +60,8 @@ class RoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = Room
         fields = '__all__'
+        # Katılımcı sayacı yalnızca Room.add_participant ile, arşiv zamanı arşivleme komutuyla değişir
+        read_only_fields = ('participant_count', 'archived_at')
 
     def create(self, validated_data):
         room = Room.objects.create(**validated_data)
@@ -31,7 +70,8 @@ class RoomSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        # Yalnızca gönderilen alanlar yazılır; eş zamanlı katılımların artırdığı sayaç ezilmez
+        instance.save(update_fields=list(validated_data))
         return instance
     
     def validate(self, data):
@@ -41,6 +81,14 @@ class RoomSerializer(serializers.ModelSerializer):
         return data
 
 
+# Oda detay Serializer'ı, katılımcılar presence önbelleğinden okunur
+class RoomDetailSerializer(RoomSerializer):
+    participants = serializers.SerializerMethodField()
+
+    def get_participants(self, room):
+        return presence.get_roster(room.pk)
+
+
 # Round Serializer
 class RoundSerializer(serializers.ModelSerializer):
     class Meta:
@@ -51,10 +99,12 @@ class RoundSerializer(serializers.ModelSerializer):
 # Meme Serializer
 class MemeSerializer(serializers.ModelSerializer):
     total_votes = serializers.ReadOnlyField()
+    thumbnails = serializers.ReadOnlyField()
 
     class Meta:
         model = Meme
         fields = '__all__'
+        read_only_fields = ('vote_count', 'image_hash', 'image_status')
 
     def create(self, validated_data):
         meme = Meme.objects.create(**validated_data)
@@ -72,14 +122,69 @@ class VoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vote
         fields = '__all__'
+        read_only_fields = ('round',)
+        # Oy yayını için oda id'si meme ile aynı sorguda okunur
+        extra_kwargs = {'meme': {'queryset': Meme.objects.select_related('round').only('id', 'round_id', 'round__room_id', 'round__voting_ended')}}
+        # Tekrar eden oylar veritabanındaki unique kısıtıyla yakalanır, ön sorgu atılmaz
+        validators = []
 
     def create(self, validated_data):
-        meme = validated_data.get('meme')
-        voter = validated_data.get('voter')
-
         # Kullanıcı aynı meme için daha önce oy verdiyse, yeni oy eklememeliyiz
-        existing_vote = Vote.objects.filter(meme=meme, voter=voter).first()
-        if existing_vote:
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
             raise serializers.ValidationError("You have already voted for this meme.")
-        
-        return super().create(validated_data)
+
+
+
+# Liste ve gerçek zamanlı yayınlar için salt okunur, küçük serializer'lar.
+# İlişkili alanlar için view'larda select_related / only() ile yüklenmiş queryset beklenir;
+# hiçbiri M2M ilişkisine dokunmaz.
+
+# Herkese açık kullanıcı kartı; profil resminin yalnızca küçük avatarları sunulur
+class PublicUserSerializer(serializers.ModelSerializer):
+    avatars = serializers.ReadOnlyField()
+
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'games_won', 'games_played', 'avatars')
+        read_only_fields = fields
+
+
+# Lobi oda kartı
+class RoomCardSerializer(serializers.ModelSerializer):
+    host = serializers.CharField(source='host.username', read_only=True)
+
+    class Meta:
+        model = Room
+        fields = ('id', 'name', 'theme', 'status', 'host', 'participant_count', 'max_capacity', 'created_at')
+        read_only_fields = fields
+
+
+# Meme kartı
+class MemeCardSerializer(serializers.ModelSerializer):
+    creator = serializers.CharField(source='creator.username', read_only=True)
+    thumbnails = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Meme
+        fields = ('id', 'round', 'creator', 'image_url', 'caption', 'vote_count', 'thumbnails')
+        read_only_fields = fields
+
+
+# Round özeti
+class RoundSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Round
+        fields = ('id', 'room', 'theme', 'winner', 'meme_submission_end_time', 'voting_start_time', 'voting_end_time', 'voting_ended')
+        read_only_fields = fields
+
+
+# Round detayı, meme kartlarıyla birlikte
+class RoundDetailSerializer(RoundSummarySerializer):
+    memes = MemeCardSerializer(many=True, read_only=True)
+
+    class Meta(RoundSummarySerializer.Meta):
+        fields = RoundSummarySerializer.Meta.fields + ('memes',)
+        read_only_fields = fields
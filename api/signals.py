@@ -0,0 +1,111 @@
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from . import presence
+from .cache import invalidate_home_payload
+from .models import User, Room, Round, Meme, Vote
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    # Eş zamanlı oy ve katılım yazıları için SQLite bağlantı ayarları (settings.SQLITE_PRAGMAS)
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(post_save, sender=Vote)
+def increment_vote_count(sender, instance, created, **kwargs):
+    # Yeni oy geldiğinde sayaç veritabanında atomik olarak artırılır
+    if created:
+        Meme.objects.filter(pk=instance.meme_id).update(vote_count=F('vote_count') + 1)
+
+
+@receiver(post_delete, sender=Vote)
+def decrement_vote_count(sender, instance, **kwargs):
+    Meme.objects.filter(pk=instance.meme_id, vote_count__gt=0).update(vote_count=F('vote_count') - 1)
+
+
+@receiver(m2m_changed, sender=Room.participants.through)
+def sync_participant_count(sender, instance, action, reverse, pk_set, **kwargs):
+    # participants.add/remove ile yapılan değişiklikler de sayaca yansıtılır;
+    # Room.add_participant ara tabloya doğrudan yazdığı için bu sinyali tetiklemez
+    if action == 'post_clear' and not reverse:
+        Room.objects.filter(pk=instance.pk).update(participant_count=0)
+    elif action == 'pre_clear' and reverse:
+        Room.objects.filter(participants=instance).update(participant_count=F('participant_count') - 1)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        step = 1 if action == 'post_add' else -1
+        if reverse:
+            # Kullanıcı tarafından yapılan değişiklikte her odada bir kişi değişir
+            Room.objects.filter(pk__in=pk_set).update(participant_count=F('participant_count') + step)
+        else:
+            Room.objects.filter(pk=instance.pk).update(participant_count=F('participant_count') + step * len(pk_set))
+
+
+@receiver(m2m_changed, sender=Room.participants.through)
+def sync_presence_roster(sender, instance, action, reverse, pk_set, **kwargs):
+    # Katılımcı listesindeki değişiklikler Redis'teki roster önbelleğine yansıtılır
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    try:
+        if action == 'pre_clear':
+            # Toplu temizlemede önbellek bir sonraki okumada yeniden doldurulur
+            room_ids = [instance.pk] if not reverse else list(instance.rooms.values_list('pk', flat=True))
+            for room_id in room_ids:
+                presence.get_redis().delete(presence.roster_key(room_id))
+        elif reverse:
+            for room_id in pk_set:
+                if action == 'post_add':
+                    presence.add_participant(room_id, instance.pk, instance.username)
+                else:
+                    presence.remove_participant(room_id, instance.pk)
+        elif action == 'post_add':
+            for user_id, username in User.objects.filter(pk__in=pk_set).values_list('id', 'username'):
+                presence.add_participant(instance.pk, user_id, username)
+        else:
+            for user_id in pk_set:
+                presence.remove_participant(instance.pk, user_id)
+    except redis.RedisError:
+        pass
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_home_on_change(sender, update_fields=None, **kwargs):
+    # Lobi kartlarında yer almayan last_login güncellemeleri önbelleği bozmaz
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    # Lobi yanıtı odaları ve kullanıcıları içerdiği için önbellek temizlenir
+    invalidate_home_payload()
+
+
+@receiver(m2m_changed, sender=Room.participants.through)
+def invalidate_home_on_participants_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_home_payload()
+
+
+@receiver(post_save, sender=Meme)
+def queue_meme_image(sender, instance, created, **kwargs):
+    # Görsel istek sırasında indirilmez, küçük resimleri görsel worker'ı üretir
+    if created:
+        from MemeRoyale.image_worker import notify_meme_image
+        transaction.on_commit(lambda: notify_meme_image(instance.pk))
+
+
+@receiver(post_save, sender=Round)
+def schedule_round(sender, instance, created, **kwargs):
+    # Yeni round'un aşama geçişleri çalışan zamanlayıcılara bildirilir
+    if created:
+        from MemeRoyale.round_scheduler import notify_round
+        transaction.on_commit(lambda: notify_round(instance.pk))
@@ -1,9 +1,52 @@
+import asyncio
+import http.server
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+import fakeredis
+import redis
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
 from rest_framework.test import APITestCase
 from rest_framework import status
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from .models import Room, Meme, Vote
+from django.utils import timezone
+from MemeRoyale import metrics
+from MemeRoyale.consumers import VoteConsumer
+from MemeRoyale.db_router import PIN_COOKIE, ReplicaMiddleware
+from MemeRoyale.image_worker import process_meme
+from MemeRoyale.redis_pool import AsyncInstrumentedPool, InstrumentedPool
+from MemeRoyale.throttling import Outbox
+from MemeRoyale.round_scheduler import RoundScheduler, advance_round
+from MemeRoyale.routing import websocket_urlpatterns
+from MemeRoyale.timers import TimerWheel, TimerAlreadyRunning
+from .models import Room, Round, Meme, Vote, RoundResult
+from .views import JoinRoomView
+from . import leaderboard, presence, thumbnails, vote_tally
+from .avatars import process_avatar
+from .serializers import MemeSerializer, PublicUserSerializer
 from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.tokens import AccessToken
+from PIL import Image
 
 User = get_user_model()
 
@@ -178,3 +221,1200 @@ class PermissionTests(APITestCase):
         self.client.login(username='otheruser', password='otherpass')
         response = self.client.get(retrieve_url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+CHANNEL_LAYERS_IN_MEMORY = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_IN_MEMORY)
+class TimerWheelTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+        patcher = mock.patch('MemeRoyale.timers.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_broadcasts_only_at_checkpoints_and_deadline(self):
+        # 0.3 saniyelik zamanlayıcı, 0.1 saniyelik ara noktalarla
+        wheel = TimerWheel(checkpoint=0.1)
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add('timer_1', channel)
+
+        ends_at = await wheel.schedule('timer_1', 0.3)
+        updates = []
+        while True:
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            updates.append(message)
+            if message['time_left'] == 0 and time.time() >= ends_at:
+                break
+
+        self.assertEqual(len(updates), 4)
+        self.assertTrue(all(update['ends_at'] == ends_at for update in updates))
+        self.assertIsNone(wheel.ends_at('timer_1'))
+        # Biten zamanlayıcının Redis kaydı silinir
+        await asyncio.sleep(0.05)
+        self.assertFalse(await self.redis.exists('timer:timer_1'))
+
+    async def test_duplicate_timer_rejected(self):
+        wheel = TimerWheel(checkpoint=1)
+        await wheel.schedule('timer_2', 5)
+        with self.assertRaises(TimerAlreadyRunning):
+            await wheel.schedule('timer_2', 5)
+
+        # Başka bir worker'daki çark da Redis kaydı yüzünden reddedilir
+        other = TimerWheel(checkpoint=1)
+        with self.assertRaises(TimerAlreadyRunning):
+            await other.schedule('timer_2', 5)
+
+        # İptal Redis kaydını da siler, diğer worker zamanlayıcıyı başlatabilir
+        self.assertTrue(await wheel.cancel('timer_2'))
+        await other.schedule('timer_2', 5)
+        self.assertFalse(await wheel.cancel('timer_2'))
+        self.assertTrue(await self.redis.exists('timer:timer_2'))
+        await other.cancel('timer_2')
+
+    @override_settings(TIMER_MAX_SECONDS=60)
+    async def test_duration_is_capped(self):
+        wheel = TimerWheel(checkpoint=30)
+        ends_at = await wheel.schedule('timer_3', 1e9)
+        self.assertLessEqual(ends_at, time.time() + 60)
+        self.assertLessEqual(await self.redis.pttl('timer:timer_3'), 60 * 1000)
+        with self.assertRaises(ValueError):
+            await wheel.schedule('timer_4', float('inf'))
+        await wheel.cancel('timer_3')
+
+
+def create_game(host_username='host', meme_count=2):
+    # Oda, round ve meme'lerden oluşan küçük bir oyun kurar
+    host = User.objects.create_user(username=host_username, password='testpass')
+    room = Room.objects.create(name='Game Room', host=host)
+    round_ = Round.objects.create(room=room, theme='memes', meme_submission_end_time=timezone.now())
+    memes = [
+        Meme.objects.create(
+            round=round_,
+            creator=User.objects.create_user(username=f'{host_username}_creator{i}', password='testpass'),
+            image_url=f'http://example.com/{i}.jpg',
+        )
+        for i in range(meme_count)
+    ]
+    return room, round_, memes
+
+
+class VoteCountTests(TestCase):
+    def setUp(self):
+        self.room, self.round, self.memes = create_game()
+        self.voter = User.objects.create_user(username='voter', password='testpass')
+
+    def test_vote_count_follows_vote_rows(self):
+        vote = Vote.objects.create(meme=self.memes[0], voter=self.voter)
+        self.memes[0].refresh_from_db()
+        self.assertEqual(self.memes[0].vote_count, 1)
+
+        vote.delete()
+        self.memes[0].refresh_from_db()
+        self.assertEqual(self.memes[0].vote_count, 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        Vote.objects.create(meme=self.memes[0], voter=self.voter)
+        Meme.objects.update(vote_count=7)
+        call_command('reconcile_vote_counts', stdout=io.StringIO())
+        self.assertEqual(
+            list(Meme.objects.order_by('id').values_list('vote_count', flat=True)), [1, 0]
+        )
+
+    def test_serializer_does_not_count_votes(self):
+        memes = list(Meme.objects.filter(round=self.round))
+        with CaptureQueriesContext(connection) as queries:
+            data = MemeSerializer(memes, many=True).data
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql']])
+        self.assertEqual([item['total_votes'] for item in data], [0, 0])
+
+
+class EndVotingTests(TestCase):
+    def setUp(self):
+        self.room, self.round, self.memes = create_game(meme_count=4)
+        self.voters = [User.objects.create_user(username=f'voter{i}', password='testpass') for i in range(3)]
+
+    def test_winners_resolved_in_constant_queries(self):
+        # memes[1] iki oy, memes[0] ve memes[2] birer oy alır; eşitlikte önce gönderilen kazanır
+        Vote.objects.create(meme=self.memes[1], voter=self.voters[0])
+        Vote.objects.create(meme=self.memes[1], voter=self.voters[1])
+        Vote.objects.create(meme=self.memes[2], voter=self.voters[0])
+        Vote.objects.create(meme=self.memes[0], voter=self.voters[2])
+
+        with self.assertNumQueries(5):
+            self.assertTrue(self.round.end_voting())
+
+        self.round.refresh_from_db()
+        self.assertTrue(self.round.voting_ended)
+        self.assertEqual(self.round.winner, self.memes[1].creator)
+        games_won = {meme.pk: User.objects.get(pk=meme.creator_id).games_won for meme in self.memes}
+        self.assertEqual(games_won, {self.memes[0].pk: 1, self.memes[1].pk: 1, self.memes[2].pk: 1, self.memes[3].pk: 0})
+
+    def test_second_close_is_a_no_op(self):
+        Vote.objects.create(meme=self.memes[0], voter=self.voters[0])
+        self.assertTrue(self.round.end_voting())
+        stale_copy = Round.objects.get(pk=self.round.pk)
+        stale_copy.voting_ended = False
+        self.assertFalse(stale_copy.end_voting())
+        self.assertEqual(User.objects.get(pk=self.memes[0].creator_id).games_won, 1)
+
+
+class VoteWritePathTests(APITestCase):
+    def setUp(self):
+        self.room, self.round, self.memes = create_game()
+        self.voter = User.objects.create_user(username='voter', password='testpass')
+        self.client.force_authenticate(self.voter)
+
+    def test_duplicate_vote_rejected_by_constraint(self):
+        data = {'meme': self.memes[0].id, 'voter': self.voter.id}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('create-vote'), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Oda id'si meme ile birlikte okunur, round ayrıca sorgulanmaz
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('SELECT') and 'FROM "api_round"' in q['sql']])
+        self.assertEqual(response.data['round'], self.round.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('create-vote'), data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("You have already voted for this meme", str(response.data))
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "api_vote"' in q['sql']])
+        self.assertEqual(Vote.objects.filter(meme=self.memes[0]).count(), 1)
+
+
+@override_settings(VOTE_INGESTION='redis', VOTE_FLUSH_BATCH_SIZE=2)
+class RedisVoteTallyTests(APITestCase):
+    def setUp(self):
+        patcher = mock.patch('api.vote_tally.get_redis', return_value=fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.room, self.round, self.memes = create_game()
+        self.voters = [User.objects.create_user(username=f'voter{i}', password='testpass') for i in range(3)]
+        self.client.force_authenticate(self.voters[0])
+
+    def test_votes_are_deduped_and_served_from_redis(self):
+        data = {'meme': self.memes[0].id, 'voter': self.voters[0].id}
+        self.assertEqual(self.client.post(reverse('create-vote'), data).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(reverse('create-vote'), data).status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Oy henüz veritabanına yazılmadı ama canlı sayılarda görünür
+        self.assertFalse(Vote.objects.exists())
+        response = self.client.get(reverse('round-tally', kwargs={'pk': self.round.id}))
+        self.assertEqual(response.data['totals'], {str(self.memes[0].id): 1})
+
+    def test_flush_writes_batches_and_end_voting_finalizes(self):
+        for voter in self.voters:
+            vote_tally.record_vote(self.round.id, self.memes[1].id, voter.id)
+        self.assertEqual(vote_tally.flush_pending(), 3)
+        self.memes[1].refresh_from_db()
+        self.assertEqual(self.memes[1].vote_count, 3)
+
+        vote_tally.record_vote(self.round.id, self.memes[0].id, self.voters[0].id)
+        self.round.end_voting()
+        self.assertEqual(Vote.objects.count(), 4)
+        self.assertEqual(self.round.winner, self.memes[1].creator)
+
+        # Kapanan round'a oy kabul edilmez
+        with self.assertRaises(vote_tally.VotingClosed):
+            vote_tally.record_vote(self.round.id, self.memes[0].id, self.voters[1].id)
+        response = self.client.post(reverse('create-vote'), {'meme': self.memes[0].id, 'voter': self.voters[0].id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_votes_stay_pending_until_the_flush_commits(self):
+        vote_tally.record_vote(self.round.id, self.memes[0].id, self.voters[0].id)
+        with mock.patch('api.models.Meme.sync_vote_counts', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                vote_tally.flush_round(self.round.id)
+        self.assertFalse(Vote.objects.exists())
+
+        self.assertEqual(vote_tally.flush_round(self.round.id), 1)
+        self.assertEqual(Vote.objects.count(), 1)
+        self.assertFalse(vote_tally.get_redis().scard(vote_tally.pending_key(self.round.id)))
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_IN_MEMORY, VOTE_BROADCAST_WINDOW_MS=50)
+class VoteBroadcastTests(SimpleTestCase):
+    async def connect(self, room_name='1'):
+        communicator = WebsocketCommunicator(VoteConsumer.as_asgi(), f'/ws/room/{room_name}/vote/')
+        communicator.scope['url_route'] = {'kwargs': {'room_name': room_name}}
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def cast(self, meme_id, room_name='1'):
+        # Oylar REST ile kaydedilir, view'lar odanın grubuna vote_cast olayı yayınlar
+        await get_channel_layer().group_send(f'game_{room_name}', {'type': 'vote_cast', 'meme': meme_id})
+
+    async def test_votes_are_coalesced_into_sequenced_frames(self):
+        totals = {1: 0, 2: 0}
+
+        async def fake_load_totals(meme_ids):
+            return {meme_id: totals[meme_id] for meme_id in meme_ids}
+
+        with mock.patch('MemeRoyale.vote_broadcast.load_totals', fake_load_totals):
+            first, second = await self.connect(), await self.connect()
+
+            for meme_id in (1, 1, 2, 1):
+                totals[meme_id] += 1
+                await self.cast(meme_id)
+
+            for communicator in (first, second):
+                frame = await communicator.receive_json_from(timeout=1)
+                # Eski oy uç noktası tek soketten önceki çerçeve biçimini korur
+                self.assertEqual(frame, {'action': 'vote', 'type': 'vote_update', 'seq': 1, 'totals': {'1': 3, '2': 1}})
+                self.assertTrue(await communicator.receive_nothing(timeout=0.1))
+
+            # Sonraki çerçeve yalnızca değişen meme'yi taşır
+            totals[2] += 1
+            await self.cast(2)
+            for communicator in (first, second):
+                frame = await communicator.receive_json_from(timeout=1)
+                self.assertEqual(frame['seq'], 2)
+                self.assertEqual(frame['totals'], {'2': 2})
+
+            # İstemciler oy yayınlayamaz
+            await first.send_json_to({'vote': 1})
+            self.assertEqual(await first.receive_json_from(timeout=1), {'error': 'Votes are submitted through the API'})
+            self.assertTrue(await second.receive_nothing(timeout=0.1))
+
+            await first.disconnect()
+            await second.disconnect()
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_IN_MEMORY)
+class GameConsumerTests(SimpleTestCase):
+    async def connect(self, path, username='alice'):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+        communicator.scope['user'] = mock.Mock(is_authenticated=True, id=len(username), username=username)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_single_socket_carries_typed_streams(self):
+        with mock.patch('MemeRoyale.consumers.GameConsumer.join_presence', return_value=[]):
+            game = await self.connect('/ws/room/7/game/')
+        self.assertEqual(
+            await game.receive_json_from(timeout=1),
+            {'type': 'presence', 'action': 'snapshot', 'participants': []}
+        )
+        self.assertEqual(
+            (await game.receive_json_from(timeout=1))['action'], 'user_join'
+        )
+
+        # Eski zamanlayıcı uç noktası aynı gruba katılır ama yalnızca kendi akışını alır
+        legacy_timer = await self.connect('/ws/room/7/timer/', username='bob')
+
+        # Eski uç noktalar çerçeveleri önceki biçimlerinde alır
+        await get_channel_layer().group_send(
+            'game_7', {'type': 'timer_update', 'ends_at': 10.0, 'server_time': 5.0, 'time_left': 5}
+        )
+        self.assertEqual(
+            await game.receive_json_from(timeout=1),
+            {'type': 'timer', 'action': 'timer', 'ends_at': 10.0, 'server_time': 5.0, 'time_left': 5}
+        )
+        self.assertEqual(
+            await legacy_timer.receive_json_from(timeout=1),
+            {'action': 'timer', 'ends_at': 10.0, 'server_time': 5.0, 'time_left': 5}
+        )
+
+        await game.send_json_to({'type': 'chat', 'message': 'hello'})
+        frame = await game.receive_json_from(timeout=1)
+        self.assertEqual((frame['type'], frame['action'], frame['message']), ('chat', 'chat_message', 'hello'))
+        self.assertTrue(await legacy_timer.receive_nothing(timeout=0.1))
+
+        await game.send_json_to({'type': 'unknown'})
+        self.assertEqual(await game.receive_json_from(timeout=1), {'error': 'Invalid message type'})
+
+        # Meme'ler istemciler arasında aktarılmaz
+        await game.send_json_to({'type': 'meme', 'meme_update': {'id': 1}})
+        self.assertEqual(await game.receive_json_from(timeout=1), {'error': 'Memes are submitted through the API'})
+        self.assertTrue(await legacy_timer.receive_nothing(timeout=0.1))
+
+        await legacy_timer.disconnect()
+        with mock.patch('api.presence.aleave'):
+            await game.disconnect()
+
+    @override_settings(WS_CONNECTION_RATE=(0, 2), WS_MAX_FRAME_BYTES=64)
+    async def test_oversized_and_excess_messages_are_rejected(self):
+        with mock.patch('MemeRoyale.consumers.GameConsumer.join_presence', return_value=[]):
+            chat = await self.connect('/ws/room/8/')
+        await chat.receive_json_from(timeout=1)  # presence snapshot
+        self.assertEqual(
+            await chat.receive_json_from(timeout=1), {'type': 'user_join', 'user_id': 5, 'username': 'alice'}
+        )
+
+        await chat.send_json_to({'type': 'chat', 'message': 'x' * 100})
+        self.assertEqual(await chat.receive_json_from(timeout=1), {'error': 'Message too large'})
+
+        # Çok baytlı karakterler sınıra bayt olarak sayılır
+        await chat.send_to(text_data=json.dumps({'type': 'chat', 'message': 'ş' * 20}, ensure_ascii=False))
+        self.assertEqual(await chat.receive_json_from(timeout=1), {'error': 'Message too large'})
+
+        await chat.send_to(bytes_data=b'x' * 100)
+        self.assertEqual(await chat.receive_json_from(timeout=1), {'error': 'Message too large'})
+        await chat.send_to(bytes_data=b'{}')
+        self.assertEqual(await chat.receive_json_from(timeout=1), {'error': 'Binary frames are not supported'})
+
+        for message in ('one', 'two', 'three', 'four'):
+            await chat.send_json_to({'type': 'chat', 'message': message})
+        received = [await chat.receive_json_from(timeout=1) for _ in range(3)]
+        self.assertEqual([frame.get('message') for frame in received[:2]], ['one', 'two'])
+        # Aşım döneminde yalnızca bir hata gönderilir
+        self.assertEqual(received[2], {'error': 'Rate limit exceeded'})
+        self.assertTrue(await chat.receive_nothing(timeout=0.1))
+
+        with mock.patch('api.presence.aleave'):
+            await chat.disconnect()
+
+
+class OutboxTests(SimpleTestCase):
+    async def test_low_priority_messages_are_dropped_when_full(self):
+        sent, reports = [], []
+        release = asyncio.Event()
+
+        async def send(text_data):
+            await release.wait()
+            sent.append(text_data)
+
+        async def on_dropped(dropped):
+            reports.append(dropped)
+
+        outbox = Outbox(send, 2, ('chat',), on_dropped)
+        self.assertTrue(outbox.put('chat', 'c1'))
+        await asyncio.sleep(0)  # ilk mesaj gönderilmek üzere kuyruktan alınır
+        self.assertTrue(outbox.put('chat', 'c2'))
+        self.assertTrue(outbox.put('vote', 'v1'))
+        # Kuyruk dolu: yeni sohbet mesajı atılır, oy için en eski sohbet mesajı çıkarılır
+        self.assertTrue(outbox.put('chat', 'c3'))
+        self.assertTrue(outbox.put('vote', 'v2'))
+        self.assertFalse(outbox.put('vote', 'v3'))
+
+        release.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        self.assertEqual(sent, ['c1', 'v1', 'v2'])
+        self.assertEqual(reports, [{'chat': 2}])
+        outbox.close()
+
+
+class PresenceTests(APITestCase):
+    def setUp(self):
+        patcher = mock.patch('api.presence.get_redis', return_value=fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.host = User.objects.create_user(username='host', password='testpass')
+        self.guest = User.objects.create_user(username='guest', password='testpass')
+        self.room = Room.objects.create(name='Presence Room', host=self.host)
+        self.room.participants.add(self.host)
+        self.client.force_authenticate(self.guest)
+
+    def test_room_detail_reads_roster_from_cache(self):
+        url = reverse('room-detail', kwargs={'pk': self.room.id})
+        self.client.get(url)  # önbelleği doldurur
+
+        # Katılım önbelleğe yazılır, sonraki okuma M2M tablosuna gitmez
+        self.client.get(reverse('room-join', kwargs={'room_id': self.room.id}))
+        presence.touch(self.room.id, self.guest)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse([q for q in queries.captured_queries if 'api_room_participants' in q['sql']])
+        self.assertEqual(response.data['participants'], [
+            {'id': self.host.id, 'username': 'host', 'online': False},
+            {'id': self.guest.id, 'username': 'guest', 'online': True},
+        ])
+
+    def test_expired_heartbeats_are_dropped(self):
+        presence.touch(self.room.id, self.guest)
+        with mock.patch('api.presence.time.time', return_value=time.time() + 60):
+            self.assertEqual(presence.expire_stale(self.room.id), [(self.guest.id, 'guest')])
+        self.assertEqual(presence.get_online(self.room.id), set())
+
+    def test_join_during_roster_fill_is_not_lost(self):
+        read_roster = presence._read_roster
+
+        def join_during_fill(room_id):
+            # Doldurma okumasından sonra commit edilen katılımı taklit eder
+            participants = read_roster(room_id)
+            if self.guest.id not in participants and not self.room.participants.filter(pk=self.guest.pk).exists():
+                self.room.participants.add(self.guest)
+                presence.add_participant(room_id, self.guest.id, 'guest')
+            return participants
+
+        with mock.patch('api.presence._read_roster', side_effect=join_during_fill):
+            presence.get_participants(self.room.id)
+        self.assertEqual(presence.get_participants(self.room.id), {self.host.id: 'host', self.guest.id: 'guest'})
+
+    def test_leave_during_roster_fill_is_not_lost(self):
+        self.room.participants.add(self.guest)
+        read_roster = presence._read_roster
+
+        def leave_during_fill(room_id):
+            participants = read_roster(room_id)
+            if self.room.participants.filter(pk=self.guest.pk).exists():
+                self.room.participants.remove(self.guest)
+                presence.remove_participant(room_id, self.guest.id)
+            return participants
+
+        with mock.patch('api.presence._read_roster', side_effect=leave_during_fill):
+            presence.get_participants(self.room.id)
+        self.assertEqual(presence.get_participants(self.room.id), {self.host.id: 'host'})
+
+
+class RoomAdmissionTests(APITestCase):
+    def setUp(self):
+        patcher = mock.patch('api.presence.get_redis', return_value=fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.host = User.objects.create_user(username='host', password='testpass')
+        self.room = Room.objects.create(name='Small Room', host=self.host, max_capacity=2)
+
+    def test_join_respects_capacity_and_is_idempotent(self):
+        users = [User.objects.create_user(username=f'player{i}', password='testpass') for i in range(3)]
+        url = reverse('room-join', kwargs={'room_id': self.room.id})
+
+        self.client.force_authenticate(users[0])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(users[1])
+        response = self.client.get(url)
+        self.assertEqual(response.data['participants'], ['player0', 'player1'])
+
+        self.client.force_authenticate(users[2])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_409_CONFLICT)
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.participant_count, 2)
+        self.assertEqual(self.room.participants.count(), 2)
+
+    def test_host_cannot_reset_the_participant_count(self):
+        player = User.objects.create_user(username='player', password='testpass')
+        self.room.add_participant(self.host)
+        self.room.add_participant(player)
+
+        self.client.force_authenticate(self.host)
+        response = self.client.patch(
+            reverse('room-update', kwargs={'pk': self.room.id}),
+            {'max_capacity': 2, 'participant_count': 0, 'archived_at': '2026-01-01T00:00:00Z'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.participant_count, 2)
+        self.assertIsNone(self.room.archived_at)
+
+        latecomer = User.objects.create_user(username='latecomer', password='testpass')
+        self.assertFalse(self.room.add_participant(latecomer))
+
+
+class RoomAdmissionLoadTests(TransactionTestCase):
+    def setUp(self):
+        patcher = mock.patch('api.presence.get_redis', return_value=fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.host = User.objects.create_user(username='host', password='testpass')
+        self.room = Room.objects.create(name='Crowded Room', host=self.host, max_capacity=5)
+        self.players = [User(username=f'player{i}') for i in range(40)]
+        User.objects.bulk_create(self.players)
+        self.players = list(User.objects.filter(username__startswith='player'))
+
+    def join(self, user):
+        # Her iş parçacığı odayı kendi bağlantısıyla okur, kilit çakışmasında yeniden dener
+        try:
+            for _ in range(50):
+                try:
+                    return Room.objects.get(pk=self.room.pk).add_participant(user)
+                except OperationalError:
+                    time.sleep(0.01)
+            raise AssertionError("join kept failing on a locked database")
+        finally:
+            connection.close()
+
+    def test_simultaneous_joins_never_exceed_capacity(self):
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(self.join, self.players))
+
+        self.room.refresh_from_db()
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(self.room.participant_count, 5)
+        self.assertEqual(self.room.participants.count(), 5)
+
+
+class HomePageCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.host = User.objects.create_user(username='host', password='testpass')
+        Room.objects.create(name='Lobby Room', host=self.host)
+
+    def test_lobby_served_from_cache_with_etag(self):
+        first = self.client.get(reverse('home'))
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('home'))
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        not_modified = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_room_save_invalidates_lobby(self):
+        first = self.client.get(reverse('home'))
+        Room.objects.create(name='Fresh Room', host=self.host)
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['latest_rooms'][0]['name'], 'Fresh Room')
+
+    def test_round_results_invalidate_lobby(self):
+        room, round_, memes = create_game(host_username='gamehost', meme_count=1)
+        Vote.objects.create(meme=memes[0], voter=self.host)
+        first = self.client.get(reverse('home'))
+
+        with mock.patch('api.leaderboard.get_redis', return_value=fakeredis.FakeRedis(server=fakeredis.FakeServer())):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(round_.end_voting())
+
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cards = {card['id']: card for card in response.data['latest_users']}
+        self.assertEqual(cards[memes[0].creator_id]['games_won'], 1)
+
+
+class SlimSerializerTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('api.presence.get_redis', return_value=fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.room, self.round, self.memes = create_game(meme_count=3)
+        self.room.participants.add(*User.objects.all())
+
+    def test_lobby_uses_public_cards_in_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.data['latest_rooms'][0]['host'], 'host')
+        self.assertEqual(set(response.data['latest_users'][0]), {'id', 'username', 'games_won', 'games_played', 'avatars'})
+        self.assertNotIn(b'password', response.content)
+
+    def test_round_detail_embeds_meme_cards(self):
+        self.client.force_authenticate(self.room.host)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('round-detail', kwargs={'pk': self.round.id}))
+        self.assertEqual([meme['creator'] for meme in response.data['memes']], [meme.creator.username for meme in self.memes])
+
+
+class RoomBrowserTests(APITestCase):
+    def setUp(self):
+        host = User.objects.create_user(username='host', password='testpass')
+        created_at = timezone.now()
+        for i in range(5):
+            Room.objects.create(name=f'Ended {i}', host=host, status='ended', theme='music')
+        Room.objects.create(name='Waiting', host=host, status='waiting', theme='music')
+        # Aynı created_at değerine sahip odalar id ile sıralanır
+        Room.objects.filter(status='ended').update(created_at=created_at)
+
+    def test_keyset_pages_cover_filtered_rooms_once(self):
+        names = []
+        url = reverse('room-list') + '?status=ended&theme=music&page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names += [room['name'] for room in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(names, [f'Ended {i}' for i in reversed(range(5))])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('room-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ArchiveRoomsTests(TestCase):
+    def setUp(self):
+        self.room, self.round, self.memes = create_game()
+        self.voter = User.objects.create_user(username='voter', password='testpass')
+        self.room.participants.add(self.voter)
+        Vote.objects.create(meme=self.memes[1], voter=self.voter)
+        self.round.end_voting()
+        self.room.end_game()
+        Room.objects.filter(pk=self.room.pk).update(end_time=timezone.now() - timedelta(days=40))
+        self.recent = Room.objects.create(name='Recent', host=self.room.host, status='ended', end_time=timezone.now())
+
+    def test_old_rooms_are_exported_and_compacted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = f'{directory}/rooms.jsonl'
+            with mock.patch('api.presence.get_redis', return_value=fakeredis.FakeRedis(server=fakeredis.FakeServer())):
+                call_command('archive_rooms', days=30, output=output, stdout=io.StringIO())
+            with open(output) as archive:
+                lines = [json.loads(line) for line in archive]
+
+        self.assertEqual([line['id'] for line in lines], [self.room.id])
+        self.assertEqual(lines[0]['participants'], [self.voter.id])
+        self.assertEqual(lines[0]['rounds'][0]['memes'][1]['voters'], [self.voter.id])
+
+        self.assertFalse(Round.objects.filter(room=self.room).exists())
+        self.assertFalse(Meme.objects.exists())
+        self.assertFalse(Vote.objects.exists())
+        self.assertFalse(self.room.participants.exists())
+
+        result = RoundResult.objects.get(room=self.room)
+        self.assertEqual(result.winner, self.memes[1].creator)
+        self.assertEqual([meme['votes'] for meme in result.meme_totals], [0, 1])
+        self.room.refresh_from_db()
+        self.recent.refresh_from_db()
+        self.assertIsNotNone(self.room.archived_at)
+        self.assertIsNone(self.recent.archived_at)
+
+    def test_failed_export_keeps_the_rooms(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = f'{directory}/rooms.jsonl'
+            with mock.patch('os.fsync', side_effect=OSError('disk full')), self.assertRaises(OSError):
+                call_command('archive_rooms', days=30, output=output, stdout=io.StringIO())
+            self.assertEqual(os.path.getsize(output), 0)
+
+        self.assertTrue(Vote.objects.exists())
+        self.assertTrue(self.room.participants.exists())
+        self.assertFalse(RoundResult.objects.exists())
+        self.room.refresh_from_db()
+        self.assertIsNone(self.room.archived_at)
+
+
+class LeaderboardTests(APITestCase):
+    def setUp(self):
+        redis_patch = mock.patch('api.leaderboard.get_redis', return_value=fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+        self.redis = redis_patch.start()()
+        self.addCleanup(redis_patch.stop)
+
+        self.room, self.round, self.memes = create_game(meme_count=4)
+        Room.objects.filter(pk=self.room.pk).update(theme='music')
+        self.room.theme = 'music'
+        self.room.participants.add(*User.objects.exclude(pk=self.room.host_id))
+        for i, meme in enumerate(self.memes[:2]):
+            for voter in User.objects.exclude(pk=meme.creator_id)[:i + 1]:
+                Vote.objects.create(meme=meme, voter=voter)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.round.end_voting()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.room.end_game())
+        self.assertFalse(self.room.end_game())
+
+    def test_boards_follow_round_and_game_results(self):
+        response = self.client.get(reverse('leaderboard') + '?board=wins&theme=music&page_size=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['results'][0]['score'], 1)
+        self.assertIsNotNone(response.data['next'])
+
+        creator = self.memes[1].creator
+        self.assertEqual(User.objects.get(pk=creator.pk).games_played, 1)
+        self.client.force_authenticate(creator)
+        response = self.client.get(reverse('leaderboard-rank') + '?board=win_rate')
+        self.assertEqual(response.data['score'], 100.0)
+        self.assertLessEqual(response.data['rank'], 2)
+
+        response = self.client.get(reverse('leaderboard') + '?board=losses')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_closing_a_room_counts_the_game(self):
+        host, player = self.room.host, self.memes[0].creator
+        room = Room.objects.create(name='Closing Room', host=host, theme='music')
+        room.participants.add(host, player)
+        played = self.redis.zscore(leaderboard.board_key('played'), player.id)
+
+        self.client.force_authenticate(host)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('room-close', kwargs={'pk': room.id}), {'max_capacity': room.max_capacity})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        room.refresh_from_db()
+        self.assertEqual(room.status, 'ended')
+        self.assertIsNotNone(room.end_time)
+        self.assertEqual(User.objects.get(pk=player.pk).games_played, 2)
+        self.assertEqual(self.redis.zscore(leaderboard.board_key('played'), player.id), played + 1)
+        self.assertEqual(self.redis.zscore(leaderboard.board_key('played', 'music'), host.id), 1)
+
+    def test_rebuild_matches_incremental_boards(self):
+        incremental = {
+            key: self.redis.zrange(key, 0, -1, withscores=True)
+            for board in leaderboard.BOARDS for key in (leaderboard.board_key(board), leaderboard.board_key(board, 'music'))
+        }
+        self.redis.flushall()
+        call_command('rebuild_leaderboard', stdout=io.StringIO())
+        rebuilt = {key: self.redis.zrange(key, 0, -1, withscores=True) for key in incremental}
+        self.assertEqual(rebuilt, incremental)
+
+    def test_win_rate_follows_counters_changed_during_refresh(self):
+        user = self.memes[1].creator
+        compute = leaderboard.win_rate
+        played = []
+
+        def play_during_refresh(games_won, games_played):
+            # Oran hesaplanırken başka bir oyun sonucunun sayacı artırmasını taklit eder
+            if not played:
+                played.append(True)
+                self.redis.zincrby(leaderboard.board_key('played'), 1, user.id)
+            return compute(games_won, games_played)
+
+        with mock.patch('api.leaderboard.win_rate', side_effect=play_during_refresh):
+            leaderboard.record_wins([user.id])
+        self.assertEqual(self.redis.zscore(leaderboard.board_key('win_rate'), user.id), 100.0)
+
+
+class RoundLifecycleTests(TestCase):
+    def setUp(self):
+        self.room, self.round, self.memes = create_game()
+        self.voter = User.objects.create_user(username='voter', password='testpass')
+        Vote.objects.create(meme=self.memes[0], voter=self.voter)
+
+    def test_phases_advance_once_when_due(self):
+        Round.objects.filter(pk=self.round.pk).update(meme_submission_end_time=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(advance_round(self.round.pk)[0], None)
+
+        Round.objects.filter(pk=self.round.pk).update(meme_submission_end_time=timezone.now())
+        event, next_deadline = advance_round(self.round.pk)
+        self.assertEqual((event['type'], event['phase'], event['room']), ('phase_change', 'voting', self.room.pk))
+        self.assertEqual(next_deadline, Round.objects.get(pk=self.round.pk).voting_end_time)
+
+        # Aynı geçişi ikinci bir worker tekrar yapamaz
+        stale_copy = Round.objects.get(pk=self.round.pk)
+        stale_copy.voting_start_time = None
+        self.assertFalse(stale_copy.start_voting())
+
+        Round.objects.filter(pk=self.round.pk).update(voting_end_time=timezone.now())
+        event, next_deadline = advance_round(self.round.pk)
+        self.assertEqual((event['phase'], event['winner'], next_deadline), ('ended', self.memes[0].creator_id, None))
+        self.assertEqual(advance_round(self.round.pk), (None, None))
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_IN_MEMORY, ROUND_VOTING_SECONDS=0.2)
+class RoundSchedulerTests(TransactionTestCase):
+    async def test_new_round_is_advanced_and_broadcast(self):
+        room, round_, _ = await database_sync_to_async(create_game)()
+        await Round.objects.filter(pk=round_.pk).aupdate(meme_submission_end_time=timezone.now() + timedelta(seconds=0.2))
+
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(f'game_{room.pk}', channel)
+
+        scheduler = asyncio.create_task(RoundScheduler().run())
+        try:
+            voting = await asyncio.wait_for(layer.receive(channel), 2)
+            ended = await asyncio.wait_for(layer.receive(channel), 2)
+        finally:
+            scheduler.cancel()
+
+        self.assertEqual((voting['phase'], ended['phase']), ('voting', 'ended'))
+        self.assertTrue(await Round.objects.filter(pk=round_.pk, voting_ended=True).aexists())
+
+    async def test_failing_listener_stops_the_scheduler(self):
+        with mock.patch.object(RoundScheduler, 'listen', side_effect=RuntimeError('receive failed')):
+            with self.assertRaises(RuntimeError):
+                await asyncio.wait_for(RoundScheduler().run(), 2)
+
+    async def test_only_room_host_starts_timers(self):
+        room, _, _ = await database_sync_to_async(create_game)()
+        with mock.patch('MemeRoyale.consumers.timer_wheel.schedule') as schedule:
+            for user_id in (room.host_id + 100, room.host_id):
+                communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/room/{room.pk}/timer/')
+                communicator.scope['user'] = mock.Mock(is_authenticated=True, id=user_id, username='user')
+                await communicator.connect()
+                await communicator.send_json_to({'seconds': 5})
+                if user_id != room.host_id:
+                    self.assertEqual(
+                        await communicator.receive_json_from(timeout=1), {'error': 'Only the room host can start timers'}
+                    )
+                else:
+                    self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+                await communicator.disconnect()
+        schedule.assert_awaited_once_with(f'game_{room.pk}', 5)
+
+
+class RedisPoolTests(SimpleTestCase):
+    async def test_saturation_is_counted(self):
+        pool = AsyncInstrumentedPool(
+            max_connections=1, timeout=0.05,
+            connection_class=fakeredis.aioredis.FakeConnection, server=fakeredis.FakeServer(),
+        )
+        client = redis.asyncio.Redis(connection_pool=pool)
+
+        held = await pool.get_connection()
+        with self.assertRaises(redis.ConnectionError):
+            await client.ping()
+        await pool.release(held)
+        self.assertTrue(await client.ping())
+
+        stats = pool.stats.as_dict()
+        self.assertEqual((stats['in_use'], stats['acquired'], stats['saturated'], stats['timeouts']), (0, 2, 1, 1))
+
+    def test_failed_connects_do_not_release_counted_connections(self):
+        pool = InstrumentedPool(
+            max_connections=4, timeout=0.05,
+            connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer(),
+        )
+        held = pool.get_connection()
+
+        # redis-py bağlantı kurulamadığında da release() çağırır
+        with mock.patch.object(type(held), 'connect', side_effect=redis.ConnectionError('refused')):
+            with self.assertRaises(redis.ConnectionError):
+                pool.get_connection()
+        self.assertEqual(pool.stats.as_dict()['in_use'], 1)
+
+        def borrow():
+            for _ in range(50):
+                pool.release(pool.get_connection())
+
+        threads = [threading.Thread(target=borrow) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool.release(held)
+
+        stats = pool.stats.as_dict()
+        self.assertEqual((stats['in_use'], stats['acquired'], stats['timeouts']), (0, 151, 0))
+
+    async def test_heartbeat_expires_stale_users_in_one_pipeline(self):
+        alice, bob = mock.Mock(id=1, username='alice'), mock.Mock(id=2, username='bob')
+        with mock.patch('api.presence.get_async_redis', return_value=fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())):
+            await presence.atouch(7, bob)
+            with mock.patch('api.presence.time.time', return_value=time.time() + 60):
+                self.assertEqual(await presence.aheartbeat(7, alice), [(2, 'bob')])
+
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    def test_full_games_are_reported_and_cleaned_up(self):
+        out = io.StringIO()
+        with tempfile.NamedTemporaryFile(suffix='.json') as report:
+            call_command(
+                'loadtest', rooms=2, players=3, socket='timer', memory_layer=True,
+                fast_passwords=True, output=report.name, stdout=out,
+            )
+            steps = {row['step']: row for row in json.load(open(report.name))['steps']}
+
+        self.assertEqual(steps['vote']['count'], 6)
+        self.assertEqual(steps['ws phase_change']['count'], 6)
+        self.assertEqual(sum(row['errors'] for row in steps.values()), 0)
+        self.assertGreater(steps['join room']['queries_per_call'], 0)
+        self.assertIn('memory per connection', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='load-').exists())
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_IN_MEMORY)
+class AsyncGameViewTests(TestCase):
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        for target, client in (
+            ('api.presence.get_redis', fakeredis.FakeRedis(server=server)),
+            ('api.presence.get_async_redis', fakeredis.aioredis.FakeRedis(server=server)),
+        ):
+            patcher = mock.patch(target, return_value=client)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.room, self.round, self.memes = create_game()
+        self.voter = User.objects.create_user(username='voter', password='testpass')
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.voter)}'}
+
+    async def test_vote_is_stored_and_published(self):
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(f'game_{self.room.pk}', channel)
+
+        url = reverse('async-create-vote')
+        response = await self.async_client.post(url, {'meme': self.memes[0].pk}, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await layer.receive(channel), {'type': 'vote_cast', 'meme': self.memes[0].pk})
+        self.assertEqual((await Meme.objects.aget(pk=self.memes[0].pk)).vote_count, 1)
+
+        response = await self.async_client.post(url, {'meme': self.memes[0].pk}, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.async_client.post(url, {'meme': self.memes[0].pk}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_join_and_round_detail(self):
+        await Room.objects.filter(pk=self.room.pk).aupdate(max_capacity=1)
+        response = await self.async_client.get(reverse('async-room-join', kwargs={'room_id': self.room.pk}), headers=self.headers)
+        self.assertEqual(response.json()['participants'], ['voter'])
+
+        other = await User.objects.acreate(username='late')
+        response = await self.async_client.get(
+            reverse('async-room-join', kwargs={'room_id': self.room.pk}),
+            headers={'Authorization': f'Bearer {AccessToken.for_user(other)}'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        response = await self.async_client.get(reverse('async-round-detail', kwargs={'pk': self.round.pk}), headers=self.headers)
+        self.assertEqual([meme['id'] for meme in response.json()['memes']], [meme.pk for meme in self.memes])
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS_IN_MEMORY)
+class EventPublishingTests(APITestCase):
+    def setUp(self):
+        self.room, self.round, self.memes = create_game()
+        self.voter = User.objects.create_user(username='voter', password='testpass')
+        self.client.force_authenticate(self.voter)
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(f'game_{self.room.pk}', self.channel)
+
+    def receive(self):
+        return async_to_sync(self.layer.receive)(self.channel)
+
+    def test_created_memes_and_votes_are_published_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('create-meme'), {
+                'round': self.round.pk, 'creator': self.voter.pk, 'image_url': 'http://example.com/new.jpg',
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        event = self.receive()
+        self.assertEqual((event['type'], event['meme']['id'], event['meme']['creator']), ('meme_created', response.data['id'], 'voter'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('create-vote'), {'meme': self.memes[0].pk, 'voter': self.voter.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.receive(), {'type': 'vote_cast', 'meme': self.memes[0].pk})
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='scrape', CHANNEL_LAYERS=CHANNEL_LAYERS_IN_MEMORY)
+class MetricsTests(APITestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.room, self.round, self.memes = create_game()
+        self.client.force_authenticate(user=self.room.host)
+
+    def test_requests_are_measured_and_exported(self):
+        response = self.client.get(reverse('round-detail', kwargs={'pk': self.round.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        text = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape').content.decode()
+        self.assertIn('memeroyale_http_requests_total{method="GET",status="200",view="round-detail"} 1', text)
+        self.assertIn(f'memeroyale_http_response_bytes_total{{view="round-detail"}} {len(response.content)}', text)
+        self.assertIn('memeroyale_http_db_queries_count{view="round-detail"} 1', text)
+        self.assertNotIn('memeroyale_http_db_queries_sum{view="round-detail"} 0\n', text)
+        self.assertIn('memeroyale_http_serializer_seconds_total{view="round-detail"}', text)
+
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_consumer_events_are_measured(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/room/9/vote/')
+        communicator.scope['user'] = mock.Mock(is_authenticated=True, id=1, username='alice')
+        await communicator.connect()
+        await communicator.send_json_to({'vote': self.memes[0].id})
+        self.assertEqual(await communicator.receive_json_from(timeout=2), {'error': 'Votes are submitted through the API'})
+        await get_channel_layer().group_send('game_9', {'type': 'vote_cast', 'meme': self.memes[0].id})
+        self.assertEqual((await communicator.receive_json_from(timeout=2))['type'], 'vote_update')
+        await communicator.disconnect()
+
+        with mock.patch('MemeRoyale.consumers.GameConsumer.join_presence', return_value=[]):
+            room = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/room/9/')
+            room.scope['user'] = mock.Mock(is_authenticated=True, id=1, username='alice')
+            await room.connect()
+        await room.receive_json_from(timeout=2)  # presence snapshot
+        await room.receive_json_from(timeout=2)  # user_join
+        with mock.patch('api.presence.aleave'):
+            await room.disconnect()
+
+        text = metrics.registry.render()
+        self.assertIn('memeroyale_ws_messages_total{consumer="VoteConsumer",event="vote_cast"} 1', text)
+        self.assertIn('memeroyale_ws_messages_total{consumer="VoteConsumer",event="websocket.receive"} 1', text)
+        self.assertIn('memeroyale_ws_group_send_duration_seconds_count{event="user_join"} 1', text)
+
+
+class DatabaseProfileTests(TestCase):
+    def test_sqlite_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_ROUTERS=['MemeRoyale.db_router.ReplicaRouter'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def route(self, request, view_func=None, write=False):
+        seen = []
+
+        def view(request):
+            if view_func is not None:
+                middleware.process_view(request, view_func, (), {})
+            seen.append(router.db_for_read(Room))
+            if write:
+                router.db_for_write(Room)
+                seen.append(router.db_for_read(Room))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(view)
+        return seen, middleware(request)
+
+    def test_safe_reads_use_replica_until_request_writes(self):
+        seen, response = self.route(RequestFactory().get('/'), write=True)
+        self.assertEqual(seen, ['replica', 'default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        # Yazan istemcinin sonraki istekleri birincilden okur
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.route(request)[0], ['default'])
+
+        # İstek dışındaki okumalar birincile gider
+        self.assertEqual(router.db_for_read(Room), 'default')
+
+    def test_bearer_clients_are_pinned_without_cookies(self):
+        server = fakeredis.FakeServer()
+        with mock.patch('MemeRoyale.db_router.get_redis', return_value=fakeredis.FakeRedis(server=server)):
+            self.route(RequestFactory().post('/', HTTP_AUTHORIZATION='Bearer writer'), write=True)
+
+            # Başka origin'deki istemci çerezi geri göndermez, token ile tanınır
+            self.assertEqual(self.route(RequestFactory().get('/', HTTP_AUTHORIZATION='Bearer writer'))[0], ['default'])
+            self.assertEqual(self.route(RequestFactory().get('/', HTTP_AUTHORIZATION='Bearer reader'))[0], ['replica'])
+
+    def test_unsafe_methods_and_opted_out_views_use_primary(self):
+        self.assertEqual(self.route(RequestFactory().post('/'))[0], ['default'])
+        seen, response = self.route(RequestFactory().get('/'), view_func=JoinRoomView.as_view())
+        self.assertEqual(seen, ['default'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class ImageHandler(http.server.BaseHTTPRequestHandler):
+    image = b''
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(self.image)))
+        self.end_headers()
+        self.wfile.write(self.image)
+
+    def log_message(self, *args):
+        pass
+
+
+class MemeThumbnailTests(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        buffer = io.BytesIO()
+        Image.new('RGBA', (1200, 800), (255, 0, 0, 128)).save(buffer, 'PNG')
+        ImageHandler.image = buffer.getvalue()
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ImageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/meme.png'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.settings_override = override_settings(MEME_THUMBNAIL_ROOT=root.name, MEME_IMAGE_ALLOW_PRIVATE_HOSTS=True)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        ImageHandler.requests = 0
+
+    def test_thumbnails_are_created_once_and_served(self):
+        _, _, memes = create_game()
+        Meme.objects.filter(pk__in=[meme.pk for meme in memes]).update(image_url=self.url)
+
+        self.assertEqual(process_meme(memes[0].pk).image_status, Meme.IMAGE_READY)
+        # Aynı adresteki ikinci meme görseli yeniden indirmez
+        self.assertEqual(process_meme(memes[1].pk).image_status, Meme.IMAGE_READY)
+        self.assertEqual(ImageHandler.requests, 1)
+        self.assertIsNone(process_meme(memes[0].pk))
+
+        thumbnails = MemeSerializer(Meme.objects.get(pk=memes[1].pk)).data['thumbnails']
+        self.assertEqual(sorted(thumbnails, key=int), ['160', '480', '960'])
+        response = self.client.get(thumbnails['480']['webp'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('immutable', response['Cache-Control'])
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (480, 320))
+
+    def test_private_hosts_are_refused(self):
+        _, _, memes = create_game(meme_count=1)
+        Meme.objects.filter(pk=memes[0].pk).update(image_url=self.url)
+
+        with override_settings(MEME_IMAGE_ALLOW_PRIVATE_HOSTS=False):
+            meme = process_meme(memes[0].pk)
+        self.assertEqual(meme.image_status, Meme.IMAGE_FAILED)
+        self.assertIsNone(MemeSerializer(Meme.objects.get(pk=meme.pk)).data['thumbnails'])
+        self.assertEqual(ImageHandler.requests, 0)
+
+    def test_connection_uses_the_checked_address(self):
+        # İkinci çözümleme yerel adres döndürse de bağlantı kontrol edilen adrese açılır
+        answers = [
+            [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('93.184.216.34', 80))],
+            [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('127.0.0.1', 80))],
+        ]
+        with override_settings(MEME_IMAGE_ALLOW_PRIVATE_HOSTS=False), \
+                mock.patch('socket.getaddrinfo', side_effect=answers) as getaddrinfo, \
+                mock.patch('socket.create_connection', side_effect=OSError('unreachable')) as create_connection:
+            with self.assertRaises(OSError):
+                thumbnails.fetch('http://rebind.example/meme.png')
+        self.assertEqual(getaddrinfo.call_count, 1)
+        create_connection.assert_called_once_with(('93.184.216.34', 80), mock.ANY)
+
+    def test_memes_claimed_by_another_worker_are_skipped(self):
+        _, _, memes = create_game(meme_count=1)
+        Meme.objects.filter(pk=memes[0].pk).update(image_url=self.url, image_status=Meme.IMAGE_PROCESSING)
+        self.assertIsNone(process_meme(memes[0].pk))
+        self.assertEqual(ImageHandler.requests, 0)
+
+
+class ProfilePictureTests(APITestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.settings_override = override_settings(MEDIA_ROOT=root.name, AVATAR_ROOT=f'{root.name}/avatars')
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def upload(self, username, size=(300, 200)):
+        user = User.objects.create_user(username=username, password='testpass')
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'blue').save(buffer, 'PNG')
+        self.client.force_authenticate(user)
+        response = self.client.patch(
+            reverse('user-update'),
+            {'profile_picture': SimpleUploadedFile('me.png', buffer.getvalue(), 'image/png')},
+            format='multipart',
+        )
+        user.refresh_from_db()
+        return user, response
+
+    def test_avatars_are_created_once_and_public_cards_expose_only_avatars(self):
+        user, response = self.upload('first')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(user.avatar_status, User.AVATAR_PENDING)
+        self.assertEqual(process_avatar(user.pk, user.avatar_hash), User.AVATAR_READY)
+
+        # Aynı içerik ikinci kez yüklendiğinde orijinal ve avatarlar yeniden üretilmez
+        other, _ = self.upload('second')
+        self.assertEqual(other.avatar_status, User.AVATAR_READY)
+        self.assertEqual(other.profile_picture.name, user.profile_picture.name)
+
+        data = PublicUserSerializer(other).data
+        self.assertNotIn('profile_picture', data)
+        self.assertEqual(sorted(data['avatars'], key=int), ['48', '128'])
+        response = self.client.get(data['avatars']['128']['webp'])
+        self.assertIn('immutable', response['Cache-Control'])
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (128, 128))
+
+    def test_oversized_and_small_pictures_are_rejected(self):
+        with override_settings(PROFILE_PICTURE_MAX_BYTES=200):
+            user, response = self.upload('large')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('at most 200 bytes', response.data['profile_picture'][0])
+
+        user, response = self.upload('small', size=(16, 16))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(user.profile_picture)
@@ -0,0 +1,182 @@
+"""
+Meme görsellerinin küçük resimleri.
+
+Gönderilen görsel istek sırasında değil, görsel worker'ında (run_image_worker)
+bir kez indirilir. Sabit boyutlarda WebP ve JPEG küçük resimler üretilir ve
+orijinalin SHA-256 özetiyle adlandırılarak diske yazılır; aynı içerik tek kez
+saklanır ve dosya adı içerikle değiştiği için uzun süre önbelleklenebilir.
+"""
+import hashlib
+import http.client
+import io
+import ipaddress
+import os
+import socket
+import urllib.request
+import uuid
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+# (dosya uzantısı, Pillow biçimi, kayıt seçenekleri)
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+def get_sizes():
+    return sorted(getattr(settings, 'MEME_THUMBNAIL_SIZES', (160, 480, 960)), reverse=True)
+
+
+def thumbnail_name(image_hash, size, extension):
+    return f"{image_hash[:2]}/{image_hash}-{size}.{extension}"
+
+
+def thumbnail_urls(image_hash):
+    prefix = settings.MEME_THUMBNAIL_URL
+    return {
+        str(size): {extension: prefix + thumbnail_name(image_hash, size, extension) for extension, _, _ in FORMATS}
+        for size in sorted(get_sizes())
+    }
+
+
+def thumbnails_exist(image_hash):
+    return all(
+        os.path.exists(os.path.join(settings.MEME_THUMBNAIL_ROOT, thumbnail_name(image_hash, size, extension)))
+        for size in get_sizes() for extension, _, _ in FORMATS
+    )
+
+
+def check_url(url):
+    parsed = urlsplit(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ImageFetchError(f"Unsupported image URL {url!r}")
+
+
+def resolve(host, port):
+    """
+    Sunucunun adresini çözer ve bağlanılacak adresi döndürür. Yalnızca genel
+    internetteki adreslere izin verilir; sunucunun kendi ağındaki servislerin
+    meme adresi üzerinden çağrılması engellenir.
+    """
+    addresses = [address[0] for *_, address in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)]
+    if not getattr(settings, 'MEME_IMAGE_ALLOW_PRIVATE_HOSTS', False):
+        for address in addresses:
+            ip = ipaddress.ip_address(address)
+            if not ip.is_global:
+                raise ImageFetchError(f"Refusing to fetch image from non-public address {ip}")
+    return addresses[0]
+
+
+# Bağlantılar kontrol edilen adrese açılır; ad ikinci kez çözülmediği için DNS yeniden
+# bağlama (rebinding) ile yerel bir adrese yönlendirilemez. Host başlığı ve TLS
+# doğrulaması özgün sunucu adıyla yapılır.
+
+class CheckedHTTPConnection(http.client.HTTPConnection):
+    def connect(self):
+        self.sock = socket.create_connection((resolve(self.host, self.port), self.port), self.timeout)
+
+
+class CheckedHTTPSConnection(http.client.HTTPSConnection):
+    def connect(self):
+        sock = socket.create_connection((resolve(self.host, self.port), self.port), self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+class CheckedHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(CheckedHTTPConnection, req)
+
+
+class CheckedHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(CheckedHTTPSConnection, req)
+
+
+class CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+# Ortamdaki proxy ayarları kullanılmaz, bağlantılar doğrudan görsel sunucusuna açılır
+opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), CheckedHTTPHandler, CheckedHTTPSHandler, CheckedRedirectHandler
+)
+
+
+def fetch(url):
+    check_url(url)
+    max_bytes = getattr(settings, 'MEME_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+    request = urllib.request.Request(url, headers={'User-Agent': 'MemeRoyale-thumbnailer'})
+    with opener.open(request, timeout=getattr(settings, 'MEME_IMAGE_FETCH_TIMEOUT', 10)) as response:
+        if response.headers.get_content_maintype() != 'image':
+            raise ImageFetchError(f"{url!r} is not an image ({response.headers.get_content_type()})")
+        data = response.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ImageFetchError(f"{url!r} is larger than {max_bytes} bytes")
+    return data
+
+
+def render(data, image_hash):
+    """
+    Görselden her boyut ve biçim için küçük resim üretip diske yazar.
+    """
+    image = Image.open(io.BytesIO(data))
+    if image.width * image.height > getattr(settings, 'MEME_IMAGE_MAX_PIXELS', 40_000_000):
+        raise ImageFetchError(f"Image is too large ({image.width}x{image.height})")
+
+    sizes = get_sizes()
+    # JPEG'ler çözülürken en büyük küçük resme yakın boyuta indirilir
+    image.draft('RGB', (sizes[0], sizes[0]))
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    # Büyükten küçüğe küçültülür, her adım bir öncekinin çıktısından başlar
+    for size in sizes:
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for extension, content in encode(image, has_alpha):
+            write(thumbnail_name(image_hash, size, extension), content)
+
+
+def encode(image, has_alpha):
+    """
+    Görseli FORMATS'taki her biçimde kodlar; (uzantı, içerik) çiftleri üretir.
+    """
+    for extension, image_format, options in FORMATS:
+        if image_format == 'JPEG' and has_alpha:
+            output = Image.new('RGB', image.size, 'white')
+            output.paste(image, mask=image.getchannel('A'))
+        else:
+            output = image
+        buffer = io.BytesIO()
+        output.save(buffer, image_format, **options)
+        yield extension, buffer.getvalue()
+
+
+def write(name, content, root=None):
+    path = os.path.join(root or settings.MEME_THUMBNAIL_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Yarım dosya sunulmasın diye geçici dosyaya yazılıp yeniden adlandırılır
+    temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary, 'wb') as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+def create_thumbnails(url):
+    """
+    Görseli indirir, küçük resimleri yoksa üretir ve içerik özetini döndürür.
+    """
+    data = fetch(url)
+    image_hash = hashlib.sha256(data).hexdigest()
+    if not thumbnails_exist(image_hash):
+        render(data, image_hash)
+    return image_hash
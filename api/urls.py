@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import HomePageView, UserCreateView, UserLoginView, UserDetailView, UserUpdateView, CreateRoomView, JoinRoomView, RoomDetailView, RoomUpdateView, CloseRoomView, RoundCreateView, RoundDetailView, MemeCreateView, MemeDetailView, VoteCreateView, VoteDetailView
+from .async_views import AsyncMemeCreateView, AsyncVoteCreateView, AsyncJoinRoomView, AsyncRoundDetailView
+from .views import HomePageView, UserCreateView, UserLoginView, UserDetailView, UserUpdateView, CreateRoomView, RoomListView, JoinRoomView, RoomDetailView, RoomUpdateView, CloseRoomView, RoundCreateView, RoundDetailView, RoundTallyView, MemeCreateView, MemeDetailView, MemeThumbnailView, AvatarView, VoteCreateView, VoteDetailView, LeaderboardView, LeaderboardRankView
 
 urlpatterns = [
     # Home sayfası
@@ -10,8 +11,10 @@ urlpatterns = [
     path('register', UserCreateView.as_view(), name='user-register'),
     path('profile', UserDetailView.as_view(), name='user-profile'),
     path('profile/update', UserUpdateView.as_view(), name='user-update'),
+    path('avatars/<path:path>', AvatarView.as_view(), name='avatar'),
 
     # Oda işlemleri
+    path('rooms', RoomListView.as_view(), name='room-list'),
     path('rooms/create', CreateRoomView.as_view(), name='room-create'),
     path('rooms/<int:pk>', RoomDetailView.as_view(), name='room-detail'),
     path('rooms/join/<int:room_id>', JoinRoomView.as_view(), name='room-join'),
@@ -21,12 +24,24 @@ urlpatterns = [
     # Round işlemleri
     path('rounds/create', RoundCreateView.as_view(), name='create-round'),
     path('rounds/<int:pk>', RoundDetailView.as_view(), name='round-detail'),
+    path('rounds/<int:pk>/tally', RoundTallyView.as_view(), name='round-tally'),
 
     # Meme işlemleri
     path('memes/create', MemeCreateView.as_view(), name='create-meme'),
     path('memes/<int:pk>', MemeDetailView.as_view(), name='meme-detail'),
+    path('thumbnails/<path:path>', MemeThumbnailView.as_view(), name='meme-thumbnail'),
 
     # Oy verme işlemleri
     path('votes/create', VoteCreateView.as_view(), name='create-vote'),
     path('votes/<int:pk>', VoteDetailView.as_view(), name='vote-detail'),
+
+    # Oyun sırasındaki sık çağrılan uç noktaların async sürümleri
+    path('async/rooms/join/<int:room_id>', AsyncJoinRoomView.as_view(), name='async-room-join'),
+    path('async/rounds/<int:pk>', AsyncRoundDetailView.as_view(), name='async-round-detail'),
+    path('async/memes/create', AsyncMemeCreateView.as_view(), name='async-create-meme'),
+    path('async/votes/create', AsyncVoteCreateView.as_view(), name='async-create-vote'),
+
+    # Liderlik tablosu
+    path('leaderboard', LeaderboardView.as_view(), name='leaderboard'),
+    path('leaderboard/me', LeaderboardRankView.as_view(), name='leaderboard-rank'),
 ]
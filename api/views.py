@@ -1,13 +1,30 @@
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.response import Response
+from django.conf import settings
 from django.contrib.auth import authenticate
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+from django.views import View
+from django.views.static import serve
+from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
-from .serializers import UserSerializer, RoomSerializer, RoundSerializer, MemeSerializer, VoteSerializer
+import redis
+from . import events, leaderboard, presence, vote_tally
+from .cache import get_home_payload
+from .pagination import KeysetPagination
+from .avatars import AvatarUploadHandler
+from .serializers import UserSerializer, RoomSerializer, RoomDetailSerializer, RoundSerializer, MemeSerializer, VoteSerializer
+from .serializers import PublicUserSerializer, RoomCardSerializer, RoundDetailSerializer
 from .models import User, Room, Round, Meme, Vote
 
+# Küçük serializer'ların ihtiyaç duyduğu sütunlar
+PUBLIC_USER_FIELDS = ('id', 'username', 'games_won', 'games_played', 'avatar_hash', 'avatar_status')
+ROOM_CARD_FIELDS = ('id', 'name', 'theme', 'status', 'participant_count', 'max_capacity', 'created_at', 'host__username')
+MEME_CARD_FIELDS = ('id', 'round', 'image_url', 'caption', 'vote_count', 'image_hash', 'image_status', 'creator__username')
+
+
 class HomePageView(APIView):
     """
     Ana sayfa için genel bilgileri döndüren view.
@@ -15,26 +32,47 @@ class HomePageView(APIView):
     permission_classes = [AllowAny]  # Ana sayfa herkesin erişebileceği bir sayfa olacak
 
     def get(self, request):
+        # Lobi verisi önbellekten sunulur, Room/User değişikliklerinde önbellek temizlenir
+        data, etag = get_home_payload(self.build_payload)
+
+        # İstemcideki kopya güncelse gövde gönderilmez
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        return Response(data, headers={'ETag': etag})
+
+    def build_payload(self):
         # Son oluşturulan odalar
-        latest_rooms = Room.objects.filter(Q(status='active') | Q(status='waiting')).order_by('-created_at')[:5]
-        latest_rooms_serializer = RoomSerializer(latest_rooms, many=True)
+        latest_rooms = (
+            Room.objects.filter(Q(status='active') | Q(status='waiting'))
+            .select_related('host')
+            .only(*ROOM_CARD_FIELDS)
+            .order_by('-created_at')[:5]
+        )
+        latest_rooms_serializer = RoomCardSerializer(latest_rooms, many=True)
 
         # Son kullanıcılar
-        latest_users = User.objects.all().order_by('-date_joined')[:5]
-        latest_users_serializer = UserSerializer(latest_users, many=True)
+        latest_users = User.objects.only(*PUBLIC_USER_FIELDS).order_by('-date_joined')[:5]
+        latest_users_serializer = PublicUserSerializer(latest_users, many=True)
 
         # Ana sayfa bilgilerini döndürme
-        data = {
+        return {
             'latest_rooms': latest_rooms_serializer.data,
             'latest_users': latest_users_serializer.data,
             'message': 'Welcome to the game platform!'
         }
 
-        return Response(data)
+
+# Profil resmi yüklenebilen view'lar
+class ProfilePictureUploadMixin:
+    def initialize_request(self, request, *args, **kwargs):
+        # Yüklenen dosya belleğe alınmadan geçici dosyaya yazılır
+        request.upload_handlers = [AvatarUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
 
 
 # Kullanıcı kaydı için view
-class UserCreateView(generics.CreateAPIView):
+class UserCreateView(ProfilePictureUploadMixin, generics.CreateAPIView):
     """
     Kullanıcı kaydı işlemi.
     """
@@ -88,7 +126,7 @@ class UserDetailView(generics.RetrieveAPIView):
 
 
 # Kullanıcı bilgilerini güncelleme
-class UserUpdateView(generics.UpdateAPIView):
+class UserUpdateView(ProfilePictureUploadMixin, generics.UpdateAPIView):
     """
     Kullanıcı bilgilerini güncelleme işlemi.
     Kullanıcı sadece kendi bilgilerini güncelleyebilir.
@@ -127,33 +165,57 @@ class CreateRoomView(generics.CreateAPIView):
 
 class JoinRoomView(APIView):
     permission_classes = [IsAuthenticated]  # Yalnızca giriş yapmış kullanıcılar katılabilir
+    use_replica = False  # GET ile yazma yapar, kapasite kontrolü birincilden okunmalı
 
     def get(self, request, room_id):
         try:
             # Odayı veritabanında ara
-            room = Room.objects.get(id=room_id)
+            room = Room.objects.only('id', 'name', 'max_capacity', 'participant_count').get(id=room_id)
         except Room.DoesNotExist:
             return Response({"error": "Room not found."}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Kullanıcıyı odaya ekle
-        room.participants.add(request.user)
-        room.save()
+
+        # Kullanıcıyı odaya ekle, kapasite kontrolü ekleme ile aynı transaction'da yapılır
+        if not room.add_participant(request.user):
+            return Response({"error": "Room is full."}, status=status.HTTP_409_CONFLICT)
 
         # Odaya katılan kullanıcıya başarılı yanıt
         return Response({
             "message": f"Successfully joined room: {room.name}",
             "room_name": room.name,
-            "participants": [user.username for user in room.participants.all()]
+            "participants": [participant['username'] for participant in presence.get_roster(room.id)]
         }, status=status.HTTP_200_OK)
 
 
+# Oda listesi
+class RoomListView(generics.ListAPIView):
+    """
+    Odaları status ve theme ile süzerek, en yeniden eskiye keyset sayfalamayla listeler.
+    """
+    serializer_class = RoomCardSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        queryset = Room.objects.select_related('host').only(*ROOM_CARD_FIELDS)
+
+        room_status = self.request.query_params.get('status')
+        if room_status:
+            queryset = queryset.filter(status=room_status)
+
+        theme = self.request.query_params.get('theme')
+        if theme:
+            queryset = queryset.filter(theme=theme)
+
+        return queryset
+
+
 # Oda bilgilerini görüntüleme
 class RoomDetailView(generics.RetrieveAPIView):
     """
     Oda bilgilerini görüntüleme işlemi.
     """
-    queryset = Room.objects.all().select_related('host').prefetch_related('participants')
-    serializer_class = RoomSerializer
+    queryset = Room.objects.all().select_related('host')
+    serializer_class = RoomDetailSerializer
     permission_classes = [AllowAny]  # Yalnızca oturum açmış kullanıcılar odaları görüntüleyebilir
 
 
@@ -207,10 +269,12 @@ class RoundCreateView(generics.CreateAPIView):
 # Round bilgilerini görüntüleme
 class RoundDetailView(generics.RetrieveAPIView):
     """
-    Round bilgilerini görüntüleme işlemi.
+    Round bilgilerini meme kartlarıyla birlikte görüntüleme işlemi.
     """
-    queryset = Round.objects.all()
-    serializer_class = RoundSerializer
+    queryset = Round.objects.prefetch_related(
+        Prefetch('memes', queryset=Meme.objects.select_related('creator').only(*MEME_CARD_FIELDS).order_by('created_at'))
+    )
+    serializer_class = RoundDetailSerializer
     permission_classes = [IsAuthenticated]
 
 
@@ -223,6 +287,11 @@ class MemeCreateView(generics.CreateAPIView):
     serializer_class = MemeSerializer
     permission_classes = [IsAuthenticated]
 
+    def perform_create(self, serializer):
+        meme = serializer.save()
+        # Yeni meme odadaki istemcilere commit sonrası yayınlanır
+        events.publish_on_commit(meme.round.room_id, events.meme_created_event(meme))
+
 
 # Meme bilgilerini görüntüleme
 class MemeDetailView(generics.RetrieveAPIView):
@@ -234,6 +303,25 @@ class MemeDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
 
+# Meme küçük resimleri
+class MemeThumbnailView(View):
+    """
+    Görsel worker'ının ürettiği küçük resimleri sunar.
+    Dosya adları içerik özetinden türetildiği için yanıtlar süresiz önbelleklenebilir.
+    """
+    root_setting = 'MEME_THUMBNAIL_ROOT'
+
+    def get(self, request, path):
+        response = serve(request, path, document_root=getattr(settings, self.root_setting))
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+
+# Profil resmi avatarları
+class AvatarView(MemeThumbnailView):
+    root_setting = 'AVATAR_ROOT'
+
+
 # Oy verme işlemi
 class VoteCreateView(generics.CreateAPIView):
     """
@@ -243,6 +331,58 @@ class VoteCreateView(generics.CreateAPIView):
     serializer_class = VoteSerializer
     permission_classes = [IsAuthenticated]
 
+    def perform_create(self, serializer):
+        vote = serializer.save()
+        # Meme round'uyla birlikte yüklendiği için oda id'si ek sorgu gerektirmez
+        room_id = serializer.validated_data['meme'].round.room_id
+        events.publish_on_commit(room_id, events.vote_cast_event(vote.meme_id))
+
+    def create(self, request, *args, **kwargs):
+        if not vote_tally.is_enabled():
+            return super().create(request, *args, **kwargs)
+
+        # Redis modunda oy önce Redis'e yazılır, veritabanına toplu olarak aktarılır
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        meme = serializer.validated_data['meme']
+        voter = serializer.validated_data['voter']
+
+        # Kapanış işareti Redis'te sınırlı süre tutulur, bitmiş round'lar veritabanından da kontrol edilir
+        if meme.round.voting_ended:
+            raise ValidationError("Voting has ended for this round.")
+        try:
+            if not vote_tally.record_vote(meme.round_id, meme.id, voter.id):
+                raise ValidationError("You have already voted for this meme.")
+        except vote_tally.VotingClosed:
+            raise ValidationError("Voting has ended for this round.")
+        events.publish(meme.round.room_id, events.vote_cast_event(meme.id))
+
+        return Response({
+            'meme': meme.id,
+            'voter': voter.id,
+            'round': meme.round_id,
+        }, status=status.HTTP_201_CREATED)
+
+
+# Canlı oy sayılarını görüntüleme
+class RoundTallyView(APIView):
+    """
+    Round'daki meme'lerin güncel oy sayılarını döndürür.
+    Redis modunda sayılar doğrudan Redis'ten okunur.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        if vote_tally.is_enabled():
+            totals = vote_tally.get_round_totals(pk)
+        else:
+            totals = dict(Meme.objects.filter(round_id=pk).values_list('id', 'vote_count'))
+
+        return Response({
+            'round': pk,
+            'totals': {str(meme_id): total for meme_id, total in totals.items()},
+        }, status=status.HTTP_200_OK)
+
 
 # Oylama sonuçlarını görüntüleme
 class VoteDetailView(generics.RetrieveAPIView):
@@ -252,3 +392,80 @@ class VoteDetailView(generics.RetrieveAPIView):
     queryset = Vote.objects.all()
     serializer_class = VoteSerializer
     permission_classes = [IsAuthenticated]
+
+
+# Liderlik tablosu
+class LeaderboardView(APIView):
+    """
+    Genel ya da temaya özel liderlik tablosunu sayfalı olarak döndürür.
+    Sıralama Redis sorted set'lerinden okunur, sayfa maliyeti tablo boyutuna bağlı değildir.
+    """
+    permission_classes = [AllowAny]
+    page_size = 20
+    max_page_size = 100
+
+    def get(self, request):
+        board, theme = get_leaderboard_params(request)
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', self.page_size)), 1), self.max_page_size)
+        except ValueError:
+            raise ValidationError({'page': 'Invalid page.'})
+
+        start = (page - 1) * page_size
+        try:
+            rows, total = leaderboard.get_page(board, theme, start, page_size)
+        except redis.RedisError:
+            return Response({'error': 'Leaderboard is unavailable.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        usernames = dict(User.objects.filter(pk__in=[user_id for user_id, _ in rows]).values_list('id', 'username'))
+        next_link = None
+        if start + page_size < total:
+            next_link = replace_query_param(request.build_absolute_uri(), 'page', page + 1)
+
+        return Response({
+            'board': board,
+            'theme': theme,
+            'count': total,
+            'next': next_link,
+            'results': [
+                {'rank': start + i + 1, 'id': user_id, 'username': usernames.get(user_id), 'score': format_score(board, score)}
+                for i, (user_id, score) in enumerate(rows)
+            ],
+        }, status=status.HTTP_200_OK)
+
+
+class LeaderboardRankView(APIView):
+    """
+    Giriş yapan kullanıcının liderlik tablosundaki sırasını döndürür.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        board, theme = get_leaderboard_params(request)
+        try:
+            rank, score = leaderboard.get_rank(board, request.user.pk, theme)
+        except redis.RedisError:
+            return Response({'error': 'Leaderboard is unavailable.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        return Response({
+            'board': board,
+            'theme': theme,
+            'rank': rank,
+            'score': format_score(board, score) if score is not None else None,
+        }, status=status.HTTP_200_OK)
+
+
+def get_leaderboard_params(request):
+    board = request.query_params.get('board', 'wins')
+    theme = request.query_params.get('theme') or None
+    if board not in leaderboard.BOARDS:
+        raise ValidationError({'board': f"Must be one of: {', '.join(leaderboard.BOARDS)}."})
+    if theme is not None and theme not in dict(Room.THEME_CHOICES):
+        raise ValidationError({'theme': 'Invalid theme.'})
+    return board, theme
+
+
+def format_score(board, score):
+    # Sayaç tablolarında skor tam sayıdır, yalnızca kazanma oranı ondalıklıdır
+    return score if board == 'win_rate' else int(score)
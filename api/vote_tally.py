@@ -0,0 +1,199 @@
+"""
+Oylama penceresi boyunca oyları Redis'te tutan write-behind oy sayacı.
+
+VOTE_INGESTION = 'redis' olduğunda oylar önce Redis kümelerine yazılır:
+
+    votes:meme:<meme>:voters      meme'ye oy veren kullanıcılar (tekrar engeli + canlı sayı)
+    votes:round:<round>:memes     round içinde oy almış meme'ler
+    votes:round:<round>:pending   henüz veritabanına yazılmamış "meme:voter" kayıtları
+    votes:round:<round>:closed    oylaması kapanmış round işareti
+    votes:pending_rounds          bekleyen kaydı olan round'lar
+
+Bekleyen kayıtlar flush_round / flush_pending ile Vote tablosuna toplu olarak yazılır;
+Redis'ten yalnızca veritabanı transaction'ı commit edildikten sonra silinirler.
+"""
+import redis
+from django.conf import settings
+from django.db import transaction
+
+from MemeRoyale import redis_pool
+
+PENDING_ROUNDS_KEY = 'votes:pending_rounds'
+
+# Oylama bittikten sonra canlı sayıların Redis'te kalma süresi
+TALLY_TTL_SECONDS = 60 * 60
+
+
+def get_redis():
+    return redis_pool.get_redis()
+
+
+def get_async_redis():
+    return redis_pool.get_async_redis()
+
+
+def is_enabled():
+    return getattr(settings, 'VOTE_INGESTION', 'db') == 'redis'
+
+
+def voters_key(meme_id):
+    return f"votes:meme:{meme_id}:voters"
+
+
+def memes_key(round_id):
+    return f"votes:round:{round_id}:memes"
+
+
+def pending_key(round_id):
+    return f"votes:round:{round_id}:pending"
+
+
+def closed_key(round_id):
+    return f"votes:round:{round_id}:closed"
+
+
+class VotingClosed(Exception):
+    """
+    Round'un oylaması kapanmış.
+    """
+
+
+def queue_vote(pipe, round_id, meme_id, voter_id):
+    pipe.sadd(voters_key(meme_id), voter_id)
+    pipe.sadd(memes_key(round_id), meme_id)
+    pipe.sadd(pending_key(round_id), f"{meme_id}:{voter_id}")
+    pipe.sadd(PENDING_ROUNDS_KEY, round_id)
+
+
+def record_vote(round_id, meme_id, voter_id):
+    """
+    Oyu Redis'e yazar. Kullanıcı bu meme'ye daha önce oy verdiyse False döndürür,
+    oylama kapandıysa VotingClosed yükseltir.
+    """
+    # Kapanış işareti izlenir; finalize_round araya girerse MULTI uygulanmaz ve kontrol tekrarlanır
+    with get_redis().pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                pipe.watch(closed_key(round_id))
+                if pipe.exists(closed_key(round_id)):
+                    raise VotingClosed(round_id)
+                pipe.multi()
+                queue_vote(pipe, round_id, meme_id, voter_id)
+                return bool(pipe.execute()[0])
+            except redis.WatchError:
+                continue
+
+
+async def arecord_vote(round_id, meme_id, voter_id):
+    async with get_async_redis().pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                await pipe.watch(closed_key(round_id))
+                if await pipe.exists(closed_key(round_id)):
+                    raise VotingClosed(round_id)
+                pipe.multi()
+                queue_vote(pipe, round_id, meme_id, voter_id)
+                return bool((await pipe.execute())[0])
+            except redis.WatchError:
+                continue
+
+
+def get_totals(meme_ids):
+    """
+    Verilen meme'lerin canlı oy sayılarını tek bir pipeline ile döndürür.
+    """
+    meme_ids = list(meme_ids)
+    pipe = get_redis().pipeline(transaction=False)
+    for meme_id in meme_ids:
+        pipe.scard(voters_key(meme_id))
+    return dict(zip(meme_ids, pipe.execute()))
+
+
+async def aget_totals(meme_ids):
+    meme_ids = list(meme_ids)
+    pipe = get_async_redis().pipeline(transaction=False)
+    for meme_id in meme_ids:
+        pipe.scard(voters_key(meme_id))
+    return dict(zip(meme_ids, await pipe.execute()))
+
+
+def load_totals(meme_ids):
+    """
+    Meme'lerin güncel oy sayılarını etkin kayıt moduna göre Redis'ten ya da vote_count sütunundan okur.
+    """
+    from .models import Meme
+
+    if is_enabled():
+        return get_totals(meme_ids)
+    return dict(Meme.objects.filter(pk__in=list(meme_ids)).values_list('id', 'vote_count'))
+
+
+def get_round_totals(round_id):
+    meme_ids = [int(meme_id) for meme_id in get_redis().smembers(memes_key(round_id))]
+    return get_totals(meme_ids)
+
+
+def flush_round(round_id, batch_size=None):
+    """
+    Round'un bekleyen oylarını Vote tablosuna toplu olarak yazar ve yazılan kayıt sayısını döndürür.
+    """
+    from .models import Meme, Vote
+
+    batch_size = batch_size or getattr(settings, 'VOTE_FLUSH_BATCH_SIZE', 500)
+    client = get_redis()
+    key = pending_key(round_id)
+    flushed = 0
+
+    while True:
+        # Kayıtlar okunur ama commit'e kadar silinmez; süreç arada çökerse bir sonraki
+        # flush aynı kayıtları yeniden yazar, tekrar eden oylar ignore_conflicts ile atlanır
+        members = client.srandmember(key, batch_size)
+        if not members:
+            break
+
+        votes = []
+        for member in members:
+            meme_id, voter_id = member.decode().split(':')
+            votes.append(Vote(round_id=round_id, meme_id=int(meme_id), voter_id=int(voter_id)))
+
+        with transaction.atomic():
+            # Toplu eklemede sinyaller çalışmadığı için sayaçlar ayrıca uzlaştırılır
+            Vote.objects.bulk_create(votes, ignore_conflicts=True)
+            Meme.sync_vote_counts({vote.meme_id for vote in votes})
+        client.srem(key, *members)
+
+        flushed += len(votes)
+
+    return flushed
+
+
+def flush_pending(batch_size=None):
+    """
+    Bekleyen kaydı olan tüm round'ları flush eder.
+    """
+    client = get_redis()
+    flushed = 0
+    for round_id in client.smembers(PENDING_ROUNDS_KEY):
+        round_id = int(round_id)
+        flushed += flush_round(round_id, batch_size)
+        if not client.scard(pending_key(round_id)):
+            client.srem(PENDING_ROUNDS_KEY, round_id)
+    return flushed
+
+
+def finalize_round(round_id):
+    """
+    Oylamayı Redis'te kapatır, son flush'ı yapar ve canlı sayıların süresini başlatır.
+    """
+    client = get_redis()
+    # İşaretten sonra record_vote yeni oy kabul etmez; daha önce kabul edilenler aşağıda yazılır
+    client.set(closed_key(round_id), 1, ex=TALLY_TTL_SECONDS)
+    flushed = flush_round(round_id)
+    meme_ids = client.smembers(memes_key(round_id))
+    pipe = client.pipeline(transaction=False)
+    pipe.srem(PENDING_ROUNDS_KEY, round_id)
+    pipe.expire(memes_key(round_id), TALLY_TTL_SECONDS)
+    for meme_id in meme_ids:
+        pipe.expire(voters_key(int(meme_id)), TALLY_TTL_SECONDS)
+    pipe.execute()
+    return flushed
@@ -101,7 +101,10 @@ function HomePage() {
           <ul className="space-y-2">
             {latestUsers && latestUsers.length > 0 ? (
               latestUsers.map((user) => (
-                <li key={user.id} className="text-lg text-gray-700">{user.username}</li>
+                <li key={user.id} className="text-lg text-gray-700 flex items-center gap-2">
+                  {user.avatars && <img src={user.avatars["48"].webp} alt="" width="24" height="24" className="rounded-full" />}
+                  {user.username}
+                </li>
               ))
             ) : (
               <p>Henüz katılan kullanıcı yok.</p>
@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useState, useEffect, useCallback } from "react";
 import axios from "axios";
 import { BASE_URL } from "../constants";
 import { useNavigate } from "react-router-dom";
@@ -11,6 +11,8 @@ function Room() {
   const [gameStarted, setGameStarted] = useState(false);
   const [participants, setParticipants] = useState([]);
   const [timeLeft, setTimeLeft] = useState(null);
+  const [endsAt, setEndsAt] = useState(null);
+  const [phase, setPhase] = useState(null);
   const navigate = useNavigate();
 
   const handleRoomCreate = async () => {
@@ -54,11 +56,35 @@ function Room() {
     }
   };
 
-  const handleTimerUpdate = (data) => {
+  const handleTimerUpdate = useCallback((data) => {
     if (data.action === "timer") {
+      // Sunucu saati ile yerel saat arasındaki farkı düzelterek bitiş zamanını sakla
+      const skew = Date.now() / 1000 - data.server_time;
+      setEndsAt(data.ends_at + skew);
       setTimeLeft(data.time_left);
+    } else if (data.action === "phase_change") {
+      // Aşama geçişleri sunucudaki zamanlayıcı tarafından yapılır
+      setPhase(data.phase);
+      if (data.ends_at !== null) {
+        const skew = Date.now() / 1000 - data.server_time;
+        setEndsAt(data.ends_at + skew);
+      } else {
+        setEndsAt(null);
+        setTimeLeft(0);
+      }
     }
-  };
+  }, []);
+
+  // Geri sayım yerel olarak yapılır, sunucu yalnızca ara noktalarda güncelleme gönderir
+  useEffect(() => {
+    if (endsAt === null) return;
+    const interval = setInterval(() => {
+      const remaining = Math.max(Math.round(endsAt - Date.now() / 1000), 0);
+      setTimeLeft(remaining);
+      if (remaining === 0) clearInterval(interval);
+    }, 250);
+    return () => clearInterval(interval);
+  }, [endsAt]);
 
   const sendGameStart = UseWebSocket(roomName, "timer", handleTimerUpdate);
 
@@ -81,6 +107,7 @@ function Room() {
       {gameStarted && (
         <div>
           <h3>Game Started!</h3>
+          {phase && <p>Aşama: {phase === "voting" ? "Oylama" : "Bitti"}</p>}
           <p>Zaman: {timeLeft} saniye kaldı</p>
         </div>
       )}
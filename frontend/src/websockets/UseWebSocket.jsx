@@ -1,18 +1,29 @@
-import { useState, useEffect } from "react";
+import { useEffect, useCallback, useRef } from "react";
 
-function UseWebSocket(roomName, type, onMessageReceived) {
-  const [socket, setSocket] = useState(null);
+// Oda başına tek bir WebSocket bağlantısı açılır, tüm akışlar bu bağlantıyı paylaşır
+const connections = {};
 
-  useEffect(() => {
-    const ws = new WebSocket(`ws://localhost:8000/ws/room/${roomName}/${type}/`);
+// Sunucu PRESENCE_TTL_SECONDS içinde heartbeat almazsa kullanıcıyı çevrimdışı sayar
+const HEARTBEAT_INTERVAL_MS = 10000;
+
+function getConnection(roomName) {
+  let connection = connections[roomName];
+  if (!connection) {
+    const ws = new WebSocket(`ws://localhost:8000/ws/room/${roomName}/game/`);
+    connection = { ws, listeners: new Set(), queue: [] };
 
     ws.onopen = () => {
       console.log("Connected to WebSocket");
+      connection.queue.forEach((message) => ws.send(message));
+      connection.queue = [];
+      connection.heartbeat = setInterval(() => {
+        ws.send(JSON.stringify({ type: "presence", action: "heartbeat" }));
+      }, HEARTBEAT_INTERVAL_MS);
     };
 
     ws.onmessage = (event) => {
       const data = JSON.parse(event.data);
-      onMessageReceived(data);
+      connection.listeners.forEach((listener) => listener(data));
     };
 
     ws.onerror = (error) => {
@@ -21,20 +32,56 @@ function UseWebSocket(roomName, type, onMessageReceived) {
 
     ws.onclose = () => {
       console.log("WebSocket closed");
+      clearInterval(connection.heartbeat);
+      delete connections[roomName];
     };
 
-    setSocket(ws);
+    connections[roomName] = connection;
+  }
+  return connection;
+}
+
+function UseWebSocket(roomName, type, onMessageReceived) {
+  // Dinleyici her render'da yeniden oluşturulsa da bağlantı yeniden açılmaz,
+  // gelen mesajlar her zaman en son verilen fonksiyona iletilir
+  const onMessageRef = useRef(onMessageReceived);
+  useEffect(() => {
+    onMessageRef.current = onMessageReceived;
+  }, [onMessageReceived]);
+
+  useEffect(() => {
+    if (!roomName) return;
+
+    const connection = getConnection(roomName);
+
+    // Yalnızca bu akışa ait mesajlar (ve hatalar) dinleyiciye iletilir
+    const listener = (data) => {
+      if (data.type === type || data.error) {
+        onMessageRef.current(data);
+      }
+    };
+    connection.listeners.add(listener);
 
     return () => {
-      ws.close();
+      connection.listeners.delete(listener);
+      if (connection.listeners.size === 0) {
+        connection.ws.close();
+        delete connections[roomName];
+      }
     };
-  }, [roomName, type, onMessageReceived]);
+  }, [roomName, type]);
+
+  const sendMessage = useCallback((message) => {
+    const connection = connections[roomName];
+    if (!connection) return;
 
-  const sendMessage = (message) => {
-    if (socket && socket.readyState === WebSocket.OPEN) {
-      socket.send(JSON.stringify(message));
+    const payload = JSON.stringify({ type, ...message });
+    if (connection.ws.readyState === WebSocket.OPEN) {
+      connection.ws.send(payload);
+    } else if (connection.ws.readyState === WebSocket.CONNECTING) {
+      connection.queue.push(payload);
     }
-  };
+  }, [roomName, type]);
 
   return sendMessage;
 }
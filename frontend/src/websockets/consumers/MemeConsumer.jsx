@@ -1,25 +1,32 @@
-import { useState, useEffect } from "react";
+import { useState } from "react";
 import UseWebSocket from "../UseWebSocket";
 
 function MemeConsumer({ roomName }) {
-  const [meme, setMeme] = useState(null);
+  const [memes, setMemes] = useState([]);
 
+  // Meme'ler REST ile gönderilir, bu bağlantı yalnızca sunucunun yayınlarını dinler
   const handleMemeUpdate = (data) => {
-    if (data.action === "update_meme") {
-      setMeme(data.meme_update);
+    if (data.action === "meme_created") {
+      // Gönderilen meme'ler sunucu tarafından yayınlanır, round detayı yeniden çekilmez
+      setMemes((prevMemes) => [...prevMemes, data.meme]);
+    } else if (data.action === "meme_thumbnails") {
+      // Küçük resimler görsel worker'ı tarafından sonradan üretilir
+      setMemes((prevMemes) =>
+        prevMemes.map((card) => (card.id === data.meme ? { ...card, thumbnails: data.thumbnails } : card))
+      );
     }
   };
 
-  const sendMemeUpdate = UseWebSocket(roomName, "meme", handleMemeUpdate);
-
-  const handleSendMemeUpdate = (memeUpdate) => {
-    sendMemeUpdate({ meme_update: memeUpdate });
-  };
+  UseWebSocket(roomName, "meme", handleMemeUpdate);
 
   return (
     <div>
-      <h2>Meme Update: {meme}</h2>
-      <button onClick={() => handleSendMemeUpdate("New Meme")}>Update Meme</button>
+      {memes.map((card) => (
+        <div key={card.id}>
+          <img src={card.thumbnails?.["480"]?.webp ?? card.image_url} alt={card.caption} width="200" />
+          <p>{card.caption} ({card.creator})</p>
+        </div>
+      ))}
     </div>
   );
 }
@@ -5,7 +5,7 @@ function RoomConsumer({ roomName }) {
   const [messages, setMessages] = useState([]);
 
   const handleMessageReceived = (data) => {
-    if (data.type === "chat_message") {
+    if (data.action === "chat_message") {
       setMessages((prevMessages) => [
         ...prevMessages,
         { username: data.username, message: data.message, timestamp: data.timestamp },
@@ -1,29 +1,50 @@
-import { useState, useEffect } from "react";
+import { useState, useCallback } from "react";
+import axios from "axios";
+import { ACCESS_TOKEN, BASE_URL } from "../../constants";
 import UseWebSocket from "../UseWebSocket";
 
-function VoteConsumer({ roomName }) {
-  const [votes, setVotes] = useState([]);
+// Erişim token'ının içindeki kullanıcı id'si
+function getUserId(token) {
+  return JSON.parse(atob(token.split(".")[1])).user_id;
+}
+
+function VoteConsumer({ roomName, memeIds = [] }) {
+  const [totals, setTotals] = useState({});
 
-  const handleVoteUpdate = (data) => {
-    if (data.action === "vote") {
-      setVotes((prevVotes) => [...prevVotes, data.vote]);
+  // Sunucu oyları toplu yayınlar, çerçeve yalnızca değişen meme'lerin toplamlarını içerir
+  const handleVoteUpdate = useCallback((data) => {
+    if (data.action === "vote_update") {
+      setTotals((prevTotals) => ({ ...prevTotals, ...data.totals }));
     }
-  };
+  }, []);
 
-  const sendVote = UseWebSocket(roomName, "vote", handleVoteUpdate);
+  UseWebSocket(roomName, "vote", handleVoteUpdate);
 
-  const handleSendVote = (vote) => {
-    sendVote({ vote });
+  // Oy REST ile kaydedilir, güncel toplam sunucunun yayınladığı vote_update ile gelir
+  const handleSendVote = async (memeId) => {
+    const token = localStorage.getItem(ACCESS_TOKEN);
+    if (!token) return;
+
+    try {
+      await axios.post(
+        `${BASE_URL}/votes/create`,
+        { meme: memeId, voter: getUserId(token) },
+        { headers: { Authorization: `Bearer ${token}` } }
+      );
+    } catch (error) {
+      console.error("Oy verilemedi:", error.response?.data || error);
+    }
   };
 
   return (
     <div>
       <h2>Votes</h2>
-      {votes.map((vote, idx) => (
-        <div key={idx}>{vote}</div>
+      {memeIds.map((memeId) => (
+        <div key={memeId}>
+          Meme {memeId}: {totals[memeId] || 0}
+          <button onClick={() => handleSendVote(memeId)}>Upvote</button>
+        </div>
       ))}
-      <button onClick={() => handleSendVote("Upvote")}>Upvote</button>
-      <button onClick={() => handleSendVote("Downvote")}>Downvote</button>
     </div>
   );
 }